@@ -222,11 +222,14 @@ class DADAStreamReader(DADAStreamBase, VLBIStreamReaderBase, DADAFileReader):
     squeeze : bool, optional
         If `True` (default), remove any dimensions of length unity from
         decoded data.
+    nthreads : int, optional
+        Number of threads to use for decoding large reads.  Default: 1.
     """
-    def __init__(self, fh_raw, thread_ids=None, squeeze=True):
+    def __init__(self, fh_raw, thread_ids=None, squeeze=True, nthreads=1):
         header = DADAHeader.fromfile(fh_raw)
         super(DADAStreamReader, self).__init__(fh_raw, header, thread_ids,
                                                squeeze)
+        self.nthreads = nthreads
         self._get_frame(0)
 
     @lazyproperty
@@ -236,6 +239,14 @@ class DADAStreamReader(DADAStreamBase, VLBIStreamReaderBase, DADAFileReader):
         last_frame = self.read_frame(memmap=True)
         return last_frame.header
 
+    def _last_header_offset(self):
+        # Each file holds a single frame.
+        raw_offset = self.fh_raw.tell()
+        self.fh_raw.seek(-self.header0.framesize, 2)
+        offset = self.fh_raw.tell()
+        self.fh_raw.seek(raw_offset)
+        return offset
+
     def read(self, count=None, out=None):
         """Read count samples.
 
@@ -270,22 +281,31 @@ class DADAStreamReader(DADAStreamBase, VLBIStreamReaderBase, DADAFileReader):
             result = self._unsqueeze(out) if self.squeeze else out
 
         offset0 = self.offset
-        while count > 0:
-            frame_nr, sample_offset = self._frame_info()
-            if frame_nr != self._frame_nr:
-                # Open relevant file.
-                self._get_frame(frame_nr)
-
-            # Copy relevant data from frame into output.
-            nsample = min(count, self.samples_per_frame - sample_offset)
-            sample = self.offset - offset0
-            data_slice = slice(sample_offset, sample_offset + nsample)
-            if self.thread_ids:
-                data_slice = (data_slice, self.thread_ids)
-
-            result[sample:sample + nsample] = self._frame[data_slice]
-            self.offset += nsample
-            count -= nsample
+        with self._decoding(count):
+            while count > 0:
+                frame_nr, sample_offset = self._frame_info()
+                if frame_nr != self._frame_nr:
+                    # Open relevant file.
+                    self._get_frame(frame_nr)
+
+                # Decode relevant data from frame directly into output.
+                # Since frames are typically large, split them up in parts
+                # that can be decoded in parallel.
+                nsample = min(count, self.samples_per_frame - sample_offset)
+                sample = self.offset - offset0
+                step = -(-nsample // self.nthreads)
+                for start in range(0, nsample, step):
+                    stop = min(start + step, nsample)
+                    data_slice = slice(sample_offset + start,
+                                       sample_offset + stop)
+                    if self.thread_ids:
+                        data_slice = (data_slice, self.thread_ids)
+
+                    self._decode(stop - start, self._frame.__getitem__,
+                                 data_slice,
+                                 result[sample + start:sample + stop])
+                self.offset += nsample
+                count -= nsample
 
         return out
 
@@ -293,6 +313,7 @@ class DADAStreamReader(DADAStreamBase, VLBIStreamReaderBase, DADAFileReader):
         self.fh_raw.seek(frame_nr * self.header0.framesize)
         self._frame = self.read_frame(memmap=True)
         self._frame_nr = frame_nr
+        self._count('frames_read')
         assert (self._frame.header['OBS_OFFSET'] ==
                 self.header0['OBS_OFFSET'] + frame_nr *
                 self.header0.payloadsize)
@@ -378,6 +399,8 @@ thread_ids : list of int, optional
 squeeze : bool, optional
     If `True` (default), remove any dimensions of length unity from
     decoded data.
+nthreads : int, optional
+    Number of threads to use for decoding large reads.  Default: 1.
 
 --- For writing : (see :class:`~baseband.dada.base.DADAStreamWriter`)
 
@@ -11,7 +11,6 @@ import io
 import warnings
 from collections import OrderedDict
 import astropy.units as u
-from astropy.time import Time
 from astropy.extern import six
 from astropy.utils import deprecated
 
@@ -391,6 +390,7 @@ class DADAHeader(OrderedDict):
     @property
     def start_time(self):
         """Start time of the observation."""
+        from astropy.time import Time
         mjd_int, frac = self['MJD_START'].split('.')
         mjd_int = int(mjd_int)
         frac = float('.' + frac)
@@ -399,6 +399,7 @@ class DADAHeader(OrderedDict):
 
     @start_time.setter
     def start_time(self, start_time):
+        from astropy.time import Time
         start_time = Time(start_time, scale='utc', format='isot', precision=9)
         self['UTC_START'] = (start_time.isot.replace('T', '-')
                              .replace('.000000000', ''))
@@ -6,13 +6,19 @@ import numpy as np
 from collections import namedtuple
 
 from ..vlbi_base.payload import VLBIPayloadBase
+from ..vlbi_base.encoding import decoder_out
 
 
 __all__ = ['DADAPayload']
 
 
-def decode_8bit(words):
-    return words.view(np.int8, np.ndarray).astype(np.float32)
+def decode_8bit(words, out=None):
+    b = words.view(np.int8, np.ndarray)
+    if out is None:
+        return b.astype(np.float32)
+    out = decoder_out(out, b.shape)
+    out[...] = b
+    return out
 
 
 def encode_8bit(values):
@@ -84,15 +90,6 @@ class DADAPayload(VLBIPayloadBase):
                                                     payloadsize=payloadsize,
                                                     **kwargs)
 
-        if hasattr(fh, 'memmap'):
-            words = fh.memmap(dtype=cls._dtype_word,
-                              shape=None if payloadsize is None else
-                              (payloadsize // cls._dtype_word.itemsize,))
-        else:
-            mode = fh.mode.replace('b', '')
-            offset = fh.tell()
-            words = np.memmap(fh, mode=mode, dtype=cls._dtype_word,
-                              offset=offset, shape=None if payloadsize is None
-                              else (payloadsize // cls._dtype_word.itemsize,))
-            fh.seek(offset + words.size * words.dtype.itemsize)
+        words = cls._words_fromfile(fh, payloadsize, cls._dtype_word,
+                                    memmap=True)
         return cls(words, header=header, **kwargs)
@@ -373,6 +373,21 @@ class TestDADA(object):
         with dada.open(filename, 'rs', squeeze=False) as fh:
             assert np.all(fh.read() == self.payload)
 
+    @pytest.mark.parametrize(('nthreads', 'thread_ids'),
+                             ((2, None), (3, [1])))
+    def test_stream_nthreads(self, nthreads, thread_ids):
+        with dada.open(SAMPLE_FILE, 'rs', thread_ids=thread_ids) as fh:
+            record = fh.read()
+            fh.seek(123)
+            record1 = fh.read(4567)
+        with dada.open(SAMPLE_FILE, 'rs', thread_ids=thread_ids,
+                       nthreads=nthreads) as fh:
+            record2 = fh.read()
+            fh.seek(123)
+            record3 = fh.read(4567)
+        assert np.all(record2 == record)
+        assert np.all(record3 == record1)
+
     # Test that writing an incomplete stream is possible, and that frame set is
     # valid but invalid samples are appropriately marked.
     def test_incomplete_stream(self, tmpdir):
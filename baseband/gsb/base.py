@@ -313,11 +313,12 @@ class GSBStreamReader(GSBStreamBase, VLBIStreamReaderBase):
                                   ((self._frame.header.time -
                                     self.start_time) * framerate).to(u.one))
 
-            # Copy relevant data from frame into output.
+            # Decode relevant data from frame directly into output.
             nsample = min(count, self.samples_per_frame - sample_offset)
             sample = self.offset - offset0
-            result[sample:sample + nsample] = self._frame[
-                sample_offset:sample_offset + nsample]
+            self._decode(nsample, self._frame.__getitem__,
+                         slice(sample_offset, sample_offset + nsample),
+                         result[sample:sample + nsample])
             self.offset += nsample
             count -= nsample
 
@@ -338,6 +339,7 @@ class GSBStreamReader(GSBStreamBase, VLBIStreamReaderBase):
                                         bps=self.bps,
                                         complex_data=self.complex_data)
         self._frame_nr = frame_nr
+        self._count('frames_read')
         return self._frame
 
 
@@ -441,6 +443,8 @@ class GSBStreamWriter(GSBStreamBase, VLBIStreamWriterBase):
         count = data.shape[0]
         sample = 0
         offset0 = self.offset
+        # Headers of complete frames in data, which are encoded together.
+        headers = []
         while count > 0:
             frame_nr, sample_offset = divmod(self.offset,
                                              self.samples_per_frame)
@@ -461,16 +465,56 @@ class GSBStreamWriter(GSBStreamBase, VLBIStreamWriterBase):
             nsample = min(count, self.samples_per_frame - sample_offset)
             sample_end = sample_offset + nsample
             sample = self.offset - offset0
-            self._data[sample_offset:sample_end] = data[sample:
-                                                        sample + nsample]
-            if sample_end == self.samples_per_frame:
-                self._frame = GSBFrame.fromdata(self._data, self._header,
-                                                self.bps)
-                self._frame.tofile(self.fh_ts, self.fh_raw)
+            if nsample == self.samples_per_frame:
+                if not headers:
+                    sample0 = sample
+                headers.append(self._header)
+            else:
+                self._data[sample_offset:sample_end] = data[sample:
+                                                            sample + nsample]
+                if sample_end == self.samples_per_frame:
+                    self._frame = GSBFrame.fromdata(self._data, self._header,
+                                                    self.bps)
+                    self._frame.tofile(self.fh_ts, self.fh_raw)
 
             self.offset += nsample
             count -= nsample
 
+        if headers:
+            self._write_frames(
+                data[sample0:sample0 + len(headers) * self.samples_per_frame],
+                headers)
+
+    def _write_frames(self, data, headers):
+        """Encode and write complete frames.
+
+        Parameters
+        ----------
+        data : `~numpy.ndarray`
+            Data for all frames, with shape ``(nframe * samples_per_frame,)
+            + sample_shape``.
+        headers : list of `~baseband.gsb.GSBHeader`
+            Header for each frame.
+        """
+        payload = GSBPayload.fromdata(
+            data.astype(self._data.dtype, copy=False), bps=self.bps)
+        for header in headers:
+            header.tofile(self.fh_ts)
+        if hasattr(self.fh_raw, 'write'):
+            self.fh_raw.write(payload.words.tostring())
+            return
+
+        # For phased data, every frame is split over threads and over the
+        # files for each thread (see GSBPayload.tofile).
+        nthread = len(self.fh_raw)
+        words = payload.words.reshape(len(headers), len(self.fh_raw[0]), -1,
+                                      nthread,
+                                      payload._bpfs // nthread // 8)
+        for fh_set, thread in zip(self.fh_raw,
+                                  words.transpose(3, 1, 0, 2, 4)):
+            for fh, part in zip(fh_set, thread):
+                fh.write(part.tostring())
+
     def flush(self):
         self.fh_ts.flush()
         try:
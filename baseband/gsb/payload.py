@@ -13,6 +13,7 @@ import numpy as np
 from collections import namedtuple
 
 from ..vlbi_base.payload import VLBIPayloadBase
+from ..vlbi_base.encoding import decoder_out
 
 
 __all__ = ['GSBPayload']
@@ -22,25 +23,34 @@ shift40 = np.array([4, 0], np.int8)
 shift04 = np.array([0, 4], np.int8)
 
 
-def decode_4bit(words):
+def decode_4bit(words, out=None):
     """Decode 4-bit data.
 
     For a given int8 byte containing bits 76543210,
     the first sample is in 3210, the second in 7654, and both are interpreted
-    as signed 4-bit integers.
+    as signed 4-bit integers.  If ``out`` is given, the values are stored in
+    it (it should be contiguous and have the right number of elements).
     """
     # left_shift(byte[:,np.newaxis], shift40):  [3210xxxx, 76543210]
     split = np.left_shift(words[:, np.newaxis], shift40).ravel()
     # right_shift(..., 4):                      [33333210, 77777654]
     # so least significant bits go first.
     split >>= 4
-    return split.astype(np.float32)
+    if out is None:
+        return split.astype(np.float32)
+    out = decoder_out(out, split.shape)
+    out[...] = split
+    return out
 
 
-def decode_8bit(words):
+def decode_8bit(words, out=None):
     """GSB decoder for data stored using 8 bit signed integer.
     """
-    return words.astype(np.float32)
+    if out is None:
+        return words.astype(np.float32)
+    out = decoder_out(out, words.shape)
+    out[...] = words
+    return out
 
 
 def encode_4bit(values):
@@ -237,6 +237,13 @@ class TestGSB(object):
             payload3 = gsb.GSBPayload(payload1.words, bps=4,
                                       sample_shape=payload1.sample_shape)
             assert np.all(payload3.data == payload1.data)
+            # Check that decoding single channels gets the signs right.
+            payload3c = gsb.GSBPayload(payload1.words, bps=4,
+                                       sample_shape=(4,))
+            for channel in range(4):
+                assert np.all(payload3c[:, channel] ==
+                              payload3c.data[:, channel])
+            assert np.any(payload3c[:, 1] < 0)
 
         with open(SAMPLE_PHASED[0][0], 'rb') as fh:
             # For 1 file in phased, payloadsize = (
@@ -693,6 +700,27 @@ class TestGSB(object):
             assert fh_r.size == fh_r.samples_per_frame
             assert fh_r._last_header == fh_r.header0
 
+    def test_phased_stream_instrument(self):
+        sample_rate = self.framerate * self.payloadsize / 512
+        with gsb.open(SAMPLE_PHASED_HEADER, 'rs', raw=SAMPLE_PHASED,
+                      sample_rate=sample_rate,
+                      payloadsize=self.payloadsize) as fh_r:
+            record = fh_r.read()
+            fh_r.instrument = True
+            # The raw files for the threads are wrapped individually.
+            assert all(fh.fh.name == name for fh_pair, name_pair in
+                       zip(fh_r.fh_raw, SAMPLE_PHASED)
+                       for fh, name in zip(fh_pair, name_pair))
+            fh_r.seek(0)
+            assert np.all(fh_r.read() == record)
+            info = fh_r.instrument_info()
+            assert info['seeks'] == 1
+            assert info['frames_read'] == 10
+            assert info['bytes_read'] == 10 * 4 * self.payloadsize
+            assert info['samples_decoded'] == len(record)
+            fh_r.instrument = False
+            assert fh_r.fh_raw[0][0].name == SAMPLE_PHASED[0][0]
+
     def test_stream_invalid(self, tmpdir):
         with pytest.raises(ValueError):
             # no r or w in mode
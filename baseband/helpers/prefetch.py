@@ -0,0 +1,215 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Read-ahead of fixed-size blocks of a file in a background thread."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import threading
+
+__all__ = ['PrefetchReader']
+
+
+class PrefetchReader(object):
+    """Wrap a binary file, reading blocks ahead in a background thread.
+
+    Reads are served from blocks prefetched in memory where possible, and
+    otherwise from the underlying file.  After every read, a background
+    thread is asked to read the ``nblock`` blocks following the one the file
+    pointer is in, so that I/O can overlap with, e.g., decoding the data
+    already read.  Blocks before the current one are discarded, so memory
+    use is bounded by about ``nblock + 1`` blocks.
+
+    All access to the underlying file is serialized with a lock, so the
+    wrapper can be used as a regular file handle (the position of the
+    underlying file itself is not meaningful while prefetching).  Any
+    attribute not defined on the wrapper is looked up on the underlying file.
+
+    Parameters
+    ----------
+    fh : filehandle
+        Binary file handle, which should support ``seek``, ``tell`` and
+        ``read``.
+    blocksize : int
+        Size of the blocks to read ahead, typically the size of a frame.
+    nblock : int
+        Number of blocks to read ahead.
+    offset : int, optional
+        Offset of the first block in the file (earlier parts can still be
+        read, but are not prefetched).  Default: 0.
+    """
+
+    def __init__(self, fh, blocksize, nblock, offset=0):
+        if nblock < 1:
+            raise ValueError("need to prefetch at least one block.")
+        self.fh = fh
+        self.blocksize = blocksize
+        self.nblock = nblock
+        self.offset = offset
+        self._pos = fh.tell()
+        self._blocks = {}
+        # Index of the block beyond which nothing can be read; None if unknown.
+        self._last_block = None
+        # Index of the block being read by the background thread, if any.
+        self._pending = None
+        # The condition guards the bookkeeping above; the file lock guards
+        # the underlying file, so that reading it does not hold up requests
+        # for blocks that are already in memory.
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._current = self._block_index(self._pos)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._prefetch)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __getattr__(self, attr):
+        """Try to get things on the underlying file if it is not on self."""
+        if not attr.startswith('_'):
+            try:
+                return getattr(self.fh, attr)
+            except AttributeError:
+                pass
+        return self.__getattribute__(attr)
+
+    def _block_index(self, pos):
+        return (pos - self.offset) // self.blocksize
+
+    def _next_missing(self):
+        """Index of the next block that should be read ahead (or `None`)."""
+        for index in range(max(self._current, 0),
+                           self._current + self.nblock + 1):
+            if self._last_block is not None and index > self._last_block:
+                return None
+            if index not in self._blocks:
+                return index
+        return None
+
+    def _prefetch(self):
+        while True:
+            with self._cond:
+                index = self._next_missing()
+                while index is None and not self._stopped:
+                    self._cond.wait()
+                    index = self._next_missing()
+                if self._stopped:
+                    return
+                self._pending = index
+
+            try:
+                with self._file_lock:
+                    self.fh.seek(self.offset + index * self.blocksize)
+                    block = self.fh.read(self.blocksize)
+            except Exception:
+                # Leave it to the regular read to raise the error.
+                block = None
+
+            with self._cond:
+                self._pending = None
+                if block is None:
+                    self._last_block = index - 1
+                else:
+                    if len(block) < self.blocksize:
+                        self._last_block = index
+                    # The reader may have moved on while we were reading.
+                    if (self._current <= index <=
+                            self._current + self.nblock):
+                        self._blocks[index] = block
+                self._cond.notify_all()
+
+    def tell(self):
+        """Return the current stream position."""
+        return self._pos
+
+    def seek(self, offset, whence=0):
+        with self._cond:
+            if whence == 1:
+                offset += self._pos
+            elif whence == 2:
+                with self._file_lock:
+                    offset += self.fh.seek(0, 2)
+            elif whence != 0:
+                raise ValueError("invalid 'whence'; should be 0, 1, or 2.")
+            if offset < 0:
+                raise OSError('invalid offset')
+            self._pos = offset
+        return self._pos
+    seek.__doc__ = io.BufferedIOBase.seek.__doc__
+
+    def read(self, count=None):
+        with self._cond:
+            pos = self._pos
+        if count is None or count < 0:
+            with self._file_lock:
+                end = self.fh.seek(0, 2)
+        else:
+            end = pos + count
+        pieces = []
+        while pos < end:
+            index = self._block_index(pos)
+            with self._cond:
+                # If the block is being read ahead, just wait for it.
+                while index == self._pending:
+                    self._cond.wait()
+                block = self._blocks.get(index)
+                if block is None:
+                    # Not prefetched: read directly up to the next block that
+                    # is available or in flight, or to the end of what is
+                    # requested.
+                    ahead = [i for i in self._blocks if i > index]
+                    if self._pending is not None and self._pending > index:
+                        ahead.append(self._pending)
+                    stop = min([end] + [self.offset + i * self.blocksize
+                                        for i in ahead])
+            if block is None:
+                with self._file_lock:
+                    self.fh.seek(pos)
+                    piece = self.fh.read(stop - pos)
+                full = stop - pos
+            else:
+                start = pos - self.offset - index * self.blocksize
+                piece = block[start:start + end - pos]
+                full = min(self.blocksize - start, end - pos)
+            pieces.append(piece)
+            pos += len(piece)
+            if len(piece) < full:
+                break
+
+        with self._cond:
+            self._pos = pos
+            # Drop blocks no longer needed, and ask for the next ones.
+            self._current = self._block_index(pos)
+            for index in list(self._blocks):
+                if not (self._current <= index <=
+                        self._current + self.nblock):
+                    del self._blocks[index]
+            self._cond.notify_all()
+
+        return b''.join(pieces)
+
+    def detach(self):
+        """Stop prefetching and return the underlying file.
+
+        The underlying file is positioned at the current stream position.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._blocks = {}
+        self.fh.seek(self._pos)
+        return self.fh
+
+    def close(self):
+        """Stop prefetching and close the underlying file."""
+        self.detach().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return ("{0}(fh={1!r}, blocksize={2}, nblock={3}, offset={4})"
+                .format(self.__class__.__name__, self.fh, self.blocksize,
+                        self.nblock, self.offset))
@@ -3,6 +3,7 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import io
+import os
 import itertools
 from bisect import bisect
 import numpy as np
@@ -148,15 +149,36 @@ class SequentialFileReader(SequentialFileBase):
 
     @lazyproperty
     def size(self):
-        """Size of all underlying files combined."""
-        offset = self.tell()
+        """Size of all underlying files combined.
+
+        For the default opener, the sizes of files not yet opened are found
+        using `os.stat`; otherwise, the files are opened one by one.
+        """
+        offset = None
         for i in itertools.count(start=len(self._file_sizes)):
+            if self.opener is io.open:
+                try:
+                    file_size = os.stat(self.files[i]).st_size
+                except IndexError:
+                    break
+                except (OSError, IOError, TypeError):
+                    # Not a name of an existing file; try opening it below.
+                    pass
+                else:
+                    self._file_sizes.append(file_size)
+                    self._file_offsets.append(self._file_offsets[-1] +
+                                              file_size)
+                    continue
+
+            if offset is None:
+                offset = self.tell()
             try:
                 self._open(i)
             except Exception:
                 break
 
-        self.seek(offset)
+        if offset is not None:
+            self.seek(offset)
         return self._file_offsets[-1]
 
     def seek(self, offset, whence=0):
@@ -194,6 +216,38 @@ class SequentialFileReader(SequentialFileBase):
         return self.tell()
     seek.__doc__ = io.BufferedIOBase.seek.__doc__
 
+    def readinto(self, b):
+        """Read bytes into a pre-allocated, writable bytes-like object.
+
+        Reading continues across file boundaries until ``b`` is filled or
+        all files are exhausted.
+
+        Returns
+        -------
+        count : int
+            The number of bytes read.
+        """
+        if self.closed:
+            raise ValueError('readinto of closed file.')
+
+        if isinstance(b, np.ndarray):
+            # Work on bytes (memoryview.cast is not available on python2).
+            if not b.flags['C_CONTIGUOUS']:
+                raise ValueError('can only read into contiguous arrays.')
+            view = b.reshape(-1).view(np.uint8)
+        else:
+            view = memoryview(b)
+        count = 0
+        while count < len(view):
+            extra = self.fh.readinto(view[count:])
+            if not extra:
+                break
+            count += extra
+            # Go to current offset, possibly opening new file.
+            self.seek(0, 1)
+
+        return count
+
     def read(self, count=None):
         if self.closed:
             raise ValueError('read of closed file.')
@@ -201,19 +255,15 @@ class SequentialFileReader(SequentialFileBase):
         if count is None or count < 0:
             count = max(self.size - self.tell(), 0)
 
-        data = b''
-        while count > 0:
-            extra = self.fh.read(count)
-            if not extra:
-                break
-            count -= len(extra)
-            if not data:  # avoid copies for first read.
-                data = extra
-            else:
-                data += extra
-            # Go to current offset, possibly opening new file.
+        if count <= self._file_sizes[self.file_nr] - self.fh.tell():
+            # All in the current file, so no need for an extra copy.
+            data = self.fh.read(count)
             self.seek(0, 1)
+            return data
 
+        # Fill a single buffer across files, avoiding repeated copies.
+        data = bytearray(count)
+        del data[self.readinto(data):]
         return data
     read.__doc__ = io.BufferedIOBase.read.__doc__
 
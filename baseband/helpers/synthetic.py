@@ -0,0 +1,484 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Generators of synthetic baseband files, e.g., for load testing.
+
+Files are written directly from header words and encoded payloads, without
+going through the stream writers.  Headers for all frames are calculated at
+once from a template (see
+`~baseband.vlbi_base.header.VLBIHeaderBase.sequence_words`), and payloads
+are taken in turn from a small pool of encoded random data, so that files of
+arbitrary length can be produced at close to the speed of the disk.
+
+For the frame-based formats, gaps, frames marked as invalid, and corrupted
+bytes can be inserted, to exercise the parts of the readers that deal with
+imperfect data.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import io
+
+import numpy as np
+import astropy.units as u
+
+from ..vdif import VDIFPayload
+from ..mark5b import Mark5BHeader, Mark5BPayload
+from ..mark5b.frame import Mark5BFrame
+from ..mark4 import Mark4Payload
+from ..mark4.header import Mark4TrackHeader, words2stream, crc12, PAYLOADSIZE
+from ..mark4.frame import VALIDSTART
+from ..gsb import GSBPayload
+from ..dada import DADAPayload
+
+__all__ = ['generate_vdif', 'generate_mark5b', 'generate_mark4',
+           'generate_dada', 'generate_gsb']
+
+# Number of different encoded payloads that are cycled over.
+POOL_SIZE = 16
+# Approximate number of bytes passed to a single write call.
+CHUNK_SIZE = 1 << 24
+
+
+def _payload_pool(encode, rng):
+    """Pool of encoded payloads, as a uint8 array with one row per payload.
+
+    ``encode`` is called with a random number generator, and should return
+    the encoded payload for normally distributed data.
+    """
+    return np.array([np.asarray(encode(rng)).view('u1').ravel()
+                     for i in range(POOL_SIZE)])
+
+
+def _random_data(rng, shape, complex_data=False):
+    """Normally distributed data, with standard deviation of 2."""
+    data = rng.normal(scale=2., size=shape).astype('f4')
+    if complex_data:
+        data = data + 1j * rng.normal(scale=2., size=shape).astype('f4')
+    return data
+
+
+def _frame_index(nframe, gaps=()):
+    """Indices of the frames to write, i.e., excluding those in gaps."""
+    index = np.arange(nframe)
+    if len(gaps):
+        index = index[~np.in1d(index, gaps)]
+    return index
+
+
+def _write_frames(fh, index, framesize, headers, payloads):
+    """Write the frames with the given indices, in chunks.
+
+    Parameters
+    ----------
+    fh : filehandle
+        To write to.
+    index : `~numpy.ndarray`
+        Indices of the frames to write.
+    framesize : int
+        Size of a frame in bytes, used to determine the chunk size.
+    headers, payloads : callable
+        Functions that, given an array of frame indices, return the
+        header and payload bytes for those frames as uint8 arrays with
+        one row per frame (or per thread, for multi-thread VDIF).
+    """
+    step = max(CHUNK_SIZE // framesize, 1)
+    for start in range(0, len(index), step):
+        chunk = index[start:start + step]
+        fh.write(np.hstack((headers(chunk), payloads(chunk))).tostring())
+
+
+def _corrupt(name, ncorrupt, rng, start=0):
+    """Flip random bits in randomly selected bytes of a file.
+
+    Only bytes at or beyond ``start`` are affected.
+
+    Returns
+    -------
+    offsets : `~numpy.ndarray`
+        Sorted offsets of the bytes that were changed.
+    """
+    if not ncorrupt:
+        return np.array([], int)
+
+    with io.open(name, 'r+b') as fh:
+        size = fh.seek(0, 2)
+        offsets = np.unique(rng.randint(start, size, ncorrupt))
+        masks = rng.randint(1, 256, len(offsets))
+        for offset, mask in zip(offsets, masks):
+            fh.seek(offset)
+            value = bytearray(fh.read(1))[0]
+            fh.seek(offset)
+            fh.write(bytearray([value ^ mask]))
+    return offsets
+
+
+def _frame_rate(sample_rate, samples_per_frame):
+    frame_rate = (sample_rate / samples_per_frame).to_value(u.Hz)
+    if frame_rate % 1 != 0:
+        raise ValueError("sample rate {0} does not correspond to an integer "
+                         "number of frames of {1} samples per second."
+                         .format(sample_rate, samples_per_frame))
+    return int(frame_rate)
+
+
+def generate_vdif(name, header, nframeset, nthread=1, sample_rate=None,
+                  gaps=(), invalid=(), ncorrupt=0, seed=None):
+    """Write a synthetic VDIF file.
+
+    Frame sets follow each other in time, starting at the time of the
+    template header, and each holds a frame for every thread.
+
+    Parameters
+    ----------
+    name : str
+        Name of the file to write.
+    header : `~baseband.vdif.VDIFHeader`
+        Header used as template for all frames.  Any EDV is supported.
+    nframeset : int
+        Number of frame sets in the file, including any gaps.
+    nthread : int, optional
+        Number of threads.  Thread IDs run from 0 to ``nthread - 1``.
+        Default: 1.
+    sample_rate : `~astropy.units.Quantity`, optional
+        Number of complete samples per second, used to calculate frame
+        numbers.  Default: taken from the header (not possible for all EDV).
+    gaps : sequence of int, optional
+        Indices of frame sets that are left out.
+    invalid : sequence of int, optional
+        Indices of frame sets for which the ``invalid_data`` flag is set.
+    ncorrupt : int, optional
+        Number of bytes beyond the first frame set to corrupt.  Default: 0.
+    seed : int, optional
+        Seed for the random number generator used for the payloads and any
+        corruption.
+
+    Returns
+    -------
+    offsets : `~numpy.ndarray`
+        Offsets of the corrupted bytes (empty if ``ncorrupt=0``).
+    """
+    rng = np.random.RandomState(seed)
+    if sample_rate is None:
+        sample_rate = header.sample_rate
+    samples_per_frame = header.samples_per_frame
+    frame_rate = _frame_rate(sample_rate, samples_per_frame)
+    framesize = header.framesize
+    sample_shape = (samples_per_frame, header.nchan)
+    pool = _payload_pool(lambda rng: VDIFPayload.fromdata(
+        _random_data(rng, sample_shape, header['complex_data']),
+        header=header).words, rng)
+
+    if header.edv == 0xab:
+        # The Mark 5B part of the header holds a time as well; it is set
+        # using a Mark 5B template, as the combined header cannot set a
+        # time for a sequence of headers.
+        mark5b_header = Mark5BHeader(header.words[4:], verify=False)
+        start_time = header.get_time(frame_nr=0).utc
+
+    thread_id = np.arange(nthread)
+
+    def headers(index):
+        dt, frame_nr = divmod(header['frame_nr'] + index, frame_rate)
+        words = header.sequence_words(
+            seconds=(header['seconds'] + dt)[:, np.newaxis],
+            frame_nr=frame_nr[:, np.newaxis], thread_id=thread_id,
+            invalid_data=np.in1d(index, invalid)[:, np.newaxis])
+        if header.edv == 0xab:
+            time = start_time + (dt + frame_nr * samples_per_frame /
+                                 sample_rate.to_value(u.Hz)) * u.s
+            words[..., 4:] = mark5b_header.sequence_words(
+                time=time, frame_nr=frame_nr)[:, np.newaxis]
+        return words.view('u1').reshape(len(index) * nthread, -1)
+
+    def payloads(index):
+        frame = (index[:, np.newaxis] * nthread + thread_id).ravel()
+        return pool[frame % POOL_SIZE]
+
+    with io.open(name, 'wb') as fh:
+        _write_frames(fh, _frame_index(nframeset, gaps), framesize * nthread,
+                      headers, payloads)
+
+    return _corrupt(name, ncorrupt, rng, start=framesize * nthread)
+
+
+def generate_mark5b(name, header, nframe, nchan, bps=2, sample_rate=None,
+                    gaps=(), invalid=(), ncorrupt=0, seed=None):
+    """Write a synthetic Mark 5B file.
+
+    Parameters
+    ----------
+    name : str
+        Name of the file to write.
+    header : `~baseband.mark5b.Mark5BHeader`
+        Header used as template for all frames.
+    nframe : int
+        Number of frames in the file, including any gaps.
+    nchan : int
+        Number of channels encoded in the payloads.
+    bps : int, optional
+        Bits per sample.  Default: 2.
+    sample_rate : `~astropy.units.Quantity`
+        Number of complete samples per second, used to calculate times and
+        frame numbers.
+    gaps : sequence of int, optional
+        Indices of frames that are left out.
+    invalid : sequence of int, optional
+        Indices of frames for which the payload is replaced by the fill
+        pattern that marks invalid data.
+    ncorrupt : int, optional
+        Number of bytes beyond the first frame to corrupt.  Default: 0.
+    seed : int, optional
+        Seed for the random number generator used for the payloads and any
+        corruption.
+
+    Returns
+    -------
+    offsets : `~numpy.ndarray`
+        Offsets of the corrupted bytes (empty if ``ncorrupt=0``).
+    """
+    if sample_rate is None:
+        raise ValueError("Mark 5B headers do not hold the sample rate, so "
+                         "it needs to be passed in.")
+    rng = np.random.RandomState(seed)
+    samples_per_frame = header.payloadsize * 8 // bps // nchan
+    frame_rate = _frame_rate(sample_rate, samples_per_frame)
+    encoder = Mark5BPayload._encoders[bps]
+    pool = _payload_pool(lambda rng: encoder(
+        _random_data(rng, (samples_per_frame, nchan))), rng)
+    fill = np.full(header.payloadsize // 4, Mark5BFrame._fill_pattern,
+                   Mark5BPayload._dtype_word).view('u1')
+    start_time = header.time
+
+    def headers(index):
+        offsets = index * samples_per_frame
+        words = header.sequence_words(
+            time=start_time + (offsets / sample_rate).to(u.s),
+            frame_nr=(header['frame_nr'] + index) % frame_rate)
+        return words.view('u1').reshape(len(index), -1)
+
+    def payloads(index):
+        words = pool[index % POOL_SIZE]
+        words[np.in1d(index, invalid)] = fill
+        return words
+
+    with io.open(name, 'wb') as fh:
+        _write_frames(fh, _frame_index(nframe, gaps), header.framesize,
+                      headers, payloads)
+
+    return _corrupt(name, ncorrupt, rng, start=header.framesize)
+
+
+def _mark4_time_fields(time):
+    """BCD-encoded time fields of Mark 4 headers for an array of times."""
+    # Fixed-format strings like '2014:167:10:45:59.98750'; convert to digits.
+    time = time.copy()
+    time.precision = 5
+    yday = np.array(time.yday, 'S23')
+    digits = (yday.view('u1').reshape(-1, 23).astype(np.int64) - ord('0'))
+
+    def bcd(*positions):
+        value = 0
+        for position in positions:
+            value = (value << 4) | digits[:, position]
+        return value
+
+    if np.any(digits[:, 21] * 10 + digits[:, 22] !=
+              digits[:, 20] % 5 * 25):
+        raise ValueError("Mark 4 header times need to be multiples of "
+                         "1.25 ms.")
+    return {'bcd_unit_year': bcd(3),
+            'bcd_day': bcd(5, 6, 7),
+            'bcd_hour': bcd(9, 10),
+            'bcd_minute': bcd(12, 13),
+            'bcd_second': bcd(15, 16),
+            'bcd_fraction': bcd(18, 19, 20)}
+
+
+def generate_mark4(name, header, nframe, sample_rate, gaps=(), invalid=(),
+                   ncorrupt=0, seed=None):
+    """Write a synthetic Mark 4 file.
+
+    Parameters
+    ----------
+    name : str
+        Name of the file to write.
+    header : `~baseband.mark4.Mark4Header`
+        Header used as template for all frames.  It defines the number of
+        tracks, channels, bits per sample and fanout, which should be a
+        combination for which a payload encoder exists.
+    nframe : int
+        Number of frames in the file, including any gaps.
+    sample_rate : `~astropy.units.Quantity`
+        Number of complete samples per second, used to calculate times.
+    gaps : sequence of int, optional
+        Indices of frames that are left out.
+    invalid : sequence of int, optional
+        Indices of frames for which the ``communication_error`` flag is set.
+    ncorrupt : int, optional
+        Number of bytes beyond the first frame to corrupt.  Default: 0.
+    seed : int, optional
+        Seed for the random number generator used for the payloads and any
+        corruption.
+
+    Returns
+    -------
+    offsets : `~numpy.ndarray`
+        Offsets of the corrupted bytes (empty if ``ncorrupt=0``).
+    """
+    rng = np.random.RandomState(seed)
+    ntrack, nchan = header.ntrack, header.nchan
+    samples_per_frame = header.samples_per_frame
+    try:
+        encoder = Mark4Payload._encoders[nchan, header.bps, header.fanout]
+    except KeyError:
+        raise ValueError("no Mark 4 encoder for nchan={0}, bps={1}, "
+                         "fanout={2}.".format(nchan, header.bps,
+                                              header.fanout))
+    valid_start = samples_per_frame * VALIDSTART // PAYLOADSIZE
+    pool = _payload_pool(lambda rng: encoder(_random_data(
+        rng, (samples_per_frame - valid_start, nchan))), rng)
+    start_time = header.time
+    frame_duration = (samples_per_frame / sample_rate).to(u.s)
+
+    def headers(index):
+        words = np.empty((len(index),) + header.words.shape, '<u4')
+        words[...] = header.words
+        # Set fields for all tracks of all headers at once.
+        tracks = Mark4TrackHeader(np.rollaxis(words, 0, words.ndim),
+                                  decade=header.decade, verify=False)
+        fields = _mark4_time_fields(start_time + index * frame_duration)
+        fields['communication_error'] = np.in1d(index, invalid)
+        for key, value in fields.items():
+            tracks[key] = value
+        stream = words2stream(words.reshape(-1, ntrack)).reshape(
+            len(index), -1)
+        stream[:, -12:] = crc12(stream[:, :-12].T).T
+        return stream.view('u1')
+
+    def payloads(index):
+        return pool[index % POOL_SIZE]
+
+    with io.open(name, 'wb') as fh:
+        _write_frames(fh, _frame_index(nframe, gaps), header.framesize,
+                      headers, payloads)
+
+    return _corrupt(name, ncorrupt, rng, start=header.framesize)
+
+
+def generate_dada(name, header, ncorrupt=0, seed=None):
+    """Write a synthetic DADA file.
+
+    DADA files consist of a single header and payload, so gaps and invalid
+    data cannot be represented.  The size of the file is set by the
+    ``payloadsize`` of the header.
+
+    Parameters
+    ----------
+    name : str
+        Name of the file to write.
+    header : `~baseband.dada.DADAHeader`
+        Header to write.  Should be for 8 bits per sample.
+    ncorrupt : int, optional
+        Number of bytes in the payload to corrupt.  Default: 0.
+    seed : int, optional
+        Seed for the random number generator used for the payload and any
+        corruption.
+
+    Returns
+    -------
+    offsets : `~numpy.ndarray`
+        Offsets of the corrupted bytes (empty if ``ncorrupt=0``).
+    """
+    rng = np.random.RandomState(seed)
+    encoder = DADAPayload._encoders[header.bps]
+    blocksize = min(CHUNK_SIZE // POOL_SIZE, header.payloadsize)
+    pool = _payload_pool(lambda rng: encoder(_random_data(
+        rng, blocksize * 8 // header.bps)), rng)
+    with io.open(name, 'wb') as fh:
+        header.tofile(fh)
+        nblock, rest = divmod(header.payloadsize, blocksize)
+        for block in range(nblock):
+            fh.write(pool[block % POOL_SIZE].tostring())
+        if rest:
+            fh.write(pool[nblock % POOL_SIZE, :rest].tostring())
+
+    return _corrupt(name, ncorrupt, rng, start=header.size)
+
+
+def generate_gsb(name, raw, header, nframe, sample_rate, nchan=None,
+                 bps=None, complex_data=None, samples_per_frame=None,
+                 payloadsize=None, seed=None):
+    """Write synthetic GSB timestamp and raw data files.
+
+    GSB timestamps have no notion of invalid data, and gaps cannot be
+    distinguished from the reader's perspective, so these are not
+    supported.
+
+    Parameters
+    ----------
+    name : str
+        Name of the timestamp file to write.
+    raw : str, or nested tuple of str
+        Name(s) of the raw data files.  A single file for rawdump, and a
+        tuple for phased, with the same layout as for
+        `~baseband.gsb.open`.
+    header : `~baseband.gsb.GSBHeader`
+        Header for the first frame; the mode determines whether a rawdump
+        or phased stream is generated.
+    nframe : int
+        Number of frames to generate.
+    sample_rate : `~astropy.units.Quantity`
+        Number of complete samples per second, used to calculate times.
+    nchan, bps, complex_data : optional
+        Number of channels, bits per sample, and whether data are complex.
+        Defaults as for `~baseband.gsb.open`: 1, 4, and `False` for rawdump,
+        and 512, 8, and `True` for phased.
+    samples_per_frame : int, optional
+        Number of complete samples per frame.  Can give ``payloadsize``
+        instead.
+    payloadsize : int, optional
+        Number of bytes per payload, divided by the number of raw files.
+    seed : int, optional
+        Seed for the random number generator used for the payloads.
+    """
+    rng = np.random.RandomState(seed)
+    rawdump = header.mode == 'rawdump'
+    complex_data = (complex_data if complex_data is not None else
+                    (False if rawdump else True))
+    bps = bps if bps is not None else (4 if rawdump else 8)
+    nchan = nchan if nchan is not None else (1 if rawdump else 512)
+    raw_names = [raw] if rawdump else [name for pol in raw for name in pol]
+    nstream = 1 if rawdump else len(raw[0])
+    if payloadsize is None:
+        payloadsize = (samples_per_frame * nchan *
+                       (2 if complex_data else 1) * bps // 8 // nstream)
+    elif samples_per_frame is None:
+        samples_per_frame = (payloadsize * 8 // bps * nstream //
+                             (nchan * (2 if complex_data else 1)))
+
+    # Timestamps, with frame sequence numbers for phased data.
+    frame_nr = np.arange(nframe)
+    dt = frame_nr * (samples_per_frame / sample_rate).to(u.s)
+
+    def gsb_strings(time, precision):
+        time = time + dt + header.utc_offset
+        time.precision = precision
+        return time.gsb
+
+    columns = [gsb_strings(header.pc_time, header._pc_time_precision)]
+    if not rawdump:
+        columns += [gsb_strings(header.gps_time, 9),
+                    (header['seq_nr'] + frame_nr).astype(str),
+                    ((header['mem_block'] + frame_nr) % 8).astype(str)]
+    with io.open(name, 'wt') as fh:
+        fh.writelines(' '.join(line) + '\n' for line in zip(*columns))
+
+    # Payloads, with every raw file getting the same number of bytes.
+    encoder = GSBPayload._encoders[bps]
+    pool = _payload_pool(lambda rng: encoder(_random_data(
+        rng, payloadsize * 8 // bps)), rng)
+    step = max(CHUNK_SIZE // payloadsize, 1)
+    for raw_name in raw_names:
+        with io.open(raw_name, 'wb') as fh:
+            for start in range(0, nframe, step):
+                index = rng.randint(0, POOL_SIZE,
+                                    min(step, nframe - start))
+                fh.write(pool[index].tostring())
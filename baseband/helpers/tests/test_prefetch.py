@@ -0,0 +1,74 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import time
+import numpy as np
+from astropy.tests.helper import pytest
+
+from ..prefetch import PrefetchReader
+
+
+class TestPrefetchReader(object):
+    def setup(self):
+        self.data = np.arange(1000, dtype=np.uint8).tobytes()
+
+    @pytest.mark.parametrize(('blocksize', 'nblock', 'offset'),
+                             ((10, 1, 0), (10, 3, 5), (64, 2, 0),
+                              (7, 20, 3), (2000, 1, 0)))
+    def test_read(self, blocksize, nblock, offset):
+        with PrefetchReader(io.BytesIO(self.data), blocksize, nblock,
+                            offset=offset) as fh:
+            assert fh.tell() == 0
+            assert fh.read(3) == self.data[:3]
+            assert fh.tell() == 3
+            # Read in various chunks, with read-ahead happening in between.
+            for count in (1, 10, 11, 200):
+                pos = fh.tell()
+                assert fh.read(count) == self.data[pos:pos + count]
+                assert fh.tell() == pos + count
+            assert len(fh._blocks) <= nblock + 1
+            assert fh.seek(-20, 1) == 205
+            assert fh.read(30) == self.data[205:235]
+            assert fh.seek(-5, 2) == 995
+            assert fh.read(10) == self.data[995:]
+            assert fh.tell() == 1000
+            assert fh.read(10) == b''
+            fh.seek(500)
+            assert fh.read() == self.data[500:]
+            fh.seek(400)
+            assert fh.read(-1) == self.data[400:]
+            with pytest.raises(OSError):
+                fh.seek(-1)
+            with pytest.raises(ValueError):
+                fh.seek(0, 3)
+
+    def test_detach(self):
+        raw = io.BytesIO(self.data)
+        fh = PrefetchReader(raw, 10, 3)
+        assert fh.read(25) == self.data[:25]
+        # Attributes are looked up on the underlying file.
+        assert fh.getvalue() == self.data
+        assert fh.detach() is raw
+        assert not fh._thread.is_alive()
+        assert raw.tell() == 25
+        fh.close()
+        assert raw.closed
+
+    def test_read_prefetched_without_file_access(self):
+        fh = PrefetchReader(io.BytesIO(self.data), 10, 3)
+        assert fh.read(5) == self.data[:5]
+        for i in range(100):
+            with fh._cond:
+                if all(index in fh._blocks for index in range(4)):
+                    break
+            time.sleep(0.01)
+        # Prefetched blocks can be read while the file is in use.
+        with fh._file_lock:
+            assert fh.read(20) == self.data[5:25]
+        fh.close()
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            PrefetchReader(io.BytesIO(self.data), 10, 0)
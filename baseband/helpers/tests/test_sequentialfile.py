@@ -126,6 +126,48 @@ class TestSequentialFileReader(object):
             check = fh.read()
             assert check == self.data
 
+    def test_readinto(self):
+        with sf.open(self.files) as fh:
+            buf = bytearray(4)
+            assert fh.readinto(buf) == 4
+            assert buf == self.data[:4]
+            # Across two file boundaries.
+            buf = bytearray(20)
+            assert fh.readinto(buf) == 20
+            assert buf == self.data[4:24]
+            assert fh.tell() == 24
+            # Into an array, with only part available.
+            out = np.zeros(5, np.uint16)
+            fh.seek(8)
+            assert fh.readinto(out) == 10
+            assert out.view(np.uint8).tobytes() == self.data[8:18]
+            fh.seek(-2, 2)
+            assert fh.readinto(out) == 2
+            assert out.view(np.uint8)[:2].tobytes() == self.data[-2:]
+            assert fh.readinto(out) == 0
+            # Multi-dimensional arrays are filled in order.
+            out2 = np.zeros((2, 3), np.uint16)
+            fh.seek(4)
+            assert fh.readinto(out2) == 12
+            assert out2.view(np.uint8).tobytes() == self.data[4:16]
+            # But non-contiguous ones cannot be filled.
+            with pytest.raises(ValueError):
+                fh.readinto(out2[:, ::2])
+        # cannot read closed file
+        with pytest.raises(ValueError):
+            fh.readinto(buf)
+
+    def test_size_without_opening(self):
+        with sf.open(self.files) as fh:
+            fh.seek(3)
+            fh0 = fh.fh
+            assert fh.size == self.size
+            assert fh.fh is fh0
+            assert fh.tell() == 3
+            assert fh._file_sizes == self.sizes
+            assert fh._file_offsets == self.offsets
+            assert fh.read() == self.data[3:]
+
     def test_seek_read(self):
         with sf.open(self.files) as fh:
             fh.seek(8)
@@ -0,0 +1,177 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.tests.helper import pytest
+
+from ... import vdif, mark5b, mark4, gsb, dada
+from ...data import (SAMPLE_MARK5B, SAMPLE_MARK4, SAMPLE_DADA,
+                     SAMPLE_GSB_RAWDUMP_HEADER, SAMPLE_GSB_PHASED_HEADER)
+from ..synthetic import (generate_vdif, generate_mark5b, generate_mark4,
+                         generate_dada, generate_gsb)
+
+
+class TestSynthetic(object):
+    @pytest.mark.parametrize('edv', (False, 0, 1, 3, 0xab))
+    def test_vdif(self, edv, tmpdir):
+        kwargs = dict(edv=edv, time=Time('2018-01-01T00:00:00'),
+                      samples_per_frame=20000, bps=2, nchan=1, station='Ar',
+                      sample_rate=32 * u.MHz)
+        if edv == 0xab:
+            del kwargs['samples_per_frame']
+            kwargs.update(frame_length=1254, frame_nr=0)
+        if edv not in (1, 3):
+            del kwargs['sample_rate']
+        header = vdif.VDIFHeader.fromvalues(**kwargs)
+        name = str(tmpdir.join('synthetic.vdif'))
+        offsets = generate_vdif(name, header, 20, nthread=4,
+                                sample_rate=32 * u.MHz, invalid=[3], seed=1)
+        assert len(offsets) == 0
+        samples_per_frame = header.samples_per_frame
+        with vdif.open(name, 'rb') as fh:
+            for i in range(2 * 4):
+                frame = fh.read_frame()
+                assert frame.header['thread_id'] == i % 4
+                assert frame.header.get_time(
+                    sample_rate=32 * u.MHz) == header.time + (
+                        i // 4 * samples_per_frame / (32 * u.MHz))
+        with vdif.open(name, 'rs', sample_rate=32 * u.MHz) as fh:
+            assert fh.header0 == header
+            assert fh.sample_shape == (4,)
+            assert fh.size == 20 * samples_per_frame
+            assert abs(fh.stop_time - fh.start_time -
+                       20 * samples_per_frame / (32 * u.MHz)) < 1 * u.ns
+            data = fh.read()
+        frame3 = data[3 * samples_per_frame:4 * samples_per_frame]
+        assert np.all(frame3 == 0)
+        assert 1.5 < data[:3 * samples_per_frame].std() < 2.5
+
+    def test_vdif_gaps_corruption(self, tmpdir):
+        header = vdif.VDIFHeader.fromvalues(
+            edv=3, time=Time('2018-01-01T00:00:00'), samples_per_frame=20000,
+            bps=2, nchan=1, station='Ar', sample_rate=32 * u.MHz)
+        name = str(tmpdir.join('gaps.vdif'))
+        generate_vdif(name, header, 10, nthread=2, gaps=[0, 5], seed=1)
+        frame_nrs = []
+        with io.open(name, 'rb') as fh:
+            for i in range(16):
+                fh.seek(i * header.framesize)
+                frame_nrs.append(vdif.VDIFHeader.fromfile(fh)['frame_nr'])
+        assert frame_nrs == [i // 2 for i in range(2, 20) if i // 2 != 5]
+        # Same seed gives the same file; corruption only beyond the first
+        # frame set, and only in the bytes returned.
+        generate_vdif(name, header, 10, nthread=2, seed=1)
+        with io.open(name, 'rb') as fh:
+            raw = np.frombuffer(fh.read(), 'u1')
+        offsets = generate_vdif(name, header, 10, nthread=2, ncorrupt=20,
+                                seed=1)
+        assert 0 < len(offsets) <= 20
+        assert np.all(offsets >= 2 * header.framesize)
+        with io.open(name, 'rb') as fh:
+            corrupted = np.frombuffer(fh.read(), 'u1')
+        assert np.all(np.nonzero(corrupted != raw)[0] == offsets)
+
+    def test_mark5b(self, tmpdir):
+        with io.open(SAMPLE_MARK5B, 'rb') as fh:
+            header = mark5b.Mark5BHeader.fromfile(fh, kday=56000)
+        name = str(tmpdir.join('synthetic.m5b'))
+        generate_mark5b(name, header, 100, nchan=8, sample_rate=32 * u.MHz,
+                        invalid=[7], seed=2)
+        with mark5b.open(name, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32 * u.MHz) as fh:
+            assert fh.header0 == header
+            assert fh.size == 100 * 5000
+            data = fh.read()
+            fh.seek(50 * 5000)
+            assert fh.tell(unit='time') == header.time + 50 * 5000 / (
+                32 * u.MHz)
+            fh.read(1)
+            assert fh._frame.header['frame_nr'] == (
+                header['frame_nr'] + 50) % 6400
+        assert np.all(data[7 * 5000:8 * 5000] == 0)
+        assert 1.5 < data[:7 * 5000].std() < 2.5
+
+    @pytest.mark.parametrize(('ntrack', 'fanout'),
+                             ((16, 4), (32, 2), (32, 4), (64, 4)))
+    def test_mark4(self, ntrack, fanout, tmpdir):
+        header = mark4.Mark4Header.fromvalues(
+            ntrack=ntrack, samples_per_frame=20000 * fanout, bps=2,
+            time=Time('2018-01-01T00:00:10'))
+        name = str(tmpdir.join('synthetic.m4'))
+        generate_mark4(name, header, 20, sample_rate=32 * u.MHz,
+                       invalid=[3], seed=3)
+        frame_duration = header.samples_per_frame / (32 * u.MHz)
+        with mark4.open(name, 'rb') as fh:
+            for i in range(5):
+                frame = fh.read_frame(ntrack=ntrack, decade=2010)
+                expected = header.copy()
+                expected.update(time=header.time + i * frame_duration)
+                if i == 3:
+                    expected['communication_error'] = True
+                    expected.update()
+                assert frame.header == expected
+        with mark4.open(name, 'rs', ntrack=ntrack, decade=2010,
+                        sample_rate=32 * u.MHz) as fh:
+            assert fh.header0 == header
+            assert fh.size == 20 * header.samples_per_frame
+            data = fh.read()
+        samples_per_frame = header.samples_per_frame
+        assert np.all(data[3 * samples_per_frame:4 * samples_per_frame] == 0)
+        assert 1.5 < data[:3 * samples_per_frame].std() < 2.5
+
+    def test_mark4_invalid_time(self, tmpdir):
+        with io.open(SAMPLE_MARK4, 'rb') as fh:
+            fh.seek(0xa88)
+            header = mark4.Mark4Header.fromfile(fh, ntrack=64, decade=2010)
+        with pytest.raises(ValueError):
+            generate_mark4(str(tmpdir.join('bad.m4')), header, 2,
+                           sample_rate=31 * u.MHz)
+
+    def test_dada(self, tmpdir):
+        with io.open(SAMPLE_DADA, 'rb') as fh:
+            header = dada.DADAHeader.fromfile(fh)
+        header = header.copy()
+        header.payloadsize = 1 << 20
+        name = str(tmpdir.join('synthetic.dada'))
+        offsets = generate_dada(name, header, ncorrupt=3, seed=4)
+        assert np.all(offsets >= header.size)
+        with dada.open(name, 'rs') as fh:
+            assert fh.header0 == header
+            data = fh.read()
+        assert data.shape == ((1 << 20) // 4, 2)
+        assert 2.5 < data.std() < 3.
+
+    @pytest.mark.parametrize('mode', ('rawdump', 'phased'))
+    def test_gsb(self, mode, tmpdir):
+        if mode == 'rawdump':
+            header_name = SAMPLE_GSB_RAWDUMP_HEADER
+            raw = str(tmpdir.join('raw.dat'))
+            samples_per_frame = 1 << 12
+        else:
+            header_name = SAMPLE_GSB_PHASED_HEADER
+            raw = tuple(tuple(str(tmpdir.join('raw{0}{1}.dat'.format(p, i)))
+                              for i in range(2)) for p in 'LR')
+            samples_per_frame = 8
+        with io.open(header_name, 'rt') as fh:
+            header = gsb.GSBHeader.fromfile(fh)
+        sample_rate = samples_per_frame * (1e8 / 3) / 2**23 * u.Hz
+        name = str(tmpdir.join('synthetic.timestamp'))
+        generate_gsb(name, raw, header, 20, sample_rate=sample_rate,
+                     samples_per_frame=samples_per_frame, seed=5)
+        with gsb.open(name, 'rt') as fh:
+            for i in range(20):
+                timestamp = fh.read_timestamp()
+                assert abs(timestamp.time - header.time -
+                           i * samples_per_frame / sample_rate) < 1 * u.ns
+                if mode == 'phased':
+                    assert timestamp['seq_nr'] == header['seq_nr'] + i
+        with gsb.open(name, 'rs', raw=raw, sample_rate=sample_rate,
+                      samples_per_frame=samples_per_frame) as fh:
+            assert fh.header0 == header
+            assert fh.size == 20 * samples_per_frame
+            data = fh.read()
+        assert 1.5 < data.std() < 3.
@@ -5,9 +5,10 @@ import astropy.units as u
 
 from ..vlbi_base.base import (make_opener, VLBIFileBase, VLBIStreamReaderBase,
                               VLBIStreamWriterBase)
-from .header import Mark4Header
+from .header import (Mark4Header, stream2words, words2stream, check_crc,
+                     PAYLOADSIZE)
 from .payload import Mark4Payload
-from .frame import Mark4Frame
+from .frame import Mark4Frame, VALIDSTART
 
 
 __all__ = ['Mark4FileReader', 'Mark4FileWriter', 'Mark4StreamReader',
@@ -18,13 +19,23 @@ nbits = ((np.arange(256)[:, np.newaxis] >> np.arange(8) & 1)
          .sum(1).astype(np.int16))
 
 
+def _mark_invalid(frame):
+    """Mark a frame read from file as invalid (via its header error flags)."""
+    header = frame.header
+    mutable = header.mutable
+    header.mutable = True
+    frame.valid = False
+    header.mutable = mutable
+
+
 class Mark4FileReader(VLBIFileBase):
     """Simple reader for Mark 4 files.
 
     Adds ``read_frame`` and ``find_frame`` methods to the VLBI file wrapper.
     """
 
-    def read_frame(self, ntrack, decade=None, ref_time=None):
+    def read_frame(self, ntrack, decade=None, ref_time=None, memmap=False,
+                   verify=True):
         """Read a single frame (header plus payload).
 
         Parameters
@@ -37,6 +48,14 @@ class Mark4FileReader(VLBIFileBase):
         ref_time : `~astropy.time.Time`, or None, optional
             Reference time within 4 years of the observation time.  Used only
             if `decade` is ``None``.
+        memmap : bool, optional
+            If `True`, map the payload from the file rather than reading it,
+            so that its words are a view into a map of the whole file.
+            Default: `False`.
+        verify : bool or 'crc', optional
+            Whether to do basic checks of frame integrity.  If ``'crc'``, also
+            check the CRCs of the header, and mark the frame as invalid if any
+            is wrong.  Default: `True`.
 
         Returns
         -------
@@ -45,8 +64,13 @@ class Mark4FileReader(VLBIFileBase):
             :class:`~baseband.mark4.Mark4Header` and data encoded in the frame,
             respectively.
         """
-        return Mark4Frame.fromfile(self.fh_raw, ntrack, decade=decade,
-                                   ref_time=ref_time)
+        fh = self._fh_mapped if memmap else self.fh_raw
+        frame = Mark4Frame.fromfile(fh, ntrack, decade=decade,
+                                    ref_time=ref_time, verify=bool(verify),
+                                    memmap=memmap)
+        if verify == 'crc' and not check_crc(words2stream(frame.header.words)):
+            _mark_invalid(frame)
+        return frame
 
     def find_frame(self, ntrack, maximum=None, forward=True):
         """Look for the first occurrence of a frame, from the current position.
@@ -78,22 +102,91 @@ class Mark4FileReader(VLBIFileBase):
             successful.
         """
         fh = self.fh_raw
-        nset = np.ones(32 * ntrack // 8, dtype=np.int16)
-        nunset = np.ones(ntrack // 8, dtype=np.int16)
-        framesize = ntrack * 2500
         file_pos = fh.tell()
         fh.seek(0, 2)
         filesize = fh.tell()
-        if filesize < framesize:
+        search_range = self._frame_search_range(ntrack, file_pos, filesize,
+                                                maximum, forward)
+        if search_range is None:
             fh.seek(file_pos)
             return None
 
+        bit_counts = self._read_bit_counts(
+            search_range[0], search_range[1] + 33 * ntrack // 8 - 1)
+        frame_start = self._locate_frame(bit_counts, ntrack, search_range,
+                                         file_pos, filesize, forward)
+        fh.seek(file_pos if frame_start is None else frame_start)
+        return frame_start
+
+    def determine_ntrack(self, maximum=None):
+        """Determines the number of tracks, by seeking the next frame.
+
+        Looks for the first occurrence of a frame from the current position
+        for all supported ``ntrack`` values, as done by ``find_frame``, but
+        reading the part of the file searched only once.  Returns the first
+        ``ntrack`` for which a frame is found, leaving the file pointer at the
+        start of the frame.
+
+        Parameters
+        ----------
+        maximum : int, optional
+            Maximum number of bytes forward to search through.
+            Default is twice the framesize (20000 * ntrack // 8).
+
+        Returns
+        -------
+        ntrack : int or `None`
+            Number of tracks. `None` if no frame was found.
+        """
+        fh = self.fh_raw
+        file_pos = fh.tell()
+        fh.seek(0, 2)
+        filesize = fh.tell()
+        # Currently only 16, 32 and 64-track frames supported.
+        search_ranges = {}
+        for nt in 16, 32, 64:
+            search_range = self._frame_search_range(nt, file_pos, filesize,
+                                                    maximum, forward=True)
+            if search_range is not None:
+                search_ranges[nt] = search_range
+
+        if search_ranges:
+            # Read everything needed for all ntrack, including the start of
+            # the sync pattern of the next frame.
+            start = min(r[0] for r in search_ranges.values())
+            stop = min(max(r[1] + nt * 2500 + 34 * nt // 8
+                           for nt, r in search_ranges.items()), filesize)
+            bit_counts = self._read_bit_counts(start, stop)
+            for nt in sorted(search_ranges):
+                frame_start = self._locate_frame(
+                    bit_counts, nt, search_ranges[nt], file_pos, filesize,
+                    forward=True)
+                if frame_start is not None:
+                    fh.seek(frame_start)
+                    return nt
+
+        fh.seek(file_pos)
+        return None
+
+    @staticmethod
+    def _frame_search_range(ntrack, file_pos, filesize, maximum=None,
+                            forward=True):
+        """Range of offsets at which to look for the sync pattern.
+
+        This is the range covered by overlapping blocks of half a frame, going
+        forward or backward from ``file_pos``.  The offsets are those of the
+        system ID bits just before the sync pattern, 63 stream words into the
+        header.  Returns `None` if the file is too small.
+        """
+        framesize = ntrack * 2500
+        if filesize < framesize:
+            return None
+
         if maximum is None:
             maximum = 2 * framesize
-        # Loop over chunks to try to find the frame marker.
+        # Read a bit more at every step to ensure we don't miss a "split"
+        # header.
         step = framesize // 2
-        # read a bit more at every step to ensure we don't miss a "split"
-        # header
         block = step + 160 * ntrack // 8
         if forward:
             iterate = range(max(min(file_pos, filesize - block), 0),
@@ -105,75 +198,88 @@ class Mark4FileReader(VLBIFileBase):
                             min(max(file_pos - step - maximum - 1, -1),
                                 filesize - block),
                             -step)
-        for frame in iterate:
-            fh.seek(frame)
-
-            data = np.frombuffer(fh.read(block), dtype=np.uint8)
-            assert len(data) == block
-            # Find header pattern.
-            databits1 = nbits[data]
-            nosync = np.convolve(databits1[len(nunset):] < 6, nset, 'valid')
-            nolow = np.convolve(databits1[:-len(nset)] > 1, nunset, 'valid')
-            wrong = nosync + nolow
-            possibilities = np.where(wrong == 0)[0]
-            # check candidates by seeing whether there is a sync word
-            # a framesize ahead. (Note: loop can be empty)
-            for possibility in possibilities[::1 if forward else -1]:
-                # real start of possible header.
-                frame_start = frame + possibility - 63 * ntrack // 8
-                if (forward and frame_start < file_pos or
-                        not forward and frame_start > file_pos):
-                    continue
-                # check there is a header following this.
-                check = frame_start + framesize
-                if check >= filesize - 32 * 2 * ntrack // 8 - len(nunset):
-                    # but do before this one if we're beyond end of file.
-                    check = frame_start - framesize
-                    if check < 0:  # assume OK if only one frame fits in file.
-                        if frame_start + framesize > filesize:
-                            continue
-                        else:
-                            break
-
-                fh.seek(check + 32 * 2 * ntrack // 8)
-                check_data = np.frombuffer(fh.read(len(nunset)),
-                                           dtype=np.uint8)
-                databits2 = nbits[check_data]
-                if np.all(databits2 >= 6):
-                    break  # got it!
-
-            else:  # None of them worked, so do next block
-                continue
-
-            fh.seek(frame_start)
-            return frame_start
-
-        fh.seek(file_pos)
-        return None
-
-    def determine_ntrack(self, maximum=None):
-        """Determines the number of tracks, by seeking the next frame.
+        if len(iterate) == 0:
+            return None
+        # Number of sync pattern offsets that can be checked in a block.
+        noffset = block - 33 * ntrack // 8 + 1
+        return (min(iterate[0], iterate[-1]),
+                max(iterate[0], iterate[-1]) + noffset)
 
-        Uses ``find_frame`` to look for the first occurrence of a frame from
-        the current position for all supported ``ntrack`` values.  Returns the
-        first ``ntrack`` for which ``find_frame`` is successful, leaving the
-        file pointer at the start of the frame.
+    def _read_bit_counts(self, start, stop):
+        """Read part of the file, counting the bits set in every byte.
 
-        Parameters
-        ----------
-        maximum : int, optional
-            Maximum number of bytes forward to search through.
-            Default is the framesize (20000 * ntrack // 8).
+        Returns
+        -------
+        bit_counts : tuple
+            Start offset, number of bits set for every byte, and the
+            cumulative number of bytes with more than one bit set and with
+            fewer than six bits set (both starting with zero).
+        """
+        fh = self.fh_raw
+        fh.seek(start)
+        data = np.frombuffer(fh.read(stop - start), dtype=np.uint8)
+        assert len(data) == stop - start
+        databits = nbits[data]
+        nlow_ok = np.zeros(len(data) + 1, np.int32)
+        nlow_ok[1:] = np.cumsum(databits > 1)
+        nsync_ok = np.zeros(len(data) + 1, np.int32)
+        nsync_ok[1:] = np.cumsum(databits < 6)
+        return start, databits, nlow_ok, nsync_ok
+
+    def _locate_frame(self, bit_counts, ntrack, search_range, file_pos,
+                      filesize, forward=True):
+        """Find the first frame in a search range, given bit counts.
+
+        The search is for the pattern described in ``find_frame``, with
+        candidates confirmed by a sync pattern a frame ahead (or behind, near
+        the end of the file).
 
         Returns
         -------
-        ntrack : int or `None`
-            Number of tracks. `None` if no frame was found.
+        frame_start : int or None
+            Byte offset of the frame.  `None` if the search was not successful.
         """
-        # Currently only 32 and 64-track frames supported.
-        for nt in 16, 32, 64:
-            if self.find_frame(nt, maximum=maximum) is not None:
-                return nt
+        start, databits, nlow, nnosync = bit_counts
+        nunset = ntrack // 8
+        nset = 32 * ntrack // 8
+        framesize = ntrack * 2500
+        # Find header pattern: bytes with at most one bit set for the system
+        # ID, followed by bytes with at least six bits set for the sync word.
+        i0, i1 = search_range[0] - start, search_range[1] - start
+        nolow = nlow[i0+nunset:i1+nunset] - nlow[i0:i1]
+        nosync = (nnosync[i0+nunset+nset:i1+nunset+nset] -
+                  nnosync[i0+nunset:i1+nunset])
+        possibilities = search_range[0] + np.nonzero((nolow == 0) &
+                                                     (nosync == 0))[0]
+        # check candidates by seeing whether there is a sync word
+        # a framesize ahead. (Note: loop can be empty)
+        for possibility in possibilities[::1 if forward else -1]:
+            # real start of possible header.
+            frame_start = possibility - 63 * ntrack // 8
+            if (forward and frame_start < file_pos or
+                    not forward and frame_start > file_pos):
+                continue
+            # check there is a header following this.
+            check = frame_start + framesize
+            if check >= filesize - 32 * 2 * ntrack // 8 - nunset:
+                # but do before this one if we're beyond end of file.
+                check = frame_start - framesize
+                if check < 0:  # assume OK if only one frame fits in file.
+                    if frame_start + framesize > filesize:
+                        continue
+                    else:
+                        return frame_start
+
+            check += 32 * 2 * ntrack // 8
+            if start <= check and check + nunset <= start + len(databits):
+                databits2 = databits[check-start:check-start+nunset]
+            else:
+                fh = self.fh_raw
+                fh.seek(check)
+                databits2 = nbits[np.frombuffer(fh.read(nunset),
+                                                dtype=np.uint8)]
+            if np.all(databits2 >= 6):
+                return frame_start  # got it!
 
         return None
 
@@ -272,15 +378,35 @@ class Mark4StreamReader(VLBIStreamReaderBase, Mark4FileReader):
     squeeze : bool, optional
         If `True` (default), remove any dimensions of length unity from
         decoded data.
+    memmap : bool, optional
+        If `True`, map payloads from the file rather than reading them, which
+        avoids copying the raw data.  Default: `False`.
+    nthreads : int, optional
+        Number of threads to use for decoding large reads.  Default: 1.
+    prefetch : int, optional
+        Number of frames to read ahead in a background thread, so that
+        reading from disk overlaps with decoding.  Default: 0 (none).
+    cache_size : int, optional
+        Number of decoded frames to keep in a least-recently-used cache, which
+        speeds up repeated reads of overlapping parts.  Default: 0 (none).
+    verify : bool or 'crc', optional
+        Whether to do basic checks of frame integrity.  If ``'crc'``, also
+        check header CRCs (in bulk for many frames), and treat frames for
+        which they are wrong as invalid.  Default: `True`.
     """
 
     _frame_class = Mark4Frame
 
     def __init__(self, fh_raw, ntrack=None, decade=None, ref_time=None,
-                 thread_ids=None, sample_rate=None, squeeze=True):
+                 thread_ids=None, sample_rate=None, squeeze=True,
+                 memmap=False, nthreads=1,
+                 prefetch=0, cache_size=0, verify=True):
         # Pre-set fh_raw, so FileReader methods work
         # TODO: move this to StreamReaderBase?
         self.fh_raw = fh_raw
+        self._memmap = memmap
+        self.nthreads = nthreads
+        self.verify = verify
         # Find offset for first header, and ntrack if not specified.
         if ntrack is None:
             ntrack = self.determine_ntrack()
@@ -293,7 +419,8 @@ class Mark4StreamReader(VLBIStreamReaderBase, Mark4FileReader):
             assert self.offset0 is not None, (
                 "Could not find a first frame using ntrack={}. Perhaps "
                 "try ntrack=None for auto-determination.".format(ntrack))
-        self._frame = self.read_frame(ntrack, decade=decade, ref_time=ref_time)
+        self._frame = self.read_frame(ntrack, decade=decade, ref_time=ref_time,
+                                      memmap=memmap, verify=verify)
         self._frame_data = None
         self._frame_nr = None
         header = self._frame.header
@@ -304,6 +431,11 @@ class Mark4StreamReader(VLBIStreamReaderBase, Mark4FileReader):
             bps=header.bps, complex_data=False, thread_ids=thread_ids,
             samples_per_frame=header.samples_per_frame,
             sample_rate=sample_rate, squeeze=squeeze)
+        self.prefetch = prefetch
+        self.cache_size = cache_size
+
+    def _raw_frame_layout(self):
+        return self.offset0, self.header0.framesize
 
     @staticmethod
     def _get_frame_rate(fh, header_template):
@@ -378,33 +510,50 @@ class Mark4StreamReader(VLBIStreamReaderBase, Mark4FileReader):
             if count is None or count < 0:
                 count = self.size - self.offset
 
-            result = np.empty(self._sample_shape + (count,),
-                              dtype=self._frame.dtype).T
+            result = np.empty((count,) + self._sample_shape,
+                              dtype=self._frame.dtype)
             out = result.squeeze() if self.squeeze else result
         else:
             count = out.shape[0]
             result = self._unsqueeze(out) if self.squeeze else out
 
         offset0 = self.offset
-        while count > 0:
-            frame_nr, sample_offset = divmod(self.offset,
-                                             self.samples_per_frame)
-            if frame_nr != self._frame_nr:
-                self._read_frame()
-
-            # Set decoded value for invalid data.
-            self._frame.invalid_data_value = fill_value
-            # Decode data into array.
-            data = self._frame.data
-            if self.thread_ids:
-                data = data[:, self.thread_ids]
-            # Copy relevant data from frame into output.
-            nsample = min(count, self.samples_per_frame - sample_offset)
-            sample = self.offset - offset0
-            result[sample:sample + nsample] = data[sample_offset:
-                                                   sample_offset + nsample]
-            self.offset += nsample
-            count -= nsample
+        with self._decoding(count):
+            while count > 0:
+                frame_nr, sample_offset = divmod(self.offset,
+                                                 self.samples_per_frame)
+                nsample = min(count, self.samples_per_frame - sample_offset)
+                sample = self.offset - offset0
+                if self.cache_size:
+                    self._read_cached(result[sample:sample + nsample],
+                                      frame_nr, sample_offset, fill_value)
+                    self.offset += nsample
+                    count -= nsample
+                    continue
+
+                if frame_nr != self._frame_nr:
+                    self._read_frame()
+
+                # Set decoded value for invalid data.
+                self._frame.invalid_data_value = fill_value
+                # Only decode the selected channels.
+                item = ((slice(None), self.thread_ids) if self.thread_ids
+                        else ())
+                if nsample == self.samples_per_frame:
+                    # Decode complete frame directly into output.
+                    self._decode(nsample, self._frame.__getitem__, item,
+                                 result[sample:sample + nsample])
+                else:
+                    # Decode data into array.
+                    with self._timing('decode_time'):
+                        data = self._frame[item]
+                    self._count('samples_decoded', self.samples_per_frame)
+                    # Copy relevant data from frame into output.
+                    with self._timing('copy_time'):
+                        result[sample:sample + nsample] = data[
+                            sample_offset:sample_offset + nsample]
+                self.offset += nsample
+                count -= nsample
 
         return out
 
@@ -412,10 +561,40 @@ class Mark4StreamReader(VLBIStreamReaderBase, Mark4FileReader):
         frame_nr = self.offset // self.samples_per_frame
         self.fh_raw.seek(self.offset0 + frame_nr * self.header0.framesize)
         self._frame = self.read_frame(ntrack=self.header0.ntrack,
-                                      ref_time=self.header0.time)
+                                      ref_time=self.start_time,
+                                      memmap=self._memmap,
+                                      verify=bool(self.verify))
+        self._count('frames_read')
+        if self.verify == 'crc' and not self._crc_ok(frame_nr):
+            _mark_invalid(self._frame)
         # Convert payloads to data array.
         self._frame_nr = frame_nr
 
+    def _check_crcs(self, raw_headers):
+        return check_crc(raw_headers.view(self.header0.stream_dtype))
+
+    def _header_words(self, raw_headers):
+        # Words for all tracks, with shape (nframe, 5, ntrack).
+        words = stream2words(raw_headers.view(self.header0.stream_dtype))
+        return words.reshape(len(raw_headers), 5, -1)
+
+    def _same_stream(self, words):
+        parser = self.header0._header_parser
+        sync_pattern = parser.parsers['sync_pattern'](
+            np.rollaxis(words, -2))
+        return np.all(sync_pattern == parser.defaults['sync_pattern'], axis=-1)
+
+    def _decode_frame(self, frame_index):
+        self._read_frame()
+        if not self._frame.valid:
+            return None, None
+        data = self._frame[(slice(None), self.thread_ids)
+                           if self.thread_ids else ()]
+        # The part of the frame overwritten by the header is invalid.
+        invalid = np.zeros((len(data),) + (1,) * (data.ndim - 1), bool)
+        invalid[:len(data) - self._frame.payload.shape[0]] = True
+        return data, invalid
+
 
 class Mark4StreamWriter(VLBIStreamWriterBase, Mark4FileWriter):
     """VLBI Mark 4 format writer.
@@ -486,6 +665,8 @@ class Mark4StreamWriter(VLBIStreamWriterBase, Mark4FileWriter):
         sample = 0
         offset0 = self.offset
         frame = self._data
+        # Headers of complete frames in data, which are encoded together.
+        headers = []
         while count > 0:
             frame_nr, sample_offset = divmod(self.tell(),
                                              self.samples_per_frame)
@@ -501,13 +682,43 @@ class Mark4StreamWriter(VLBIStreamWriterBase, Mark4FileWriter):
             nsample = min(count, self.samples_per_frame - sample_offset)
             sample_end = sample_offset + nsample
             sample = self.offset - offset0
-            frame[sample_offset:sample_end] = data[sample:sample + nsample]
-            if sample_end == self.samples_per_frame:
-                self.write_frame(self._data, self._header)
+            if nsample == self.samples_per_frame:
+                if not headers:
+                    sample0 = sample
+                headers.append(self._header)
+            else:
+                frame[sample_offset:sample_end] = data[sample:sample + nsample]
+                if sample_end == self.samples_per_frame:
+                    self.write_frame(self._data, self._header)
 
             self.offset += nsample
             count -= nsample
 
+        if headers:
+            self._write_frames(
+                data[sample0:sample0 + len(headers) * self.samples_per_frame],
+                headers)
+
+    def _write_frames(self, data, headers):
+        """Encode and write complete frames.
+
+        Parameters
+        ----------
+        data : `~numpy.ndarray`
+            Data for all frames, with shape ``(nframe * samples_per_frame,
+            nchan)``.  The parts overwritten by the headers are ignored.
+        headers : list of `~baseband.mark4.Mark4Header`
+            Header for each frame.
+        """
+        nchan = self._sample_shape.nchan
+        valid_start = self.samples_per_frame * VALIDSTART // PAYLOADSIZE
+        data = (data.astype(self._data.dtype, copy=False)
+                .reshape(len(headers), self.samples_per_frame, nchan)
+                [:, valid_start:].reshape(-1, nchan))
+        encoder = Mark4Payload._encoders[nchan, self.bps,
+                                         self.header0.fanout]
+        self._write_encoded(headers, encoder(data))
+
 
 open = make_opener('Mark4', globals(), doc="""
 --- For reading a stream : (see `~baseband.mark4.base.Mark4StreamReader`)
@@ -531,6 +742,18 @@ sample_rate : `~astropy.units.Quantity`, optional
 squeeze : bool, optional
     If `True` (default), remove any dimensions of length unity from
     decoded data.
+memmap : bool, optional
+    If `True`, map payloads from the file rather than reading them.
+    Default: `False`.
+nthreads : int, optional
+    Number of threads to use for decoding large reads.  Default: 1.
+prefetch : int, optional
+    Number of frames to read ahead in a background thread.  Default: 0.
+cache_size : int, optional
+    Number of decoded frames to keep in a cache.  Default: 0.
+verify : bool or 'crc', optional
+    Whether to do basic checks of frame integrity, and, if ``'crc'``, to
+    treat frames with wrong header CRCs as invalid.  Default: `True`.
 
 --- For writing a stream : (see `~baseband.mark4.base.Mark4StreamWriter`)
 
@@ -100,7 +100,8 @@ class Mark4Frame(VLBIFrameBase):
             self.header['communication_error'] = True
 
     @classmethod
-    def fromfile(cls, fh, ntrack, decade=None, ref_time=None, verify=True):
+    def fromfile(cls, fh, ntrack, decade=None, ref_time=None, verify=True,
+                 memmap=False):
         """Read a frame from a filehandle.
 
         Parameters
@@ -118,10 +119,13 @@ class Mark4Frame(VLBIFrameBase):
 
         verify : bool
             Whether to do basic verification of integrity.  Default: `True`.
+        memmap : bool
+            If `True`, map the payload from the file rather than reading it
+            (see `~numpy.memmap`).  Default: `False`.
         """
         header = cls._header_class.fromfile(fh, ntrack, decade=decade,
                                             ref_time=ref_time, verify=verify)
-        payload = cls._payload_class.fromfile(fh, header=header)
+        payload = cls._payload_class.fromfile(fh, header=header, memmap=memmap)
         return cls(header, payload, verify=verify)
 
     @classmethod
@@ -147,29 +151,42 @@ class Mark4Frame(VLBIFrameBase):
 
         return cls(header, payload, verify=verify)
 
-    @property
-    def data(self):
-        """Decode the payload, setting the header to ``invalid_data_value``."""
-        data = np.empty(self.shape, self.dtype)
-        if self.valid:
-            valid_start = self.shape[0] * VALIDSTART // PAYLOADSIZE
-            data[:valid_start] = self.invalid_data_value
-            data[valid_start:] = self.payload.data
-        else:
-            data[...] = self.invalid_data_value
-        return data
-
     @property
     def shape(self):
         """Shape of the data held in the payload (samples_per_frame, nchan)."""
         return (self.payload.shape[0] * PAYLOADSIZE //
                 (PAYLOADSIZE - VALIDSTART),) + self.payload.shape[1:]
 
-    def __getitem__(self, item=()):
+    def __getitem__(self, item=(), out=None):
         if isinstance(item, six.string_types):
             return self.header.__getitem__(item)
+        elif item == () or item == slice(None):
+            payload_item = ()
+            shape = self.shape
+        elif (isinstance(item, tuple) and len(item) == 2 and
+              isinstance(item[0], slice) and item[0] == slice(None)):
+            # All samples of selected channels; only those get decoded.
+            payload_item = item
+            shape = (self.shape[0],) + np.empty(self.shape[1:],
+                                                bool)[item[1]].shape
         else:
             # Need to learn how to deal with invalid data part!  Hence,
             # we cannot just slice the payload like vlbi_base.frame.
             raise IndexError("{0} object can not be indexed or sliced yet."
                              .format(type(self)))
+
+        # Decode the frame, setting the part overwritten by the header
+        # to ``invalid_data_value``.  If ``out`` is given, the payload is
+        # decoded directly into it.
+        if out is None:
+            out = np.empty(shape, self.dtype)
+        if self.valid:
+            valid_start = self.shape[0] * VALIDSTART // PAYLOADSIZE
+            out[:valid_start] = self.invalid_data_value
+            self.payload.__getitem__(payload_item, out=out[valid_start:])
+        else:
+            out[...] = self.invalid_data_value
+        return out
+
+    data = property(__getitem__, doc="Decode the payload, setting the part "
+                    "covered by the header to ``invalid_data_value``.")
@@ -13,13 +13,12 @@ http://adsabs.harvard.edu/abs/2003ASPC..306..123W
 from __future__ import absolute_import, division, print_function
 
 import numpy as np
-from astropy.time import Time
 from astropy.extern import six
 
 from ..vlbi_base.header import HeaderParser, VLBIHeaderBase
 from ..vlbi_base.utils import bcd_decode, bcd_encode, CRC
 
-__all__ = ['CRC12', 'crc12', 'stream2words', 'words2stream',
+__all__ = ['CRC12', 'crc12', 'stream2words', 'words2stream', 'check_crc',
            'Mark4TrackHeader', 'Mark4Header']
 
 
@@ -88,6 +87,24 @@ def words2stream(words):
     return words.ravel()
 
 
+def check_crc(stream):
+    """Check the CRCs of one or more Mark 4 headers.
+
+    Parameters
+    ----------
+    stream : array of int
+        Header streams as returned by `words2stream` (or as read from file),
+        with the 160 bits along the last dimension.  For each int, every bit
+        corresponds to a particular track.
+
+    Returns
+    -------
+    ok : bool or array of bool
+        Whether the CRCs of all tracks are correct, for every header.
+    """
+    return crc12.check(np.rollaxis(np.asanyarray(stream), -1))
+
+
 class Mark4TrackHeader(VLBIHeaderBase):
     """Decoder/encoder of a Mark 4 Track Header.
 
@@ -163,6 +180,9 @@ class Mark4TrackHeader(VLBIHeaderBase):
             assert (1950 < self.decade < 3000)
             assert self.decade % 10 == 0, "decade must end in zero"
 
+    def copy(self, **kwargs):
+        return super(Mark4TrackHeader, self).copy(decade=self.decade, **kwargs)
+
     def infer_decade(self, ref_time):
         """Uses a reference time to set a header's ``decade``.
 
@@ -212,6 +232,19 @@ class Mark4TrackHeader(VLBIHeaderBase):
         'frac_sec', plus ``decade`` from the initialisation to calculate the
         time.  See http://www.haystack.mit.edu/tech/vlbi/mark5/docs/230.3.pdf
         """
+        from astropy.time import Time, TimeDelta
+        if isinstance(self['bcd_day'], np.ndarray):
+            # For a sequence of headers (see ``sequence_time``), calculate
+            # the start of the day from the year, and add the seconds.
+            year = self.decade - 1 + self['bcd_unit_year']
+            mjd = (365 * year + year // 4 - year // 100 + year // 400 -
+                   678576 + bcd_decode(self['bcd_day']))
+            seconds = (bcd_decode(self['bcd_hour']) * 3600 +
+                       bcd_decode(self['bcd_minute']) * 60 +
+                       bcd_decode(self['bcd_second']) + self.ms / 1000)
+            return (Time(mjd, format='mjd', scale='utc', precision=5) +
+                    TimeDelta(seconds, format='sec'))
+
         return Time('{decade:03d}{uy:1x}:{d:03x}:{h:02x}:{m:02x}:{s:08.5f}'
                     .format(decade=self.decade//10, uy=self['bcd_unit_year'],
                             d=self['bcd_day'], h=self['bcd_hour'],
@@ -674,8 +707,27 @@ class Mark4Header(Mark4TrackHeader):
         if len(set(self['bcd_fraction'])) == 1:
             return self[0].time
         else:
+            from astropy.time import Time
             return Time([h.time for h in self], precision=5)
 
+    def sequence_time(self, words):
+        """Times for a sequence of header words, with this as template.
+
+        Only the first track of each header is used.
+
+        Parameters
+        ----------
+        words : `~numpy.ndarray`
+            Header words, with shape ``(..., 5, ntrack)``.
+
+        Returns
+        -------
+        time : `~astropy.time.Time`
+            With the shape of ``words`` except for the last two dimensions.
+        """
+        return Mark4TrackHeader(np.rollaxis(words[..., 0], -1),
+                                decade=self.decade, verify=False).time
+
     def set_time(self, time):
         if time.isscalar:
             super(Mark4Header, self).set_time(time)
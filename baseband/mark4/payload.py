@@ -13,7 +13,8 @@ import sys
 import numpy as np
 from collections import namedtuple
 from ..vlbi_base.payload import VLBIPayloadBase
-from ..vlbi_base.encoding import encode_2bit_base, decoder_levels
+from ..vlbi_base.encoding import (encode_2bit_base, decoder_levels,
+                                  decoder_out)
 from .header import MARK4_DTYPES
 
 
@@ -99,8 +100,12 @@ nbits = ((np.arange(256)[:, np.newaxis] >> np.arange(8) & 1)
          .sum(1).astype(np.int16))
 
 
-def decode_2chan_2bit_fanout4(frame):
-    """Decode payload for 2 channels using 2 bits, fan-out 4 (16 tracks)."""
+def decode_2chan_2bit_fanout4(frame, out=None):
+    """Decode payload for 2 channels using 2 bits, fan-out 4 (16 tracks).
+
+    If given, the samples are stored in ``out``, which should be a contiguous
+    float32 array with shape (nsample, 2).  The other decoders are similar.
+    """
     # header['magnitude_bit'] = 00001111,00001111
     # makes sense with lut2bit3
     # header['fan_out'] = 01230123,01230123
@@ -112,7 +117,14 @@ def decode_2chan_2bit_fanout4(frame):
     # The look-up table splits each data word into the above 8 measurements,
     # the transpose pushes channels first and fanout last, and the reshape
     # flattens the fanout.
-    return lut2bit3.take(frame, axis=0).transpose(1, 0, 2).reshape(2, -1).T
+    if out is None:
+        return (lut2bit3.take(frame, axis=0)
+                .transpose(1, 0, 2).reshape(2, -1).T)
+    # For given output, do the reverse: set up a view with the layout of
+    # the look-up table output and let take fill it.
+    view = decoder_out(out, (-1, 4, 2))
+    lut2bit3.take(frame, axis=0, out=view.transpose(0, 2, 1), mode='clip')
+    return out
 
 
 def encode_2chan_2bit_fanout4(values):
@@ -129,7 +141,7 @@ def encode_2chan_2bit_fanout4(values):
     return out
 
 
-def decode_4chan_2bit_fanout4(frame):
+def decode_4chan_2bit_fanout4(frame, out=None):
     """Decode payload for 4 channels using 2 bits, fan-out 4 (32 tracks)."""
     # Bitwise reordering of tracks, to align sign and magnitude bits,
     # reshaping to get VLBI channels in sequential, but wrong order.
@@ -140,7 +152,11 @@ def decode_4chan_2bit_fanout4(frame):
     # Using transpose ensures channels are first, then time samples, then
     # those 4 measurements, so the reshape orders the samples correctly.
     # Another transpose ensures samples are the first dimension.
-    return lut2bit1.take(frame.T, axis=0).reshape(4, -1).T
+    if out is None:
+        return lut2bit1.take(frame.T, axis=0).reshape(4, -1).T
+    view = decoder_out(out, (-1, 4, 4))
+    lut2bit1.take(frame.T, axis=0, out=view.transpose(2, 0, 1), mode='clip')
+    return out
 
 
 def encode_4chan_2bit_fanout4(values):
@@ -155,7 +171,7 @@ def encode_4chan_2bit_fanout4(values):
     return reorder32(out).view('<u4')
 
 
-def decode_8chan_2bit_fanout2(frame):
+def decode_8chan_2bit_fanout2(frame, out=None):
     """Decode payload for 8 channels using 2 bits, fan-out 4 (32 tracks)."""
     # header['magnitude_bit'] = 00001111,00001111,00001111,00001111
     # makes sense with lut2bit3
@@ -173,8 +189,14 @@ def decode_8chan_2bit_fanout2(frame):
     # the transpose makes this channel&0x4, channel&0x3, time, sample.
     # the second reshape (which makes a copy) gets one just channel, time,
     # and the final transpose time, channel.
-    return (lut2bit3.take(frame, axis=0).reshape(-1, 4, 2, 2)
-            .transpose(3, 1, 0, 2).reshape(8, -1).T)
+    if out is None:
+        return (lut2bit3.take(frame, axis=0).reshape(-1, 4, 2, 2)
+                .transpose(3, 1, 0, 2).reshape(8, -1).T)
+    # Output is time, sample, channel&0x4, channel&0x3.
+    view = decoder_out(out, (-1, 2, 2, 4))
+    lut2bit3.reshape(-1, 2, 2).take(
+        frame, axis=0, out=view.transpose(0, 3, 1, 2), mode='clip')
+    return out
 
 
 def encode_8chan_2bit_fanout2(values):
@@ -192,7 +214,7 @@ def encode_8chan_2bit_fanout2(values):
     return out
 
 
-def decode_8chan_2bit_fanout4(frame):
+def decode_8chan_2bit_fanout4(frame, out=None):
     """Decode payload for 8 channels using 2 bits, fan-out 4 (64 tracks)."""
     # Bitwise reordering of tracks, to align sign and magnitude bits,
     # reshaping to get VLBI channels in sequential, but wrong order.
@@ -203,7 +225,11 @@ def decode_8chan_2bit_fanout4(frame):
     # Using transpose ensures channels are first, then time samples, then
     # those 4 measurements, so the reshape orders the samples correctly.
     # Another transpose ensures samples are the first dimension.
-    return lut2bit1.take(frame.T, axis=0).reshape(8, -1).T
+    if out is None:
+        return lut2bit1.take(frame.T, axis=0).reshape(8, -1).T
+    view = decoder_out(out, (-1, 4, 8))
+    lut2bit1.take(frame.T, axis=0, out=view.transpose(2, 0, 1), mode='clip')
+    return out
 
 
 def encode_8chan_2bit_fanout4(values):
@@ -264,17 +290,53 @@ class Mark4Payload(VLBIPayloadBase):
                                            complex_data=False)
         self._coder = (self.sample_shape.nchan, bps, fanout)
 
+    def _channel_layout(self):
+        """Locations of the encoded values of all channels of a sample.
+
+        For Mark 4, each payload word holds ``fanout`` samples of all
+        channels, with every byte encoding either 4 samples of a single
+        channel or 2 samples of 2 channels.  The latter is decoded with
+        ``lut2bit3``, the former with ``lut2bit1`` after bit reordering for
+        32 and 64 tracks (see ``_group_bytes``).
+        """
+        nchan, bps, fanout = self._coder
+        if self._coder not in self._decoders or bps != 2:
+            return None
+        channel = np.arange(nchan)
+        sample = np.arange(fanout)[:, np.newaxis]
+        if fanout == 2:
+            # Bytes hold ch&0x3, with sample and ch&0x4 in the values.
+            byte_index, value_index = channel & 3, sample * 2 + channel // 4
+        else:
+            # Bytes hold single channels (after reordering), with samples
+            # in the values.
+            byte_index, value_index = channel, sample
+        lut = lut2bit3 if nchan == 2 or fanout == 2 else lut2bit1
+        return (lut,) + tuple(np.broadcast_arrays(byte_index, value_index))
+
+    def _group_bytes(self, words):
+        """Get bytes of payload words, reordering as needed."""
+        if self._coder == (4, 2, 4):
+            words = reorder32(words.view(np.uint32))
+        elif self._coder == (8, 2, 4):
+            words = reorder64(words.view(np.uint64))
+        else:
+            return words.view(np.uint8).reshape(-1, words.dtype.itemsize)
+        # As in the decoders, bring the channels in the correct order.
+        order = np.array([0, 2, 1, 3, 4, 6, 5, 7])[:self._coder[0]]
+        return words.view(np.uint8).reshape(-1, len(order))[:, order]
+
     @classmethod
-    def fromfile(cls, fh, header):
+    def fromfile(cls, fh, header, memmap=False):
         """Read payload from file handle and decode it into data.
 
         The payloadsize, number of channels, bits per sample, and fanout ratio
-        are all taken from the header.
+        are all taken from the header.  If ``memmap`` is `True`, the payload
+        is mapped from the file rather than read (see `~numpy.memmap`).
         """
-        s = fh.read(header.payloadsize)
-        if len(s) < header.payloadsize:
-            raise EOFError("Could not read full payload.")
-        return cls(np.frombuffer(s, dtype=header.stream_dtype), header)
+        words = cls._words_fromfile(fh, header.payloadsize,
+                                    header.stream_dtype, memmap)
+        return cls(words, header)
 
     @classmethod
     def fromdata(cls, data, header):
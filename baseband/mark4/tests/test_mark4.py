@@ -1,6 +1,7 @@
 # Licensed under the GPLv3 - see LICENSE.rst
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import io
 import pytest
 import numpy as np
 import astropy.units as u
@@ -54,6 +55,10 @@ class TestMark4(object):
         assert np.all(stream[64:80] == 0xffffffffffffffff)
         assert mark4.header.crc12.check(stream)
         assert np.all(mark4.header.crc12(stream[:-12]) == stream[-12:])
+        assert mark4.header.check_crc(stream)
+        streams = np.array([stream] * 3)
+        streams[1, 150] ^= np.uint64(1 << 40)
+        assert np.all(mark4.header.check_crc(streams) == [True, False, True])
         words = mark4.header.stream2words(stream)
         assert np.all(mark4.header.words2stream(words) == stream)
 
@@ -305,6 +310,25 @@ class TestMark4(object):
         assert np.all(payload2[item] == sel_data)
         assert payload2 == payload
 
+    @pytest.mark.parametrize('item', ((slice(None), 5), (slice(None), [4, 1]),
+                                      (slice(3, 10), [7, 0, 2])))
+    def test_payload_getitem_channels(self, item):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            fh.seek(0xa88)
+            header = mark4.Mark4Header.fromfile(fh, ntrack=64, decade=2010)
+            payload = mark4.Mark4Payload.fromfile(fh, header)
+        assert np.all(payload[item] == payload.data[item])
+        # Check other decoders on random data.
+        words = np.random.RandomState(1).randint(
+            0, 256, size=64*8).astype(np.uint8)
+        for nchan, bps, fanout in mark4.Mark4Payload._decoders:
+            dtype = mark4.header.MARK4_DTYPES[nchan * bps * fanout]
+            payload = mark4.Mark4Payload(words.view(dtype), nchan=nchan,
+                                         bps=bps, fanout=fanout)
+            channels = np.array(item[1]) % nchan
+            assert np.all(payload[item[0], channels] ==
+                          payload.data[item[0], channels])
+
     def test_frame(self, tmpdir):
         with mark4.open(SAMPLE_FILE, 'rb') as fh:
             fh.seek(0xa88)
@@ -346,6 +370,21 @@ class TestMark4(object):
         # take the slice of the payload.
         with pytest.raises(IndexError):
             frame[10:20]
+        with pytest.raises(IndexError):
+            frame[10:20, 1]
+        # But selecting channels for all samples should.
+        assert np.all(frame[:, 1] == frame.data[:, 1])
+        assert np.all(frame[:, [5, 2]] == frame.data[:, [5, 2]])
+        frame6 = mark4.Mark4Frame(header.copy(), payload, valid=False)
+        assert frame6[:, [5, 2]].shape == (frame.shape[0], 2)
+        assert np.all(frame6[:, [5, 2]] == frame.invalid_data_value)
+        # Check decoding into a given output array.
+        out = np.empty_like(frame.data)
+        assert frame.__getitem__(out=out) is out
+        assert np.all(out == frame.data)
+        out2 = np.empty_like(out)
+        assert frame5.__getitem__(slice(None), out=out2) is out2
+        assert np.all(out2 == out)
 
         # Check passing in a reference time.
         with mark4.open(SAMPLE_FILE, 'rb') as fh:
@@ -360,6 +399,27 @@ class TestMark4(object):
                                    ref_time=Time('2019:1:9:00:00'))
             assert frame7 == frame
 
+    def test_frame_memmap(self):
+        with mark4.open(SAMPLE_FILE, 'rb') as fh:
+            fh.seek(0xa88)
+            frame = fh.read_frame(ntrack=64, decade=2010)
+        with mark4.open(SAMPLE_FILE, 'rb') as fh:
+            fh.seek(0xa88)
+            frame2 = fh.read_frame(ntrack=64, decade=2010, memmap=True)
+            assert fh.tell() == 0xa88 + frame.size
+        assert isinstance(frame2.payload.words, np.memmap)
+        assert frame2.payload.words.dtype == frame.payload.words.dtype
+        assert frame2 == frame
+        assert np.all(frame2.data == frame.data)
+
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010) as fh:
+            record = fh.read()
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                        memmap=True) as fh:
+            record2 = fh.read()
+            assert isinstance(fh._frame.payload.words, np.memmap)
+        assert np.all(record2 == record)
+
     def test_header_times(self):
         with mark4.open(SAMPLE_FILE, 'rb') as fh:
             fh.seek(0xa88)
@@ -370,6 +430,7 @@ class TestMark4(object):
             frame_rate = 32. * u.MHz / samples_per_frame
             frame_duration = 1. / frame_rate
             fh.seek(0xa88)
+            headers = []
             for frame_nr in range(100):
                 try:
                     frame = fh.read_frame(ntrack=64, decade=2010)
@@ -378,6 +439,23 @@ class TestMark4(object):
                 header_time = frame.header.time
                 expected = start_time + frame_nr * frame_duration
                 assert abs(header_time - expected) < 1. * u.ns
+                headers.append(frame.header)
+
+        # Check getting the times of all headers at once.
+        times = header0.sequence_time(np.array([h.words for h in headers]))
+        assert times.shape == (len(headers),)
+        assert np.all(abs(times - Time([h.time for h in headers])) < 1. * u.ns)
+        # Also across a leap second, using track headers.
+        track_header = header0[0].copy()
+        track_header.decade = 2010
+        times = (Time('2016-12-31T23:59:58', precision=5) +
+                 np.arange(0, 3.5, 0.5) * u.s)
+        words = []
+        for time in times:
+            track_header.time = time
+            words.append(np.array(track_header.words))
+        assert np.all(abs(track_header.sequence_time(np.array(words)) -
+                          times) < 1. * u.ns)
 
     def test_find_header(self, tmpdir):
         # Below, the tests set the file pointer to very close to a header,
@@ -493,6 +571,95 @@ class TestMark4(object):
             assert fh.fh_raw.tell() == offset0
             assert ntrack == 32
 
+        with open(SAMPLE_16TRACK, 'rb') as fh:
+            raw = fh.read()
+        # Prepend some junk, so that the frame is not at the expected offset.
+        junk = np.random.RandomState(1).randint(0, 256, 5000).astype('u1')
+        with mark4.open(io.BytesIO(junk.tobytes() + raw), 'rb') as fh:
+            offset0 = fh.find_frame(ntrack=16)
+            assert offset0 == 22124 + 5000
+            fh.seek(0)
+            ntrack = fh.determine_ntrack()
+            assert fh.fh_raw.tell() == offset0
+            assert ntrack == 16
+            # Beyond the last frame, nothing should be found, and the
+            # file pointer should be left where it was.
+            fh.seek(-1000, 2)
+            position = fh.fh_raw.tell()
+            assert fh.determine_ntrack() is None
+            assert fh.fh_raw.tell() == position
+
+    @pytest.mark.parametrize(('nthreads', 'thread_ids'),
+                             ((2, None), (3, [2, 5])))
+    def test_stream_nthreads(self, nthreads, thread_ids):
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz, thread_ids=thread_ids) as fh:
+            record = fh.read()
+            fh.seek(12345)
+            record1 = fh.read(80000)
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz, thread_ids=thread_ids,
+                        nthreads=nthreads) as fh:
+            record2 = fh.read()
+            fh.seek(12345)
+            record3 = fh.read(80000)
+        assert np.all(record2 == record)
+        assert np.all(record3 == record1)
+        if thread_ids:
+            # Only the selected channels are decoded.
+            with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                            sample_rate=32*u.MHz) as fh:
+                record4 = fh.read()
+            assert np.all(record == record4[:, thread_ids])
+            assert np.all(record1 == record4[12345:92345, thread_ids])
+
+    def test_stream_cache(self):
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz) as fh:
+            record = fh.read(fill_value=-3.)
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz, cache_size=1) as fh:
+            record1 = fh.read(fill_value=-3.)
+            fh.seek(79000)
+            record2 = fh.read(3000)
+            assert fh.cache_info() == (0, 4, 1, 1)
+        assert np.all(record1 == record)
+        assert np.all(record2[1000:1640] == 0.)
+        assert np.all(record2[:1000] == record[79000:80000])
+        assert np.all(record2[1640:] == record[80640:82000])
+
+    def test_stream_verify_crc(self, tmpdir):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            raw = bytearray(fh.read())
+        with mark4.open(SAMPLE_FILE, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz) as fh:
+            record = fh.read(fill_value=-9.)
+            offset0 = fh.offset0
+            framesize = fh.header0.framesize
+        # Corrupt a CRC bit of one track in the header of the second frame.
+        raw[offset0 + framesize + 150 * 8 + 3] ^= 0x4
+        corrupt = str(tmpdir.join('corrupt_crc.m4'))
+        with open(corrupt, 'wb') as fw:
+            fw.write(raw)
+        with mark4.open(corrupt, 'rb') as fh:
+            fh.seek(offset0 + framesize)
+            assert fh.read_frame(ntrack=64, decade=2010).valid
+            fh.seek(offset0 + framesize)
+            frame = fh.read_frame(ntrack=64, decade=2010, verify='crc')
+            assert not frame.valid
+            assert not frame.header.mutable
+            fh.seek(offset0)
+            assert fh.read_frame(ntrack=64, decade=2010, verify='crc').valid
+        with mark4.open(corrupt, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz, verify='crc') as fh:
+            record1 = fh.read(fill_value=-9.)
+            assert list(fh._crc_blocks[0]) == [True, False]
+        assert np.all(record1[:80000] == record[:80000])
+        assert np.all(record1[80000:] == -9.)
+        with mark4.open(corrupt, 'rs', ntrack=64, decade=2010,
+                        sample_rate=32*u.MHz) as fh:
+            assert np.all(fh.read(fill_value=-9.) == record)
+
     def test_filestreamer(self, tmpdir):
         with mark4.open(SAMPLE_FILE, 'rb') as fh:
             fh.seek(0xa88)
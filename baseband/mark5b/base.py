@@ -4,7 +4,7 @@ from astropy.utils import lazyproperty
 
 from ..vlbi_base.base import (VLBIFileBase, VLBIStreamReaderBase,
                               VLBIStreamWriterBase, make_opener)
-from .header import Mark5BHeader
+from .header import Mark5BHeader, check_crc
 from .payload import Mark5BPayload
 from .frame import Mark5BFrame
 
@@ -19,7 +19,8 @@ class Mark5BFileReader(VLBIFileBase):
     Adds ``read_frame`` and ``find_header`` methods to the VLBI file wrapper.
     """
 
-    def read_frame(self, nchan, bps=2, kday=None, ref_time=None):
+    def read_frame(self, nchan, bps=2, kday=None, ref_time=None,
+                   memmap=False, verify=True):
         """Read a single frame (header plus payload).
 
         Parameters
@@ -34,6 +35,14 @@ class Mark5BFileReader(VLBIFileBase):
         ref_time : `~astropy.time.Time`, or None, optional
             Reference time within 500 days of the observation time, used to
             infer the full MJD.  Used only if `kday` is ``None``.
+        memmap : bool, optional
+            If `True`, map the payload from the file rather than reading it,
+            so that its words are a view into a map of the whole file.
+            Default: `False`.
+        verify : bool or 'crc', optional
+            Whether to do basic checks of frame integrity.  If ``'crc'``, also
+            check the CRC of the header, and mark the frame as invalid if it
+            is wrong.  Default: `True`.
 
         Returns
         -------
@@ -41,8 +50,13 @@ class Mark5BFileReader(VLBIFileBase):
             With ``header`` and ``data`` properties that return the
             Mark5BHeader and data encoded in the frame, respectively.
         """
-        return Mark5BFrame.fromfile(self.fh_raw, nchan, bps=bps,
-                                    kday=kday, ref_time=ref_time)
+        fh = self._fh_mapped if memmap else self.fh_raw
+        frame = Mark5BFrame.fromfile(fh, nchan, bps=bps, kday=kday,
+                                     ref_time=ref_time, verify=bool(verify),
+                                     memmap=memmap)
+        if verify == 'crc' and not check_crc(frame.header.words):
+            frame.valid = False
+        return frame
 
     def find_header(self, template_header=None, framesize=None, kday=None,
                     maximum=None, forward=True):
@@ -93,12 +107,14 @@ class Mark5BFileReader(VLBIFileBase):
         fh.seek(0, 2)
         size = fh.tell()
         if forward:
-            iterate = range(file_pos, min(file_pos + maximum - 16,
-                                          size - framesize))
+            start = file_pos
+            stop = min(file_pos + maximum - 16, size - framesize)
         else:
-            iterate = range(min(file_pos, size - framesize),
-                            max(file_pos - maximum, -1), -1)
-
+            start = max(file_pos - maximum, -1) + 1
+            stop = min(file_pos, size - framesize) + 1
+        iterate = self._iter_candidates(start, stop, forward,
+                                        self._plausible_headers, framesize,
+                                        size)
         for frame in iterate:
             try:
                 fh.seek(frame)
@@ -134,6 +150,47 @@ class Mark5BFileReader(VLBIFileBase):
         fh.seek(file_pos)
         return None
 
+    def _plausible_headers(self, start, stop, framesize, size):
+        """Check which positions could hold a header.
+
+        A position is plausible if it starts with the sync pattern, and, if
+        there is space for another frame after it, if that frame also starts
+        with the sync pattern and has the same day and a frame number that
+        differs by at most one.
+
+        Parameters
+        ----------
+        start, stop : int
+            Range of positions in the file to check.
+        framesize : int
+            Size of a frame, in bytes.
+        size : int
+            Size of the file, in bytes.
+
+        Returns
+        -------
+        ok : `~numpy.ndarray`
+            Boolean array with length ``stop - start``, `False` for positions
+            at which no header can start.
+        """
+        count = stop - start
+        # Get words for all positions and for those a frame further on.
+        words = self._read_words(start, count + framesize, 4)
+        parsers = Mark5BHeader._header_parser.parsers
+        sync = (parsers['sync_pattern'](words) ==
+                Mark5BHeader._header_parser.defaults['sync_pattern'])
+        ok = sync[:count].copy()
+        # Number of positions for which the next frame will be compared.
+        npair = max(min(count, size - 16 - framesize - start + 1), 0)
+        if npair > 0:
+            jday = parsers['bcd_jday'](words)
+            frame_nr = parsers['frame_nr'](words).astype(np.int64)
+            this = slice(0, npair)
+            next_ = slice(framesize, framesize + npair)
+            ok[this] &= (sync[next_] & (jday[this] == jday[next_]) &
+                         (np.abs(frame_nr[this] - frame_nr[next_]) <= 1))
+        return ok
+
 
 class Mark5BFileWriter(VLBIFileBase):
     """Simple writer for Mark 5B files.
@@ -199,17 +256,38 @@ class Mark5BStreamReader(VLBIStreamReaderBase, Mark5BFileReader):
     squeeze : bool, optional
         If `True` (default), remove any dimensions of length unity from
         decoded data.
+    memmap : bool, optional
+        If `True`, map payloads from the file rather than reading them, which
+        avoids copying the raw data.  Default: `False`.
+    nthreads : int, optional
+        Number of threads to use for decoding large reads.  Default: 1.
+    prefetch : int, optional
+        Number of frames to read ahead in a background thread, so that
+        reading from disk overlaps with decoding.  Default: 0 (none).
+    cache_size : int, optional
+        Number of decoded frames to keep in a least-recently-used cache, which
+        speeds up repeated reads of overlapping parts.  Default: 0 (none).
+    verify : bool or 'crc', optional
+        Whether to do basic checks of frame integrity.  If ``'crc'``, also
+        check header CRCs (in bulk for many frames), and treat frames for
+        which they are wrong as invalid.  Default: `True`.
     """
 
     _frame_class = Mark5BFrame
 
     def __init__(self, fh_raw, nchan, bps=2, kday=None, ref_time=None,
-                 thread_ids=None, sample_rate=None, squeeze=True):
+                 thread_ids=None, sample_rate=None, squeeze=True,
+                 memmap=False, nthreads=1,
+                 prefetch=0, cache_size=0, verify=True):
         # Pre-set fh_raw, so FileReader methods work
         # TODO: move this to StreamReaderBase?
         self.fh_raw = fh_raw
+        self._memmap = memmap
+        self.nthreads = nthreads
+        self.verify = verify
         self._frame = self.read_frame(nchan=nchan, bps=bps,
-                                      ref_time=ref_time, kday=kday)
+                                      ref_time=ref_time, kday=kday,
+                                      memmap=memmap, verify=verify)
         self._frame_data = None
         header = self._frame.header
         sample_shape = (Mark5BPayload._sample_shape_maker(len(thread_ids)) if
@@ -219,6 +297,8 @@ class Mark5BStreamReader(VLBIStreamReaderBase, Mark5BFileReader):
             complex_data=False, thread_ids=thread_ids,
             samples_per_frame=header.payloadsize * 8 // bps // nchan,
             sample_rate=sample_rate, squeeze=squeeze)
+        self.prefetch = prefetch
+        self.cache_size = cache_size
 
     @lazyproperty
     def _last_header(self):
@@ -257,50 +337,87 @@ class Mark5BStreamReader(VLBIStreamReaderBase, Mark5BFileReader):
             if count is None or count < 0:
                 count = self.size - self.offset
 
-            result = np.empty(self._sample_shape + (count,),
-                              dtype=self._frame.dtype).T
+            result = np.empty((count,) + self._sample_shape,
+                              dtype=self._frame.dtype)
             out = result.squeeze() if self.squeeze else result
         else:
             count = out.shape[0]
             result = self._unsqueeze(out) if self.squeeze else out
 
         offset0 = self.offset
-        while count > 0:
-            dt, frame_nr, sample_offset = self._frame_info()
-            dt_expected = (self._frame.seconds - self.header0.seconds +
-                           86400 * (self._frame.kday + self._frame.jday -
-                                    self.header0.kday - self.header0.jday))
-            if(dt != dt_expected or
-               frame_nr != self._frame['frame_nr']):
-                # Read relevant frame, reusing data array from previous frame.
-                self._read_frame()
+        with self._decoding(count):
+            while count > 0:
+                dt, frame_nr, sample_offset = self._frame_info()
+                nsample = min(count, self.samples_per_frame - sample_offset)
+                sample = self.offset - offset0
+                if self.cache_size:
+                    self._read_cached(result[sample:sample + nsample],
+                                      self.offset // self.samples_per_frame,
+                                      sample_offset, fill_value)
+                    self.offset += nsample
+                    count -= nsample
+                    continue
+
                 dt_expected = (self._frame.seconds - self.header0.seconds +
                                86400 * (self._frame.kday + self._frame.jday -
                                         self.header0.kday - self.header0.jday))
-                assert dt == dt_expected
-                assert frame_nr == self._frame['frame_nr']
-
-            # Set decoded value for invalid data.
-            self._frame.invalid_data_value = fill_value
-            # Decode data into array.
-            data = self._frame.data
-            if self.thread_ids:
-                data = data[:, self.thread_ids]
-            # Copy relevant data from frame into output.
-            nsample = min(count, self.samples_per_frame - sample_offset)
-            sample = self.offset - offset0
-            result[sample:sample + nsample] = data[sample_offset:
-                                                   sample_offset + nsample]
-            self.offset += nsample
-            count -= nsample
+                if(dt != dt_expected or
+                   frame_nr != self._frame['frame_nr']):
+                    # Read relevant frame, reusing data array from previous
+                    # frame.
+                    self._read_frame()
+                    dt_expected = (
+                        self._frame.seconds - self.header0.seconds +
+                        86400 * (self._frame.kday + self._frame.jday -
+                                 self.header0.kday - self.header0.jday))
+                    assert dt == dt_expected
+                    assert frame_nr == self._frame['frame_nr']
+
+                # Set decoded value for invalid data.
+                self._frame.invalid_data_value = fill_value
+                # Decode relevant data from frame directly into output.
+                data_slice = slice(sample_offset, sample_offset + nsample)
+                if self.thread_ids:
+                    data_slice = (data_slice, self.thread_ids)
+                self._decode(nsample, self._frame.__getitem__, data_slice,
+                             result[sample:sample + nsample])
+                self.offset += nsample
+                count -= nsample
 
         return out
 
     def _read_frame(self, fill_value=0.):
-        self.fh_raw.seek(self.offset // self.samples_per_frame *
-                         self._frame.size)
+        frame_index = self.offset // self.samples_per_frame
+        self.fh_raw.seek(frame_index * self._frame.size)
         self._frame = self.read_frame(nchan=self._sample_shape.nchan,
-                                      bps=self.bps, ref_time=self.header0.time)
+                                      bps=self.bps, ref_time=self.start_time,
+                                      memmap=self._memmap,
+                                      verify=bool(self.verify))
+        self._count('frames_read')
+        if self.verify == 'crc' and not self._crc_ok(frame_index):
+            self._frame.valid = False
+
+    def _check_crcs(self, raw_headers):
+        return check_crc(raw_headers.view('<u4'))
+
+    def _same_stream(self, words):
+        parser = self.header0._header_parser
+        return (parser.parsers['sync_pattern'](np.rollaxis(words, -1)) ==
+                parser.defaults['sync_pattern'])
+
+    def _decode_frame(self, frame_index):
+        self._read_frame()
+        # Check the frame before it can end up in the cache.
+        dt, frame_nr, _ = self._frame_info(frame_index *
+                                           self.samples_per_frame)
+        assert dt == (self._frame.seconds - self.header0.seconds +
+                      86400 * (self._frame.kday + self._frame.jday -
+                               self.header0.kday - self.header0.jday))
+        assert frame_nr == self._frame['frame_nr']
+        if not self._frame.valid:
+            return None, None
+        data = self._frame.data
+        return (data[:, self.thread_ids] if self.thread_ids else data), None
 
 
 class Mark5BStreamWriter(VLBIStreamWriterBase, Mark5BFileWriter):
@@ -377,6 +494,16 @@ class Mark5BStreamWriter(VLBIStreamWriterBase, Mark5BFileWriter):
         frame = self._data
         while count > 0:
             dt, frame_nr, sample_offset = self._frame_info()
+            if sample_offset == 0 and count >= self.samples_per_frame:
+                # Encode and write all complete frames in one go.
+                nsample = count - count % self.samples_per_frame
+                sample = self.offset - offset0
+                self._write_frames(data[sample:sample + nsample],
+                                   valid=not invalid_data)
+                self.offset += nsample
+                count -= nsample
+                continue
+
             if sample_offset == 0:
                 # set up header for new frame.
                 self._header = self.header0.copy()
@@ -399,6 +526,35 @@ class Mark5BStreamWriter(VLBIStreamWriterBase, Mark5BFileWriter):
             self.offset += nsample
             count -= nsample
 
+    def _write_frames(self, data, valid=True):
+        """Encode and write complete frames, starting at the offset.
+
+        Parameters
+        ----------
+        data : `~numpy.ndarray`
+            Data for all frames, with shape ``(nframe * samples_per_frame,
+            nchan)``.
+        valid : bool
+            Whether the data are valid.  If not, the payloads are set to the
+            fill pattern.
+        """
+        nframe = len(data) // self.samples_per_frame
+        # Calculate all headers at once from the first one.
+        offsets = self.offset + np.arange(nframe) * self.samples_per_frame
+        dt, frame_nr, _ = self._frame_info(offsets)
+        header_words = self.header0.sequence_words(
+            time=self.start_time + (offsets / self.sample_rate).to(u.s),
+            frame_nr=frame_nr)
+        if valid:
+            encoder = Mark5BPayload._encoders[self.bps]
+            words = (encoder(data.astype(self._data.dtype, copy=False))
+                     .ravel().view(Mark5BPayload._dtype_word))
+        else:
+            words = np.full(data.size * self.bps // 32,
+                            Mark5BFrame._fill_pattern,
+                            Mark5BPayload._dtype_word)
+        self._write_encoded(header_words, words)
+
 
 open = make_opener('Mark5B', globals(), doc="""
 --- For reading a stream : (see `~baseband.mark5b.base.Mark5BStreamReader`)
@@ -423,6 +579,18 @@ sample_rate : `~astropy.units.Quantity`, optional
 squeeze : bool, optional
     If `True` (default), remove any dimensions of length unity from
     decoded data.
+memmap : bool, optional
+    If `True`, map payloads from the file rather than reading them.
+    Default: `False`.
+nthreads : int, optional
+    Number of threads to use for decoding large reads.  Default: 1.
+prefetch : int, optional
+    Number of frames to read ahead in a background thread.  Default: 0.
+cache_size : int, optional
+    Number of decoded frames to keep in a cache.  Default: 0.
+verify : bool or 'crc', optional
+    Whether to do basic checks of frame integrity, and, if ``'crc'``, to
+    treat frames with wrong header CRCs as invalid.  Default: `True`.
 
 --- For writing a stream : (see `~baseband.mark5b.base.Mark5BStreamWriter`)
 
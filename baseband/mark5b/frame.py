@@ -70,7 +70,7 @@ class Mark5BFrame(VLBIFrameBase):
 
     @classmethod
     def fromfile(cls, fh, nchan, bps=3, kday=None, ref_time=None, valid=None,
-                 verify=True):
+                 verify=True, memmap=False):
         """Read a frame from a filehandle.
 
         Parameters
@@ -89,10 +89,14 @@ class Mark5BFrame(VLBIFrameBase):
             infer the full MJD.  Used only if `kday` is ``None``.
         verify : bool
             Whether to do basic checks of frame integrity (default: `True`).
+        memmap : bool
+            If `True`, map the payload from the file rather than reading it
+            (see `~numpy.memmap`).  Default: `False`.
         """
         header = cls._header_class.fromfile(fh, kday=kday, ref_time=ref_time,
                                             verify=verify)
-        payload = cls._payload_class.fromfile(fh, nchan=nchan, bps=bps)
+        payload = cls._payload_class.fromfile(fh, nchan=nchan, bps=bps,
+                                              memmap=memmap)
         return cls(header, payload, valid, verify)
 
     @classmethod
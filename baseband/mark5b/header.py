@@ -12,13 +12,12 @@ from __future__ import (absolute_import, division, print_function,
 
 import numpy as np
 import astropy.units as u
-from astropy.time import Time
 
 from ..vlbi_base.header import HeaderParser, VLBIHeaderBase, four_word_struct
 from ..vlbi_base.utils import bcd_decode, bcd_encode, CRC
 
 
-__all__ = ['CRC16', 'crc16', 'Mark5BHeader']
+__all__ = ['CRC16', 'crc16', 'check_crc', 'Mark5BHeader']
 
 CRC16 = 0x18005
 """CRC polynomial used for Mark 5B Headers, as a check on the time code.
@@ -33,6 +32,27 @@ https://en.wikipedia.org/wiki/Cyclic_redundancy_check
 crc16 = CRC(CRC16)
 
 
+def check_crc(words):
+    """Check the CRCs of one or more Mark 5B headers.
+
+    Parameters
+    ----------
+    words : array of uint32
+        Header words, with the four words of each header along the last
+        dimension.
+
+    Returns
+    -------
+    ok : bool or array of bool
+        Whether the CRC is correct, for every header.
+    """
+    # The CRC covers the time code in word 2 and the upper half of word 3,
+    # and is stored in the lower half of word 3.
+    octets = np.ascontiguousarray(np.asanyarray(words)[..., 2:], '>u4')
+    stream = np.unpackbits(octets.view(np.uint8), axis=-1).astype(bool)
+    return crc16.check(np.rollaxis(stream, -1))
+
+
 class Mark5BHeader(VLBIHeaderBase):
     """Decoder/encoder of a Mark5B Frame Header.
 
@@ -124,13 +144,16 @@ class Mark5BHeader(VLBIHeaderBase):
         if calculate_crc:
             # Do not use words 2 & 3 directly, so that this works also if part
             # of a VDIF header, where the time information is in words 7 & 8.
-            stream = '{:012b}{:020b}{:016b}'.format(self['bcd_jday'],
-                                                    self['bcd_seconds'],
-                                                    self['bcd_fraction'])
-            stream = np.array([int(b) for b in stream], dtype=np.uint8)
-            crc = crc16(stream)
-            self['crc'] = int(''.join(['{:1d}'.format(c) for c in crc]),
-                              base=2)
+            # For a sequence of headers (see ``sequence_words``), the values
+            # are arrays, and the CRCs are calculated in parallel.
+            value = ((np.int64(self['bcd_jday']) << 36) |
+                     (np.int64(self['bcd_seconds']) << 16) |
+                     self['bcd_fraction'])
+            bits = np.arange(47, -1, -1).reshape((-1,) + (1,) * value.ndim)
+            stream = ((value >> bits) & 1).astype(bool)
+            crc = np.bitwise_or.reduce(
+                crc16(stream).astype(np.int64) << bits[-16:], axis=0)
+            self['crc'] = crc if crc.ndim else int(crc)
             if verify:
                 self.verify()
 
@@ -205,7 +228,8 @@ class Mark5BHeader(VLBIHeaderBase):
     def ns(self, ns):
         # From inspecting sample files, the fraction appears to be truncated,
         # not rounded.
-        fraction = int(ns / 100000)
+        fraction = (int(ns / 100000) if np.isscalar(ns) else
+                    (ns // 100000).astype(np.int64))
         self['bcd_fraction'] = bcd_encode(fraction)
 
     def get_time(self, framerate=None, frame_nr=None):
@@ -243,7 +267,7 @@ class Mark5BHeader(VLBIHeaderBase):
             if frame_nr is None:
                 frame_nr = self['frame_nr']
 
-            if frame_nr == 0:
+            if not np.any(frame_nr):
                 offset = 0.
             else:
                 if framerate is None:
@@ -251,14 +275,25 @@ class Mark5BHeader(VLBIHeaderBase):
                                      "frame number requires a frame rate. "
                                      "Pass it in explicitly.")
                 offset = (frame_nr / framerate).to(u.s).value
+        from astropy.time import Time
         return Time(self.kday + self.jday, (self.seconds + offset) / 86400,
                     format='mjd', scale='utc', precision=9)
 
     def set_time(self, time):
-        self.kday = int(time.mjd // 1000) * 1000
-        self.jday = int(time.mjd - self.kday)
-        ns = int(round((time - Time(self.kday + self.jday, format='mjd')).sec *
-                       1e9))
+        from astropy.time import Time
+        if time.isscalar:
+            self.kday = int(time.mjd // 1000) * 1000
+            self.jday = int(time.mjd - self.kday)
+            ns = int(round((time - Time(self.kday + self.jday,
+                                        format='mjd')).sec * 1e9))
+        else:
+            # For a sequence of headers (see ``sequence_words``).
+            kday = time.mjd // 1000 * 1000
+            jday = (time.mjd - kday).astype(np.int64)
+            ns = np.round((time - Time(kday + jday, format='mjd')).sec *
+                          1e9).astype(np.int64)
+            self.kday = int(kday.flat[0])
+            self.jday = jday
         sec, ns = divmod(ns, 1000000000)
         self.seconds = sec
         self.ns = ns
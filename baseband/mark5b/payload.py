@@ -12,7 +12,8 @@ from __future__ import (absolute_import, division, print_function,
 import numpy as np
 from collections import namedtuple
 from ..vlbi_base.payload import VLBIPayloadBase
-from ..vlbi_base.encoding import encode_2bit_base, decoder_levels
+from ..vlbi_base.encoding import (encode_2bit_base, decoder_levels,
+                                  decoder_out)
 
 
 __all__ = ['init_luts', 'decode_2bit', 'encode_2bit',
@@ -72,9 +73,11 @@ lut1bit, lut2bit = init_luts()
 
 
 # Decoders keyed by bits_per_sample, complex_data:
-def decode_2bit(words):
+def decode_2bit(words, out=None):
     b = words.view(np.uint8)
-    return lut2bit.take(b, axis=0)
+    if out is not None:
+        out = decoder_out(out, b.shape + (4,))
+    return lut2bit.take(b, axis=0, out=out, mode='clip')
 
 
 shift2bit = np.arange(0, 8, 2).astype(np.uint8)
@@ -1,12 +1,14 @@
 # Licensed under the GPLv3 - see LICENSE.rst
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import io
 import pytest
 import numpy as np
 import astropy.units as u
 from astropy.time import Time
 from astropy.tests.helper import catch_warnings
 from ... import mark5b
+from ...vlbi_base.base import INSTRUMENT_KEYS
 from ...vlbi_base.encoding import OPTIMAL_2BIT_HIGH
 from ...data import SAMPLE_MARK5B as SAMPLE_FILE
 
@@ -54,6 +56,15 @@ from ...data import SAMPLE_MARK5B as SAMPLE_FILE
 
 
 class TestMark5B(object):
+    def test_check_crc(self):
+        with mark5b.open(SAMPLE_FILE, 'rb') as fh:
+            header = mark5b.Mark5BHeader.fromfile(fh, kday=56000)
+        assert mark5b.header.check_crc(header.words)
+        words = np.array([header.words] * 3)
+        words[1, 3] ^= 0x1
+        words[2, 2] ^= 0x100
+        assert np.all(mark5b.header.check_crc(words) == [True, False, False])
+
     def test_header(self, tmpdir):
         with open(SAMPLE_FILE, 'rb') as fh:
             header = mark5b.Mark5BHeader.fromfile(fh, kday=56000)
@@ -250,6 +261,283 @@ class TestMark5B(object):
         assert frame8.valid is False
         assert np.all(frame8.payload.words == 0x11223344)
 
+    def test_frame_memmap(self):
+        with mark5b.open(SAMPLE_FILE, 'rb') as fh:
+            frame = fh.read_frame(nchan=8, bps=2, kday=56000)
+            frame1 = fh.read_frame(nchan=8, bps=2, kday=56000)
+        with mark5b.open(SAMPLE_FILE, 'rb') as fh:
+            frame2 = fh.read_frame(nchan=8, bps=2, kday=56000, memmap=True)
+            assert fh.tell() == frame.size
+            frame3 = fh.read_frame(nchan=8, bps=2, kday=56000, memmap=True)
+        assert isinstance(frame2.payload.words, np.memmap)
+        assert frame2 == frame
+        assert frame3 == frame1
+        assert frame3.payload.words.base is frame2.payload.words.base
+        assert np.all(frame2.data == frame.data)
+
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            record = fh.read()
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz, memmap=True) as fh:
+            record2 = fh.read()
+            assert isinstance(fh._frame.payload.words, np.memmap)
+        assert np.all(record2 == record)
+
+    @pytest.mark.parametrize(('nthreads', 'memmap'),
+                             ((2, False), (3, True), (4, False)))
+    def test_stream_nthreads(self, nthreads, memmap):
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            record = fh.read()
+            fh.seek(1234)
+            record1 = fh.read(7000)
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz, memmap=memmap,
+                         nthreads=nthreads) as fh:
+            assert fh.nthreads == nthreads
+            record2 = fh.read()
+            fh.seek(1234)
+            record3 = fh.read(7000)
+            with pytest.raises(ValueError):
+                fh.nthreads = 0
+        assert np.all(record2 == record)
+        assert np.all(record3 == record1)
+
+    def test_stream_cache(self, tmpdir):
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            record = fh.read()
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz, cache_size=2) as fh:
+            # Alternate between overlapping windows; after the first pass,
+            # everything should come from the cache.
+            for i in range(3):
+                fh.seek(1000)
+                assert np.all(fh.read(6000) == record[1000:7000])
+                fh.seek(4000)
+                assert np.all(fh.read(3000) == record[4000:7000])
+            assert fh.cache_info() == (10, 2, 2, 2)
+            # Invalid frames are filled with the requested value.
+            fh._frame_cache[1] = (None, None)
+            fh.seek(4990)
+            record1 = fh.read(20, fill_value=-7.)
+            assert np.all(record1[:10] == record[4990:5000])
+            assert np.all(record1[10:] == -7.)
+
+        # A frame with the wrong frame number is not silently cached, but
+        # leads to the same error as when reading without the cache.
+        with open(SAMPLE_FILE, 'rb') as fh:
+            raw = bytearray(fh.read())
+        raw[10016 + 4] ^= 1
+        bad_file = str(tmpdir.join('bad_frame_nr.m5b'))
+        with open(bad_file, 'wb') as fw:
+            fw.write(raw)
+        for cache_size in (0, 2):
+            with mark5b.open(bad_file, 'rs', nchan=8, bps=2, kday=56000,
+                             sample_rate=32*u.MHz,
+                             cache_size=cache_size) as fh:
+                with pytest.raises(AssertionError):
+                    fh.read()
+                if cache_size:
+                    assert 1 not in fh._frame_cache
+
+    @pytest.mark.parametrize('use_bytesio', (False, True))
+    def test_stream_verify_crc(self, tmpdir, use_bytesio):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            raw = bytearray(fh.read())
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            record = fh.read()
+            framesize = fh.header0.framesize
+        # Corrupt the CRC of the third frame.
+        raw[2 * framesize + 12] ^= 0x10
+        filename = str(tmpdir.join('corrupt_crc.m5b'))
+        with open(filename, 'wb') as fw:
+            fw.write(raw)
+
+        def corrupt():
+            # Files that cannot be mapped have their headers read instead.
+            return io.BytesIO(bytes(raw)) if use_bytesio else filename
+
+        with mark5b.open(corrupt(), 'rb') as fh:
+            fh.seek(2 * framesize)
+            assert fh.read_frame(nchan=8).valid
+            fh.seek(2 * framesize)
+            assert not fh.read_frame(nchan=8, verify='crc').valid
+            fh.seek(framesize)
+            assert fh.read_frame(nchan=8, verify='crc').valid
+        with mark5b.open(corrupt(), 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz, verify='crc') as fh:
+            assert fh.verify == 'crc'
+            record1 = fh.read(fill_value=-9.)
+            assert set(fh._crc_blocks) == {0}
+            assert list(fh._crc_blocks[0]) == [True, True, False, True]
+        assert np.all(record1[:10000] == record[:10000])
+        assert np.all(record1[10000:15000] == -9.)
+        assert np.all(record1[15000:] == record[15000:])
+        # By default, the CRC is not checked.
+        with mark5b.open(corrupt(), 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            assert np.all(fh.read() == record)
+
+    def test_stream_index(self, tmpdir):
+        filename = str(tmpdir.join('index.m5b'))
+        with open(SAMPLE_FILE, 'rb') as fh, open(filename, 'wb') as fw:
+            fw.write(fh.read())
+        with mark5b.open(filename, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            assert fh._index is None
+            last_header = fh._last_header
+            stop_time = fh.stop_time
+            record = fh.read()
+            index_name = fh.build_index()
+            assert fh._index is not None
+        assert index_name == filename + '.index.npz'
+        with np.load(index_name) as index:
+            assert index['frame_rate'] == 6400.
+            assert index['last_header_offset'] == 3 * 10016
+
+        # The file is too short to determine the sample rate, but with the
+        # index present, it is not needed.
+        with mark5b.open(filename, 'rs', nchan=8, bps=2, kday=56000) as fh:
+            assert fh.sample_rate == 32 * u.MHz
+            assert fh._index is not None
+            assert fh._last_header == last_header
+            assert fh.stop_time == stop_time
+            fh.seek(-100, 2)
+            assert np.all(fh.read() == record[-100:])
+
+        # A corrupt index is ignored.
+        with open(index_name, 'rb') as fr:
+            index_bytes = fr.read()
+        with open(index_name, 'wb') as fw:
+            fw.write(index_bytes[:len(index_bytes) // 2])
+        with mark5b.open(filename, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            assert fh._index is None
+            assert fh._last_header == last_header
+        with open(index_name, 'wb') as fw:
+            fw.write(index_bytes)
+
+        # An index for another format, or an out-of-date one, is ignored.
+        with mark5b.open(filename, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            fh._index_version = 0
+            assert fh._index is None
+        with open(filename, 'ab') as fw:
+            fw.write(b'\0' * 100)
+        with pytest.raises(EOFError):
+            mark5b.open(filename, 'rs', nchan=8, bps=2, kday=56000)
+
+        # Indices can only be built for named files.
+        with open(filename, 'rb') as fr:
+            raw = io.BytesIO(fr.read())
+        with mark5b.open(raw, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            assert fh._index is None
+            with pytest.raises(ValueError):
+                fh.build_index()
+
+    @pytest.mark.parametrize(('block_size', 'overlap', 'reuse_buffer'),
+                             ((6000, 0, False), (6000, 1000, True),
+                              (5000, 0, True), (7000, 4999, False)))
+    def test_stream_iter_blocks(self, block_size, overlap, reuse_buffer):
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            record = fh.read()
+            fh.seek(100)
+            start = 100
+            nblock = 0
+            previous = None
+            for block in fh.iter_blocks(block_size, overlap=overlap,
+                                        reuse_buffer=reuse_buffer):
+                stop = min(start + block_size, len(record))
+                assert block.shape == (stop - start, 8)
+                assert np.all(block == record[start:stop])
+                if previous is not None:
+                    assert (np.may_share_memory(block, previous) is
+                            reuse_buffer)
+                previous = block
+                start += block_size - overlap
+                nblock += 1
+            assert stop == len(record)
+            assert nblock == -(-(len(record) - 100 - overlap) //
+                               (block_size - overlap))
+            assert fh.tell() == len(record)
+            assert list(fh.iter_blocks(1000)) == []
+            with pytest.raises(ValueError):
+                next(fh.iter_blocks(1000, overlap=1000))
+            with pytest.raises(TypeError):
+                next(fh.iter_blocks(1000, out=np.empty((1000, 8))))
+
+    @pytest.mark.parametrize('prefetch', (1, 3))
+    def test_stream_prefetch(self, prefetch):
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            record = fh.read()
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz, prefetch=prefetch) as fh:
+            assert fh.prefetch == prefetch
+            record1 = np.concatenate([fh.read(3000) for i in range(6)])
+            fh.seek(1234)
+            record2 = fh.read(7000)
+            fh.prefetch = 0
+            assert fh.prefetch == 0
+            assert fh.fh_raw.tell() == 2 * fh.header0.framesize
+            fh.seek(0)
+            record3 = fh.read()
+        assert np.all(record1 == record[:18000])
+        assert np.all(record2 == record[1234:8234])
+        assert np.all(record3 == record)
+        with pytest.raises(ValueError):
+            mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                        sample_rate=32*u.MHz, memmap=True, prefetch=2)
+
+    def test_stream_instrument(self, tmpdir):
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2, kday=56000,
+                         sample_rate=32*u.MHz) as fh:
+            assert fh.instrument is False
+            assert fh.instrument_info() is None
+            header0 = fh.header0
+            record = fh.read()
+            fh.instrument = True
+            fh.seek(0)
+            assert np.all(fh.read() == record)
+            info = fh.instrument_info()
+            assert set(info) == set(INSTRUMENT_KEYS)
+            assert info['seeks'] == 1
+            assert info['frames_read'] == 4
+            assert info['bytes_read'] == 4 * header0.framesize
+            assert info['samples_decoded'] == len(record)
+            assert info['decode_time'] > 0
+            assert info['bytes_written'] == info['cache_hits'] == 0
+            fh.instrument_clear()
+            assert set(fh.instrument_info().values()) == {0}
+            # Cache and prefetch can be combined with instrumentation.
+            fh.cache_size = 2
+            fh.prefetch = 1
+            for i in range(2):
+                fh.seek(1000)
+                assert np.all(fh.read(6000) == record[1000:7000])
+            info = fh.instrument_info()
+            assert info['seeks'] == 2
+            assert info['cache_hits'] == 2
+            assert info['cache_misses'] == info['frames_read'] == 2
+            assert info['copy_time'] > 0
+            fh.prefetch = 0
+            fh.instrument = False
+            assert fh.instrument_info() is None
+            assert fh.fh_raw.name == SAMPLE_FILE
+        filename = str(tmpdir.join('instrument.m5b'))
+        with mark5b.open(filename, 'ws', header=header0, nchan=8, bps=2,
+                         sample_rate=32*u.MHz) as fw:
+            fw.instrument = True
+            fw.write(record)
+            info = fw.instrument_info()
+        assert info['bytes_written'] == 4 * header0.framesize
+        assert info['bytes_read'] == 0
+
     def test_header_times(self):
         with mark5b.open(SAMPLE_FILE, 'rb') as fh:
             header0 = mark5b.Mark5BHeader.fromfile(fh, kday=56000)
@@ -258,6 +546,7 @@ class TestMark5B(object):
             frame_rate = 32. * u.MHz / samples_per_frame
             frame_duration = 1. / frame_rate
             fh.seek(0)
+            headers = []
             while True:
                 try:
                     frame = fh.read_frame(nchan=8, bps=2, kday=56000)
@@ -267,6 +556,16 @@ class TestMark5B(object):
                 expected = (start_time +
                             frame.header['frame_nr'] * frame_duration)
                 assert abs(header_time - expected) < 1. * u.ns
+                headers.append(frame.header)
+
+        # Check getting the times of all headers at once.
+        words = np.array([h.words for h in headers])
+        times = header0.sequence_time(words)
+        assert times.shape == (len(headers),)
+        assert np.all(abs(times - Time([h.time for h in headers])) < 1. * u.ns)
+        times = header0.sequence_time(words, frame_rate)
+        assert np.all(abs(times - Time([h.get_time(frame_rate)
+                                        for h in headers])) < 1. * u.ns)
 
         # On the last frame, also check one can recover the time if 'frac_sec'
         # is not set.
@@ -285,6 +584,23 @@ class TestMark5B(object):
         with pytest.raises(ValueError):
             header.get_time(frame_nr=1)
 
+    def test_header_sequence_words(self):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            header0 = mark5b.Mark5BHeader.fromfile(fh, kday=56000)
+        # Times crossing a day boundary, with frame numbers to match.
+        offsets = np.arange(-5, 5) * 0.25
+        times = (Time(header0.time.mjd // 1 + 1, format='mjd') +
+                 offsets * u.s)
+        frame_nr = (offsets % 1 * 4).astype(int)
+        words = header0.sequence_words(time=times, frame_nr=frame_nr)
+        assert words.shape == (10, 4)
+        for time, nr, w in zip(times, frame_nr, words):
+            header = header0.copy()
+            header.update(time=time, frame_nr=nr)
+            assert np.all(w == header.words)
+            header = mark5b.Mark5BHeader(w, kday=header0.kday, verify=True)
+            assert abs(header.time - time) < 1. * u.ns
+
     def test_find_header(self, tmpdir):
         # Below, the tests set the file pointer to very close to a header,
         # since otherwise they run *very* slow.  This is somehow related to
@@ -336,6 +652,35 @@ class TestMark5B(object):
             assert fh.tell() == 0
         assert header_10 == header0
 
+    @pytest.mark.parametrize('block_size', (1 << 16, 5000, 3))
+    def test_find_header_blocks(self, tmpdir, block_size):
+        # Make a file with a gap and some junk, which should be skipped
+        # independent of the size of the blocks searched.
+        with open(SAMPLE_FILE, 'rb') as f:
+            raw = f.read()
+        framesize = 10016
+        junk = np.random.RandomState(1).randint(0, 256, 3000, np.uint8)
+        m5_test = str(tmpdir.join('test_blocks.m5b'))
+        with open(m5_test, 'wb') as s:
+            s.write(raw[:framesize + 5000] + junk.tobytes() +
+                    raw[2 * framesize:])
+        with mark5b.open(m5_test, 'rb') as fh:
+            fh._search_block_size = block_size
+            ok = fh._plausible_headers(0, 3 * framesize, framesize,
+                                       len(raw) - 2016)
+            # The second frame is followed by junk, so not confirmed.
+            assert list(np.nonzero(ok)[0]) == [0, 2 * framesize - 2016,
+                                               3 * framesize - 2016]
+            fh.seek(10)
+            header = fh.find_header(framesize=framesize, kday=56000)
+            assert fh.tell() == 2 * framesize - 2016
+            assert header['frame_nr'] == 2
+            fh.seek(-5000, 2)
+            header = fh.find_header(framesize=framesize, kday=56000,
+                                    forward=False)
+            assert fh.tell() == 3 * framesize - 2016
+            assert header['frame_nr'] == 3
+
     def test_filestreamer(self, tmpdir):
         with open(SAMPLE_FILE, 'rb') as fh:
             header = mark5b.Mark5BHeader.fromfile(fh, kday=56000)
@@ -518,6 +863,27 @@ class TestMark5B(object):
                          sample_rate=32*u.MHz, kday=56000) as fh:
             assert np.all(fh.read(20000) == record[:, 0])
 
+    def test_stream_write_batched(self, tmpdir):
+        # Complete frames are encoded together; check that validity is
+        # still tracked per frame.
+        with mark5b.open(SAMPLE_FILE, 'rs', nchan=8, bps=2,
+                         sample_rate=32*u.MHz, kday=56000) as fh:
+            record = fh.read()
+            header = fh.header0
+        m5_test = str(tmpdir.join('test.m5b'))
+        with mark5b.open(m5_test, 'ws', header=header, nchan=8,
+                         sample_rate=32*u.MHz) as fw:
+            fw.write(record[:5000])
+            fw.write(record[5000:10000], invalid_data=True)
+            fw.write(record[10000:10001])
+            fw.write(record[10001:])
+        with mark5b.open(m5_test, 'rs', nchan=8, bps=2,
+                         sample_rate=32*u.MHz, kday=56000) as fh:
+            check = fh.read(fill_value=-999.)
+        assert np.all(check[5000:10000] == -999.)
+        assert np.all(check[:5000] == record[:5000])
+        assert np.all(check[10000:] == record[10000:])
+
     def test_stream_invalid(self):
         with pytest.raises(ValueError):
             mark5b.open('ts.dat', 's')
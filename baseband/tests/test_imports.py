@@ -0,0 +1,41 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import os
+import sys
+import subprocess
+
+import baseband
+
+
+# Reading raw headers and frames should not need astropy.time, which is
+# only imported when a time is actually requested.
+READ_WITHOUT_TIME = """
+import sys
+from baseband import vdif, mark5b, mark4, dada
+from baseband.data import (SAMPLE_VDIF, SAMPLE_MARK5B, SAMPLE_MARK4,
+                           SAMPLE_DADA)
+with vdif.open(SAMPLE_VDIF, 'rb') as fh:
+    fh.read_frameset()
+with mark5b.open(SAMPLE_MARK5B, 'rb') as fh:
+    fh.read_frame(nchan=8, kday=56000)
+with mark4.open(SAMPLE_MARK4, 'rb') as fh:
+    fh.seek(0xa88)
+    fh.read_frame(ntrack=64, decade=2010)
+with dada.open(SAMPLE_DADA, 'rb') as fh:
+    header = fh.read_frame().header
+assert 'astropy.time' not in sys.modules
+header.time
+assert 'astropy.time' in sys.modules
+"""
+
+
+def test_read_without_astropy_time():
+    # Run in a separate process, so that no modules have been imported yet.
+    path = [os.path.dirname(os.path.dirname(os.path.abspath(
+        baseband.__file__)))]
+    env = dict(os.environ)
+    if env.get('PYTHONPATH'):
+        path.append(env['PYTHONPATH'])
+    env['PYTHONPATH'] = os.pathsep.join(path)
+    subprocess.check_call([sys.executable, '-c', READ_WITHOUT_TIME], env=env)
@@ -1,12 +1,12 @@
 # Licensed under the GPLv3 - see LICENSE.rst
 import numpy as np
 from astropy.utils import lazyproperty
-import astropy.units as u
 from collections import namedtuple
 
 from ..vlbi_base.base import (make_opener, VLBIFileBase, VLBIStreamBase,
                               VLBIStreamReaderBase, VLBIStreamWriterBase)
-from .header import VDIFHeader
+from .header import VDIFHeader, VDIFBaseHeader, VDIF_HEADER_CLASSES
+from .payload import VDIFPayload
 from .frame import VDIFFrame, VDIFFrameSet
 
 
@@ -66,9 +66,16 @@ class VDIFFileReader(VLBIFileBase):
     Adds ``read_frame`` and ``read_frameset`` methods on top of a binary
     file reader (which is wrapped as ``self.fh_raw``).
     """
-    def read_frame(self):
+    def read_frame(self, memmap=False):
         """Read a single frame (header plus payload).
 
+        Parameters
+        ----------
+        memmap : bool, optional
+            If `True`, map the payload from the file rather than reading it,
+            so that its words are a view into a map of the whole file.
+            Default: `False`.
+
         Returns
         -------
         frame : `~baseband.vdif.VDIFFrame`
@@ -76,9 +83,11 @@ class VDIFFileReader(VLBIFileBase):
             :class:`~baseband.vdif.VDIFHeader` and data encoded in the frame,
             respectively.
         """
-        return VDIFFrame.fromfile(self.fh_raw)
+        fh = self._fh_mapped if memmap else self.fh_raw
+        return VDIFFrame.fromfile(fh, memmap=memmap)
 
-    def read_frameset(self, thread_ids=None, sort=True, edv=None, verify=True):
+    def read_frameset(self, thread_ids=None, sort=True, edv=None, verify=True,
+                      memmap=False):
         """Read a single frame (header plus payload).
 
         Parameters
@@ -93,6 +102,10 @@ class VDIFFileReader(VLBIFileBase):
             improves file integrity checking.)
         verify : bool, optional
             Whether to do (light) sanity checks on the header. Default: True.
+        memmap : bool, optional
+            If `True`, map the payloads from the file rather than reading them,
+            so that their words are views into a map of the whole file.
+            Default: `False`.
 
         Returns
         -------
@@ -101,8 +114,60 @@ class VDIFFileReader(VLBIFileBase):
             :class:`~baseband.vdif.VDIFHeaders` and the data encoded in the
             frame set, respectively.
         """
-        return VDIFFrameSet.fromfile(self.fh_raw, thread_ids, sort=sort,
-                                     edv=edv, verify=verify)
+        fh = self._fh_mapped if memmap else self.fh_raw
+        return VDIFFrameSet.fromfile(fh, thread_ids, sort=sort, edv=edv,
+                                     verify=verify, memmap=memmap)
+
+    def index(self):
+        """Index all frames in the file, decoding their headers in one go.
+
+        Assumes that all frames in the file have the same size as the first
+        one.  The file is mapped in memory, and header information is
+        extracted for all frames at once using the header parsers.
+
+        Returns
+        -------
+        index : `~numpy.ndarray`
+            Structured array with one element per frame, with fields
+            'seconds', 'frame_nr', 'thread_id', 'invalid_data', and 'edv'
+            (which is -1 for legacy headers).
+
+        Notes
+        -----
+        The file pointer is restored to its original position.
+        """
+        fh = self.fh_raw
+        offset = fh.tell()
+        try:
+            fh.seek(0)
+            header0 = VDIFHeader.fromfile(fh)
+            framesize = header0.framesize
+            fh.seek(0, 2)
+            nframe = fh.tell() // framesize
+            fh.seek(0)
+            try:
+                raw = self._fh_mapped.memmap(shape=(nframe, framesize))
+            except (AttributeError, IOError, ValueError):
+                # Not a regular file; fall back to reading.
+                fh.seek(0)
+                raw = np.frombuffer(fh.read(nframe * framesize),
+                                    dtype=np.uint8).reshape(nframe, -1)
+        finally:
+            fh.seek(offset)
+
+        # Get all header words, as an (8, nframe) array.
+        words = raw[:, :32].copy().view('<u4').T
+        parsers = VDIFBaseHeader._header_parser.parsers
+        index = np.empty(nframe, dtype=[('seconds', '<u4'),
+                                        ('frame_nr', '<u4'),
+                                        ('thread_id', '<u2'),
+                                        ('invalid_data', '?'),
+                                        ('edv', '<i2')])
+        for key in ('seconds', 'frame_nr', 'thread_id', 'invalid_data'):
+            index[key] = parsers[key](words)
+        index['edv'] = np.where(parsers['legacy_mode'](words), -1,
+                                parsers['edv'](words))
+        return index
 
     def find_header(self, template_header=None, framesize=None, edv=None,
                     maximum=None, forward=True):
@@ -136,14 +201,17 @@ class VDIFFileReader(VLBIFileBase):
         file_pos = fh.tell()
         fh.seek(0, 2)
         size = fh.tell()
-        # Generate file pointer positions to test.
+        # Determine file pointer positions to test.
         if forward:
-            iterate = range(file_pos, min(file_pos + maximum - 31,
-                                          size - framesize + 1))
+            start = file_pos
+            stop = min(file_pos + maximum - 31, size - framesize + 1)
         else:
-            iterate = range(min(file_pos, size - framesize),
-                            max(file_pos - maximum, -1), -1)
-        # Loop over chunks to try to find the frame marker.
+            start = max(file_pos - maximum, -1) + 1
+            stop = min(file_pos, size - framesize) + 1
+        iterate = self._iter_candidates(start, stop, forward,
+                                        self._plausible_headers, framesize,
+                                        edv, template_header)
+        # Loop over plausible positions to try to find the frame marker.
         for frame in iterate:
             fh.seek(frame)
             try:
@@ -185,6 +253,55 @@ class VDIFFileReader(VLBIFileBase):
         fh.seek(file_pos)
         return None
 
+    def _plausible_headers(self, start, stop, framesize, edv=None,
+                           template_header=None):
+        """Check which positions could hold a header consistent with input.
+
+        Parameters
+        ----------
+        start, stop : int
+            Range of positions in the file to check.
+        framesize : int
+            Size of a frame, in bytes.
+        edv : int, False, or None
+            Extended data version; if `None`, any version is allowed.
+        template_header : `~baseband.vdif.VDIFHeader`, optional
+            If given, the keys that should be invariant within a stream are
+            checked as well.
+
+        Returns
+        -------
+        ok : `~numpy.ndarray`
+            Boolean array with length ``stop - start``, `False` for positions
+            at which no such header can start.
+        """
+        words = self._read_words(start, stop - start, 8)
+        parsers = VDIFBaseHeader._header_parser.parsers
+        legacy = parsers['legacy_mode'](words)
+        header_edv = parsers['edv'](words)
+        ok = parsers['frame_length'](words) * 8 == framesize
+        if template_header is not None:
+            edv = template_header.edv
+            for key in template_header._stream_invariants:
+                ok &= parsers[key](words) == template_header[key]
+
+        if edv is False:
+            ok &= legacy
+        elif edv is not None:
+            ok &= ~legacy & (header_edv == edv)
+
+        # Headers with a sync pattern should have it set correctly.
+        for header_class in set(VDIF_HEADER_CLASSES.values()):
+            header_parser = header_class._header_parser
+            if(header_class._edv is False or 'sync_pattern' not in
+               header_parser or edv not in (None, header_class._edv)):
+                continue
+            ok &= (legacy | (header_edv != header_class._edv) |
+                   (header_parser.parsers['sync_pattern'](words) ==
+                    header_parser.defaults['sync_pattern']))
+
+        return ok
+
 
 class VDIFFileWriter(VLBIFileBase):
     """Simple writer for VDIF files.
@@ -297,10 +414,23 @@ class VDIFStreamReader(VDIFStreamBase, VLBIStreamReaderBase, VDIFFileReader):
     squeeze : bool, optional
         If `True` (default), remove any dimensions of length unity from
         decoded data.
+    memmap : bool, optional
+        If `True`, map payloads from the file rather than reading them, which
+        avoids copying the raw data.  Default: `False`.
+    nthreads : int, optional
+        Number of threads to use for decoding large reads.  Default: 1.
+    prefetch : int, optional
+        Number of frame sets to read ahead in a background thread, so that
+        reading from disk overlaps with decoding.  Default: 0 (none).
+    cache_size : int, optional
+        Number of decoded frame sets to keep in a least-recently-used cache,
+        which speeds up repeated reads of overlapping parts.  Default: 0
+        (none).
     """
 
     def __init__(self, fh_raw, thread_ids=None, sample_rate=None,
-                 squeeze=True):
+                 squeeze=True, memmap=False, nthreads=1,
+                 prefetch=0, cache_size=0):
         # We use the very first header in the file, since in some VLBA files
         # not all the headers have the right time.  Hopefully, the first is
         # least likely to have problems...
@@ -311,16 +441,46 @@ class VDIFStreamReader(VDIFStreamBase, VLBIStreamReaderBase, VDIFFileReader):
         # TODO: make this a bit less ugly. Can we not just super first?
         fh_raw.seek(0)
         self.fh_raw = fh_raw
-        self._frameset = self.read_frameset(thread_ids)
+        self._memmap = memmap
+        self.nthreads = nthreads
+        self._frameset = self.read_frameset(thread_ids, memmap=memmap)
         if thread_ids is None:
             thread_ids = [fr['thread_id'] for fr in self._frameset.frames]
         self._framesetsize = fh_raw.tell()
         super(VDIFStreamReader, self).__init__(fh_raw, header, thread_ids,
                                                sample_rate, squeeze)
+        self.prefetch = prefetch
+        self.cache_size = cache_size
+
+    def _raw_frame_layout(self):
+        return 0, self._framesetsize
+
+    _index_keys = VLBIStreamReaderBase._index_keys + ('thread_order',)
+
+    def _index_entries(self):
+        index = super(VDIFStreamReader, self)._index_entries()
+        if self._thread_order is not None:
+            index['thread_order'] = self._thread_order
+        return index
+
+    def _same_stream(self, words):
+        header0 = self.header0
+        parsers = header0._header_parser.parsers
+        words = np.rollaxis(words, -1)
+        ok = parsers['legacy_mode'](words) == header0['legacy_mode']
+        if not header0['legacy_mode']:
+            ok &= parsers['edv'](words) == header0.edv
+        for key in header0._stream_invariants:
+            ok &= parsers[key](words) == header0[key]
+        return ok
 
     @lazyproperty
     def _last_header(self):
         """Last header of the file."""
+        last_header = self._indexed_last_header()
+        if last_header is not None:
+            return last_header
+
         raw_offset = self.fh_raw.tell()
         # Go to end of file.
         self.fh_raw.seek(0, 2)
@@ -372,45 +532,278 @@ class VDIFStreamReader(VDIFStreamBase, VLBIStreamReaderBase, VDIFFileReader):
             if count is None or count < 0:
                 count = self.size - self.offset
 
-            result = np.empty((self._sample_shape.nthread, count,
-                               self._sample_shape.nchan),
-                              dtype=self._frameset.dtype).transpose(1, 0, 2)
+            result = np.empty((count,) + self._sample_shape,
+                              dtype=self._frameset.dtype)
             out = result.squeeze() if self.squeeze else result
         else:
             count = out.shape[0]
             result = self._unsqueeze(out) if self.squeeze else out
 
         offset0 = self.offset
-        while count > 0:
-            dt, frame_nr, sample_offset = self._frame_info()
-            if(dt != self._frameset['seconds'] - self.header0['seconds'] or
-               frame_nr != self._frameset['frame_nr']):
-                # Read relevant frame (possibly reusing data array from
-                # previous frame set).
-                self._read_frame_set()
-                assert dt == (self._frameset['seconds'] -
-                              self.header0['seconds'])
-                assert frame_nr == self._frameset['frame_nr']
-
-            # Set decoded value for invalid data.
-            self._frameset.invalid_data_value = fill_value
-            # Decode data into array.
-            data = self._frameset.data.transpose(1, 0, 2)
-            # Copy relevant data from frame into output.
-            nsample = min(count, self.samples_per_frame - sample_offset)
-            sample = self.offset - offset0
-            result[sample:sample + nsample] = data[sample_offset:
-                                                   sample_offset + nsample]
-            self.offset += nsample
-            count -= nsample
+        with self._decoding(count):
+            while count > 0:
+                sample = self.offset - offset0
+                if self.cache_size:
+                    frame_index, sample_offset = divmod(
+                        self.offset, self.samples_per_frame)
+                    nsample = min(count,
+                                  self.samples_per_frame - sample_offset)
+                    self._read_cached(result[sample:sample + nsample],
+                                      frame_index, sample_offset, fill_value)
+                    self.offset += nsample
+                    count -= nsample
+                    continue
+
+                if self.offset % self.samples_per_frame == 0:
+                    # Try to decode many complete frame sets in one go.
+                    nsample = self._read_framesets(
+                        result[sample:sample + count], fill_value)
+                    if nsample:
+                        self.offset += nsample
+                        count -= nsample
+                        continue
+
+                dt, frame_nr, sample_offset = self._frame_info()
+                if(dt != (self._frameset['seconds'] -
+                          self.header0['seconds']) or
+                   frame_nr != self._frameset['frame_nr']):
+                    # Read relevant frame (possibly reusing data array from
+                    # previous frame set).
+                    self._read_frame_set()
+                    assert dt == (self._frameset['seconds'] -
+                                  self.header0['seconds'])
+                    assert frame_nr == self._frameset['frame_nr']
+
+                # Set decoded value for invalid data.
+                self._frameset.invalid_data_value = fill_value
+                # Decode data into array.
+                with self._timing('decode_time'):
+                    data = self._frameset.data.transpose(1, 0, 2)
+                self._count('samples_decoded', self.samples_per_frame)
+                # Copy relevant data from frame into output.
+                nsample = min(count, self.samples_per_frame - sample_offset)
+                with self._timing('copy_time'):
+                    result[sample:sample + nsample] = data[
+                        sample_offset:sample_offset + nsample]
+                self.offset += nsample
+                count -= nsample
 
         return out
 
+    # Maximum size in bytes of the decoded data of a batch of frame sets.
+    _max_batch_size = 1 << 24
+
+    def _read_framesets(self, out, fill_value):
+        """Decode a batch of complete frame sets directly into ``out``.
+
+        Starting at the current offset, which should be at the start of a
+        frame set, reads as many complete frame sets as fit in ``out`` (within
+        ``_max_batch_size``) as a single block, checks all their headers in
+        one go, and decodes all their payloads with a single decoder call.
+
+        Parameters
+        ----------
+        out : `~numpy.ndarray`
+            Unsqueezed output array, with shape ``(count,) + sample_shape``.
+        fill_value : float or complex
+            Value to use for invalid data.
+
+        Returns
+        -------
+        nsample : int
+            Number of samples decoded.  This is 0 if the batch could not be
+            decoded in one go, e.g., because frame sets are not all complete
+            and identically ordered, or because fewer than two complete frame
+            sets were requested.  In that case, one should fall back to
+            reading frame set by frame set.
+        """
+        samples_per_frame = self.samples_per_frame
+        header0 = self.header0
+        framesize = header0.framesize
+        index = self._thread_positions
+        payload0 = self._frameset.frames[0].payload
+        if (len(out) < 2 * samples_per_frame or index is None or
+                payload0.size * 8 != samples_per_frame * payload0._bpfs):
+            return 0
+
+        nthread = self._framesetsize // framesize
+        nframeset = min(len(out) // samples_per_frame,
+                        max(2, self._max_batch_size //
+                            (out[:samples_per_frame].nbytes)))
+        frame_index = self.offset // samples_per_frame
+        self.fh_raw.seek(frame_index * self._framesetsize)
+        shape = (nframeset, nthread, framesize)
+        try:
+            # If only some threads are selected, map the file if possible,
+            # so that only the frames of those threads are read from disk.
+            if self._memmap or (len(index) < nthread and self._can_map):
+                raw = self._fh_mapped.memmap(shape=shape)
+            else:
+                raw = np.frombuffer(self.fh_raw.read(nframeset *
+                                                     self._framesetsize),
+                                    dtype=np.uint8).reshape(shape)
+        except (EOFError, ValueError):
+            return 0
+
+        # Check the headers of the first and the selected frames at once;
+        # words will have shape (nword, nframeset, 1 + nselected).
+        headers = raw[:, [0] + index, :header0.size].copy().view('<u4')
+        words = np.rollaxis(headers, -1)
+        parsers = header0._header_parser.parsers
+        dt, frame_nr = divmod(header0['frame_nr'] + frame_index +
+                              np.arange(nframeset)[:, np.newaxis],
+                              self._frame_rate)
+        # As for regular reads, the time is checked using the first header
+        # of each frame set (in some files, other headers have wrong times).
+        # The selected frames should be in order of thread ID, and all
+        # frames should be consistent with the first header, including in
+        # legacy mode and EDV, as is verified for frame-by-frame reads.
+        if not (np.all(parsers['thread_id'](words[:, :, 1:]) ==
+                       sorted(self.thread_ids)) and
+                np.all(self._same_stream(headers)) and
+                np.all(parsers['frame_nr'](words) == frame_nr) and
+                np.all(parsers['seconds'](words[:, :, :1]) ==
+                       header0['seconds'] + dt)):
+            return 0
+
+        self._count('frames_read', nframeset * len(index))
+        invalid = parsers['invalid_data'](words[:, :, 1:])
+        nsample = nframeset * samples_per_frame
+        result = out[:nsample].view()
+        result.shape = (nframeset, samples_per_frame) + out.shape[1:]
+
+        # Decode all payloads with a single decoder call (or one per thread
+        # if we decode in parallel).
+        decoder = payload0._decoders[payload0._coder]
+        direct = len(index) == 1 and result.flags['C_CONTIGUOUS']
+
+        def decode(sel):
+            encoded = raw[sel, index, header0.size:]
+            if direct:
+                # For a single thread, the decoded data have the same layout
+                # as the output, so we can decode directly into it.
+                decoder(encoded, out=result[sel].view(result.real.dtype))
+                result[sel][invalid[sel, 0]] = fill_value
+                return
+
+            data = decoder(encoded)
+            if self.complex_data:
+                data = data.view(out.dtype)
+            data = data.reshape(-1, len(index), samples_per_frame,
+                                self._sample_shape.nchan)
+            data[invalid[sel]] = fill_value
+            # Scatter into output; splitting the sample axis never requires
+            # a copy.
+            result[sel] = data.transpose(0, 2, 1, 3)
+
+        step = -(-nframeset // self.nthreads)
+        for start in range(0, nframeset, step):
+            sel = slice(start, start + step)
+            self._decode(len(result[sel]) * samples_per_frame, decode, sel)
+        return nsample
+
+    @lazyproperty
+    def _thread_order(self):
+        """Thread IDs of the frames in the first frame set, in file order.
+
+        Taken from the sidecar index if available.  `None` if the frames in
+        the first frame set do not all have the same size.
+        """
+        if self._index is not None and 'thread_order' in self._index:
+            return self._index['thread_order'].tolist()
+        header0 = self.header0
+        nthread, rest = divmod(self._framesetsize, header0.framesize)
+        if rest:
+            return None
+        raw_offset = self.fh_raw.tell()
+        self.fh_raw.seek(0)
+        raw = np.frombuffer(self.fh_raw.read(self._framesetsize),
+                            dtype=np.uint8).reshape(nthread, -1)
+        self.fh_raw.seek(raw_offset)
+        words = raw[:, :header0.size].copy().view('<u4').T
+        return header0._header_parser.parsers['thread_id'](words).tolist()
+
+    @lazyproperty
+    def _thread_positions(self):
+        """Positions within a frame set of the frames of selected threads.
+
+        Inferred from the thread IDs in the first frame set, and given in
+        order of thread ID.  `None` if the frames in the first frame set do
+        not all have the same size.
+        """
+        order = self._thread_order
+        if order is None:
+            return None
+        return [order.index(tid) for tid in sorted(self.thread_ids)]
+
+    @lazyproperty
+    def _can_map(self):
+        """Whether the raw file can be mapped in memory."""
+        fh = self.fh_raw
+        if hasattr(fh, 'memmap'):
+            return True
+        try:
+            fh.fileno()
+        except (AttributeError, IOError, ValueError):
+            return False
+        return True
+
+    def _read_selected_frames(self, frameset_start):
+        """Read only the frames of the selected threads in a frame set.
+
+        Uses the positions of those frames in the first frame set to go
+        directly to them.  Returns `None` if the frames found do not have
+        the expected thread IDs and frame numbers.
+        """
+        fh = self._fh_mapped if self._memmap else self.fh_raw
+        framesize = self.header0.framesize
+        edv = self.header0.edv
+        try:
+            fh.seek(frameset_start)
+            header0 = VDIFHeader.fromfile(fh, edv)
+            frames = []
+            for thread_id, position in zip(sorted(self.thread_ids),
+                                           self._thread_positions):
+                fh.seek(frameset_start + position * framesize)
+                frame = VDIFFrame.fromfile(fh, edv, memmap=self._memmap)
+                if (frame['thread_id'] != thread_id or
+                        frame['frame_nr'] != header0['frame_nr']):
+                    return None
+                frames.append(frame)
+        except EOFError:
+            return None
+
+        return VDIFFrameSet(frames, header0)
+
     def _read_frame_set(self):
-        self.fh_raw.seek(self.offset // self.samples_per_frame *
-                         self._framesetsize)
+        frameset_start = (self.offset // self.samples_per_frame *
+                          self._framesetsize)
+        index = self._thread_positions
+        if (index is not None and
+                len(index) < self._framesetsize // self.header0.framesize):
+            frameset = self._read_selected_frames(frameset_start)
+            if frameset is not None:
+                self._frameset = frameset
+                self._count('frames_read', len(frameset.frames))
+                return
+
+        self.fh_raw.seek(frameset_start)
         self._frameset = self.read_frameset(self.thread_ids,
-                                            edv=self.header0.edv)
+                                            edv=self.header0.edv,
+                                            memmap=self._memmap)
+        self._count('frames_read', len(self._frameset.frames))
+
+    def _decode_frame(self, frame_index):
+        self._read_frame_set()
+        # Check the frame set before it can end up in the cache.
+        dt, frame_nr, _ = self._frame_info(frame_index *
+                                           self.samples_per_frame)
+        assert dt == (self._frameset['seconds'] - self.header0['seconds'])
+        assert frame_nr == self._frameset['frame_nr']
+        data = self._frameset.data.transpose(1, 0, 2)
+        invalid = np.array([not frame.valid
+                            for frame in self._frameset.frames])
+        return data, (invalid.reshape(1, -1, 1) if invalid.any() else None)
 
 
 class VDIFStreamWriter(VDIFStreamBase, VLBIStreamWriterBase, VDIFFileWriter):
@@ -503,6 +896,16 @@ class VDIFStreamWriter(VDIFStreamBase, VLBIStreamWriterBase, VDIFFileWriter):
         frame = self._data.transpose(1, 0, 2)
         while count > 0:
             dt, frame_nr, sample_offset = self._frame_info()
+            if sample_offset == 0 and count >= self.samples_per_frame:
+                # Encode and write all complete frame sets in one go.
+                nsample = count - count % self.samples_per_frame
+                sample = self.offset - offset0
+                self._write_framesets(data[sample:sample + nsample],
+                                      invalid_data)
+                self.offset += nsample
+                count -= nsample
+                continue
+
             if sample_offset == 0:
                 # set up header for new frame.
                 self._header = self.header0.copy()
@@ -523,6 +926,37 @@ class VDIFStreamWriter(VDIFStreamBase, VLBIStreamWriterBase, VDIFFileWriter):
             self.offset += nsample
             count -= nsample
 
+    def _write_framesets(self, data, invalid_data=False):
+        """Encode and write complete frame sets, starting at the offset.
+
+        Parameters
+        ----------
+        data : `~numpy.ndarray`
+            Data for all frame sets, with shape ``(nframeset *
+            samples_per_frame, nthread, nchan)``.
+        invalid_data : bool, optional
+            Whether the data are invalid.  Defaults to `False`.
+        """
+        nthread, nchan = self._sample_shape
+        nframeset = len(data) // self.samples_per_frame
+        # Calculate all headers at once from the first one, with thread IDs
+        # set as for `~baseband.vdif.VDIFFrameSet.fromdata`.
+        dt, frame_nr, _ = self._frame_info(
+            self.offset + np.arange(nframeset) * self.samples_per_frame)
+        kwargs = {'invalid_data': True} if invalid_data else {}
+        header_words = self.header0.sequence_words(
+            seconds=(self.header0['seconds'] + dt)[:, np.newaxis],
+            frame_nr=frame_nr[:, np.newaxis],
+            thread_id=np.arange(nthread), **kwargs)
+        # Reorder to frame set, thread, sample, and encode all in one go.
+        data = (data.astype(self._data.dtype, copy=False)
+                .reshape(nframeset, self.samples_per_frame, nthread, nchan)
+                .transpose(0, 2, 1, 3).reshape(-1, nchan))
+        payload = VDIFPayload.fromdata(data, bps=self.bps,
+                                       edv=self.header0.edv)
+        self._write_encoded(header_words.reshape(-1, header_words.shape[-1]),
+                            payload.words)
+
 
 open = make_opener('VDIF', globals(), doc="""
 --- For reading : (see :class:`VDIFStreamReader`)
@@ -536,6 +970,15 @@ sample_rate : `~astropy.units.Quantity`, optional
 squeeze : bool, optional
     If `True` (default), remove any dimensions of length unity from
     decoded data.
+memmap : bool, optional
+    If `True`, map payloads from the file rather than reading them.
+    Default: `False`.
+nthreads : int, optional
+    Number of threads to use for decoding large reads.  Default: 1.
+prefetch : int, optional
+    Number of frame sets to read ahead in a background thread.  Default: 0.
+cache_size : int, optional
+    Number of decoded frame sets to keep in a cache.  Default: 0.
 
 --- For writing : (see :class:`VDIFStreamWriter`)
 
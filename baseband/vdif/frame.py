@@ -99,7 +99,7 @@ class VDIFFrame(VLBIFrameBase):
         self.header['invalid_data'] = not valid
 
     @classmethod
-    def fromfile(cls, fh, edv=None, verify=True):
+    def fromfile(cls, fh, edv=None, verify=True, memmap=False):
         """Read a frame from a filehandle.
 
         Parameters
@@ -113,9 +113,12 @@ class VDIFFrame(VLBIFrameBase):
             Whether or not to do basic assertions that check the integrity
             (e.g., that channel information and whether or not data are complex
             are consistent between header and data).  Default: `True`.
+        memmap : bool
+            If `True`, map the payload from the file rather than reading it
+            (see `~numpy.memmap`).  Default: `False`.
         """
         header = cls._header_class.fromfile(fh, edv, verify)
-        payload = cls._payload_class.fromfile(fh, header=header)
+        payload = cls._payload_class.fromfile(fh, header=header, memmap=memmap)
         return cls(header, payload, verify=verify)
 
     @classmethod
@@ -200,7 +203,8 @@ class VDIFFrameSet(object):
             self.header0 = header0
 
     @classmethod
-    def fromfile(cls, fh, thread_ids=None, sort=True, edv=None, verify=True):
+    def fromfile(cls, fh, thread_ids=None, sort=True, edv=None, verify=True,
+                 memmap=False):
         """Read a frame set from a file, starting at the current location.
 
         Parameters
@@ -223,6 +227,9 @@ class VDIFFrameSet(object):
             improves file integrity checking.)
         verify : bool
             Whether to do (light) sanity checks on the header. Default: True.
+        memmap : bool
+            If `True`, map the payloads from the file rather than reading them
+            (see `~numpy.memmap`).  Default: `False`.
 
         Returns
         -------
@@ -238,7 +245,8 @@ class VDIFFrameSet(object):
         while header['frame_nr'] == header0['frame_nr']:
             if thread_ids is None or header['thread_id'] in thread_ids:
                 frames.append(
-                    VDIFFrame(header, VDIFPayload.fromfile(fh, header=header),
+                    VDIFFrame(header, VDIFPayload.fromfile(fh, header=header,
+                                                           memmap=memmap),
                               verify=verify))
             else:
                 fh.seek(header.payloadsize, 1)
@@ -314,8 +322,10 @@ class VDIFFrameSet(object):
         if self._data is None:
             self._data = np.empty(self.shape, dtype=self.dtype)
             for frame, datum in zip(self.frames, self._data):
-                datum[...] = (frame.data if frame.valid else
-                              self.invalid_data_value)
+                if frame.valid:
+                    frame.payload.__getitem__(out=datum)
+                else:
+                    datum[...] = self.invalid_data_value
         return self._data
 
     @property
@@ -12,8 +12,6 @@ import numpy as np
 import astropy.units as u
 from astropy.extern import six
 
-from astropy.time import Time, TimeDelta
-
 from ..vlbi_base.header import (four_word_struct, eight_word_struct,
                                 HeaderParser, VLBIHeaderBase)
 from ..mark5b.header import Mark5BHeader
@@ -25,11 +23,30 @@ __all__ = ['VDIFHeader', 'VDIFBaseHeader', 'VDIFSampleRateHeader',
            'VDIF_HEADER_CLASSES']
 
 
-ref_max = int(2. * (Time.now().jyear - 2000.)) + 1
-ref_epochs = Time(['{y:04d}-{m:02d}-01'.format(y=2000 + ref // 2,
-                                               m=1 if ref % 2 == 0 else 7)
-                   for ref in range(ref_max)], format='isot', scale='utc',
-                  precision=9)
+_ref_epochs = None
+
+
+def get_ref_epochs():
+    """Start times of the VDIF reference epochs up to the present.
+
+    These are calculated on first use, so that `astropy.time` is only
+    imported when times are actually needed.
+
+    Returns
+    -------
+    ref_epochs : `~astropy.time.Time`
+        January 1 and July 1 of every year since 2000, indexed by the
+        'ref_epoch' header value.
+    """
+    global _ref_epochs
+    if _ref_epochs is None:
+        from astropy.time import Time
+        ref_max = int(2. * (Time.now().jyear - 2000.)) + 1
+        dates = ['{y:04d}-{m:02d}-01'.format(y=2000 + ref // 2,
+                                             m=1 if ref % 2 == 0 else 7)
+                 for ref in range(ref_max)]
+        _ref_epochs = Time(dates, format='isot', scale='utc', precision=9)
+    return _ref_epochs
 
 
 VDIF_HEADER_CLASSES = {}
@@ -130,14 +147,16 @@ class VDIFHeader(VLBIHeaderBase):
     def copy(self):
         return super(VDIFHeader, self).copy(edv=self.edv)
 
+    _stream_invariants = ('ref_epoch', 'vdif_version', 'frame_length',
+                          'complex_data', 'bits_per_sample', 'station_id')
+    """Keys that should be the same for all headers of a stream."""
+
     def same_stream(self, other):
         """Whether header is consistent with being from the same stream."""
         # EDV and most parts of words 2 and 3 should be invariant.
         return (self.edv == other.edv and
                 all(self[key] == other[key]
-                    for key in ('ref_epoch', 'vdif_version', 'frame_length',
-                                'complex_data', 'bits_per_sample',
-                                'station_id')))
+                    for key in self._stream_invariants))
 
     @classmethod
     def fromfile(cls, fh, edv=None, verify=True):
@@ -365,20 +384,58 @@ class VDIFHeader(VLBIHeaderBase):
         if frame_nr is None:
             frame_nr = self['frame_nr']
 
-        if frame_nr == 0:
-            offset = 0.
-        else:
-            if sample_rate is None:
-                try:
-                    sample_rate = self.sample_rate
-                except AttributeError:
-                    raise ValueError("Cannot calculate sample rate for this "
-                                     "header. Pass it in explicitly.")
-            offset = (frame_nr * self.samples_per_frame /
-                      sample_rate).to_value(u.s)
-
-        return (ref_epochs[self['ref_epoch']] +
-                TimeDelta(self['seconds'], offset, format='sec', scale='tai'))
+        from astropy.time import TimeDelta
+        return (get_ref_epochs()[self['ref_epoch']] +
+                TimeDelta(self['seconds'],
+                          self._frame_offset(frame_nr, sample_rate),
+                          format='sec', scale='tai'))
+
+    def _frame_offset(self, frame_nr, sample_rate=None):
+        """Offset in seconds of the start of frame(s) from the second."""
+        if not np.any(frame_nr):
+            return 0.
+
+        if sample_rate is None:
+            try:
+                sample_rate = self.sample_rate
+            except AttributeError:
+                raise ValueError("Cannot calculate sample rate for this "
+                                 "header. Pass it in explicitly.")
+        return (frame_nr * self.samples_per_frame / sample_rate).to_value(u.s)
+
+    def sequence_time(self, words, sample_rate=None, frame_nr=None):
+        """Times for a sequence of header words, with this as template.
+
+        Like `get_time`, but interpreting the words of many headers at once,
+        giving a single `~astropy.time.Time` instance.  Properties needed to
+        convert frame numbers to time offsets, such as the number of samples
+        per frame and (if not given) the sample rate, are taken from this
+        header.
+
+        Parameters
+        ----------
+        words : `~numpy.ndarray`
+            Header words, with a trailing dimension for the words (e.g.,
+            ``(nheader, nword)``).
+        sample_rate : `~astropy.units.Quantity`, optional
+            As for `get_time`.
+        frame_nr : int or array of int, optional
+            As for `get_time`.
+
+        Returns
+        -------
+        `~astropy.time.Time`
+        """
+        template = self.copy()
+        template.words = np.rollaxis(words, -1)
+        if frame_nr is None:
+            frame_nr = template['frame_nr']
+
+        from astropy.time import TimeDelta
+        return (get_ref_epochs()[template['ref_epoch']] +
+                TimeDelta(template['seconds'],
+                          self._frame_offset(frame_nr, sample_rate),
+                          format='sec', scale='tai'))
 
     def set_time(self, time, sample_rate=None, frame_nr=None):
         """
@@ -400,6 +457,7 @@ class VDIFHeader(VLBIHeaderBase):
         frame_nr : int, optional
             An explicit frame number associated with the fractions of seconds.
         """
+        ref_epochs = get_ref_epochs()
         assert time > ref_epochs[0]
         ref_index = np.searchsorted((ref_epochs - time).sec, 0) - 1
         self['ref_epoch'] = ref_index
@@ -612,7 +670,11 @@ class VDIFMark5BHeader(VDIFBaseHeader, Mark5BHeader):
         # headers do not store 'bcd_fraction').
         day, seconds = divmod(self['seconds'], 86400)
         assert seconds == self.seconds  # Latter decodes 'bcd_seconds'
-        ref_mjd = ref_epochs[self['ref_epoch']].mjd + day
+        # Calculate the MJD of the reference epoch (January 1 or July 1)
+        # with integers, so that no times are needed to read headers.
+        year = 1999 + self['ref_epoch'] // 2 + self['ref_epoch'] % 2
+        ref_mjd = (365 * year + year // 4 - year // 100 + year // 400 -
+                   678575 - 184 * (self['ref_epoch'] % 2) + day)
         assert ref_mjd % 1000 == self.jday  # Latter decodes 'bcd_jday'
 
     def __setitem__(self, item, value):
@@ -660,7 +722,7 @@ class VDIFMark5BHeader(VDIFBaseHeader, Mark5BHeader):
             if frame_nr is None:
                 frame_nr = self['frame_nr']
 
-            if frame_nr == 0:
+            if not np.any(frame_nr):
                 offset = 0.
             else:
                 if sample_rate is None:
@@ -670,9 +732,18 @@ class VDIFMark5BHeader(VDIFBaseHeader, Mark5BHeader):
                 offset = (frame_nr * self.samples_per_frame /
                           sample_rate).to_value(u.s)
 
-        return (ref_epochs[self['ref_epoch']] +
+        from astropy.time import TimeDelta
+        return (get_ref_epochs()[self['ref_epoch']] +
                 TimeDelta(self['seconds'], offset, format='sec', scale='tai'))
 
+    def sequence_time(self, words, sample_rate=None, frame_nr=None):
+        if sample_rate is None and frame_nr is None:
+            # Use the fractional seconds from the Mark 5B part of the words.
+            return super(VDIFHeader, self).sequence_time(words)
+
+        return super(VDIFMark5BHeader, self).sequence_time(
+            words, sample_rate=sample_rate, frame_nr=frame_nr)
+
     def set_time(self, time):
         Mark5BHeader.set_time(self, time)
         super(VDIFMark5BHeader, self).set_time(time, frame_nr=self['frame_nr'])
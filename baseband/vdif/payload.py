@@ -14,7 +14,8 @@ from collections import namedtuple
 
 from ..vlbi_base.payload import VLBIPayloadBase
 from ..vlbi_base.encoding import (encode_2bit_base, encode_4bit_base,
-                                  decoder_levels, decode_8bit, encode_8bit)
+                                  decoder_levels, decoder_out, decode_8bit,
+                                  encode_8bit)
 
 __all__ = ['init_luts', 'decode_2bit', 'decode_4bit', 'encode_2bit',
            'encode_4bit', 'VDIFPayload']
@@ -68,10 +69,16 @@ def init_luts():
 lut1bit, lut2bit, lut4bit = init_luts()
 
 
-def decode_2bit(words):
-    """Decodes data stored using 2 bits per sample."""
+def decode_2bit(words, out=None):
+    """Decodes data stored using 2 bits per sample.
+
+    If given, ``out`` should be a contiguous float32 array with the right
+    number of elements; it will be reshaped to hold the decoded values.
+    """
     b = words.view(np.uint8)
-    return lut2bit.take(b, axis=0)
+    if out is not None:
+        out = decoder_out(out, b.shape + (4,))
+    return lut2bit.take(b, axis=0, out=out, mode='clip')
 
 
 shift2bit = np.arange(0, 8, 2).astype(np.uint8)
@@ -85,10 +92,13 @@ def encode_2bit(values):
     return np.bitwise_or.reduce(bitvalues, axis=-1)
 
 
-def decode_4bit(words):
-    """Decodes data stored using 4 bits per sample."""
+def decode_4bit(words, out=None):
+    """Decodes data stored using 4 bits per sample (optionally into ``out``).
+    """
     b = words.view(np.uint8)
-    return lut4bit.take(b, axis=0)
+    if out is not None:
+        out = decoder_out(out, b.shape + (2,))
+    return lut4bit.take(b, axis=0, out=out, mode='clip')
 
 
 shift04 = np.array([0, 4], np.uint8)
@@ -151,7 +161,7 @@ class VDIFPayload(VLBIPayloadBase):
                                           complex_data=complex_data)
 
     @classmethod
-    def fromfile(cls, fh, header):
+    def fromfile(cls, fh, header, memmap=False):
         """Read payload from file handle and decode it into data.
 
         Parameters
@@ -161,11 +171,13 @@ class VDIFPayload(VLBIPayloadBase):
         header : `~baseband.vdif.VDIFHeader`
             Used to infer the payloadsize, number of channels, bits per sample,
             and whether the data is complex.
+        memmap : bool, optional
+            If `False` (default), read from file.  Otherwise, map the file in
+            memory (see `~numpy.memmap`).
         """
-        s = fh.read(header.payloadsize)
-        if len(s) < header.payloadsize:
-            raise EOFError("Could not read full payload.")
-        return cls(np.frombuffer(s, dtype=cls._dtype_word), header)
+        words = cls._words_fromfile(fh, header.payloadsize, cls._dtype_word,
+                                    memmap)
+        return cls(words, header)
 
     @classmethod
     def fromdata(cls, data, header=None, bps=2, edv=None):
@@ -2,6 +2,7 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import io
 import numpy as np
 import pytest
 from astropy.time import Time
@@ -117,6 +118,37 @@ class TestVDIF(object):
         assert isinstance(header6, vdif.header.VDIFBaseHeader)
         assert header6['edv'] == 100
 
+    def test_header_sequence_words(self):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            header = vdif.VDIFHeader.fromfile(fh)
+        frame_nr = np.arange(10)[:, np.newaxis]
+        thread_id = np.arange(3)
+        words = header.sequence_words(seconds=header['seconds'] + 1,
+                                      frame_nr=frame_nr, thread_id=thread_id,
+                                      invalid_data=True)
+        assert words.shape == (10, 3, len(header.words))
+        assert words.dtype == '<u4'
+        for i in range(10):
+            for j in range(3):
+                expected = header.copy()
+                expected.update(seconds=header['seconds'] + 1, frame_nr=i,
+                                thread_id=j, invalid_data=True)
+                assert np.all(words[i, j] == expected.words)
+                assert abs(header.sequence_time(words[i, j]) -
+                           expected.time) < 1. * u.ns
+        # Times can be calculated for all headers at once.
+        times = header.sequence_time(words)
+        assert times.shape == (10, 3)
+        expected = (header.time + 1. * u.s +
+                    frame_nr * header.samples_per_frame / header.sample_rate)
+        assert np.all(abs(times - expected) < 1. * u.ns)
+        assert np.all(header.sequence_time(words, frame_nr=0) ==
+                      header.time + 1. * u.s)
+        # Template header should not have been changed.
+        assert header['frame_nr'] == 0
+        with pytest.raises(ValueError):
+            header.sequence_words(frame_nr=np.array([0, 1 << 24]))
+
     def test_custom_header(self, tmpdir):
         # Custom header with an EDV that already exists
         with pytest.raises(ValueError):
@@ -229,6 +261,15 @@ class TestVDIF(object):
         assert vdif.VDIFPayload.fromdata(areal, header) == payload3
         header['complex_data'] = True
         assert vdif.VDIFPayload.fromdata(acmplx, header) == payload4
+        # Check decoding directly into a given array.
+        for payload in (payload1, payload2, payload3, payload4):
+            out = np.zeros(payload.shape, payload.dtype)
+            assert payload.__getitem__(out=out) is out
+            assert np.all(out == payload.data)
+        # Decoders refuse to silently fill a copy of a non-contiguous output.
+        out = np.zeros((words.size * 16, 2), np.float32)[:, 0]
+        with pytest.raises(ValueError):
+            vdif.payload.decode_2bit(words, out=out)
 
     def test_payload(self, tmpdir):
         with open(SAMPLE_FILE, 'rb') as fh:
@@ -295,6 +336,29 @@ class TestVDIF(object):
         assert np.all(payload2[item] == sel_data)
         assert payload2 == payload
 
+    @pytest.mark.parametrize('item', ((), slice(4, 20), slice(3, 10),
+                                      slice(None, None, 2), 5))
+    def test_payload_getitem_out(self, item):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            header = vdif.VDIFHeader.fromfile(fh)
+            payload = vdif.VDIFPayload.fromfile(fh, header)
+        sel_data = payload.data[item]
+        out = np.empty_like(sel_data)
+        result = payload.__getitem__(item, out=out)
+        assert result is out
+        assert np.all(out == sel_data)
+        # Also for complex data.
+        payload2 = vdif.VDIFPayload(payload.words, nchan=1, bps=2,
+                                    complex_data=True)
+        sel_data2 = payload2.data[item]
+        out2 = np.empty_like(sel_data2)
+        assert payload2.__getitem__(item, out=out2) is out2
+        assert np.all(out2 == sel_data2)
+        # Invalid frames just fill the output.
+        frame = vdif.VDIFFrame(header.copy(), payload, valid=False)
+        assert frame.__getitem__(item, out=out) is out
+        assert np.all(out == 0.)
+
     def test_frame(self, tmpdir):
         with vdif.open(SAMPLE_FILE, 'rb') as fh:
             header = vdif.VDIFHeader.fromfile(fh)
@@ -398,6 +462,80 @@ class TestVDIF(object):
             with pytest.raises(IOError):
                 fh.read_frameset(thread_ids=[1, 9])
 
+    def test_frame_memmap(self):
+        with vdif.open(SAMPLE_FILE, 'rb') as fh:
+            frame = fh.read_frame()
+            frameset = fh.read_frameset()
+        assert not isinstance(frame.payload.words, np.memmap)
+        # Check that if we map instead, we get the same result.
+        with vdif.open(SAMPLE_FILE, 'rb') as fh:
+            frame2 = fh.read_frame(memmap=True)
+            assert fh.tell() == frame.size
+            frameset2 = fh.read_frameset(memmap=True)
+            frameset3 = fh.read_frameset(thread_ids=[2, 3], memmap=True)
+        assert isinstance(frame2.payload.words, np.memmap)
+        assert frame2 == frame
+        assert np.all(frame2.data == frame.data)
+        assert all(isinstance(fr.payload.words, np.memmap)
+                   for fr in frameset2.frames)
+        assert frameset2 == frameset
+        assert np.all(frameset2.data == frameset.data)
+        assert frameset3.shape == (2, 20000, 1)
+        # All payloads should be views of the same map of the file.
+        assert all(fr.payload.words.base is frame2.payload.words.base
+                   for fr in frameset2.frames + frameset3.frames)
+        # And the map should not be writable.
+        with pytest.raises(ValueError):
+            frame2.payload.words[0] = 0
+
+        with vdif.open(SAMPLE_FILE, 'rs') as fh:
+            record = fh.read()
+        with vdif.open(SAMPLE_FILE, 'rs', memmap=True) as fh:
+            record2 = fh.read()
+            assert isinstance(fh._frameset.frames[0].payload.words, np.memmap)
+            fh_mapped = fh._fh_mapped
+            assert fh_mapped.fh_raw is fh.fh_raw
+            assert fh_mapped._mapped is not None
+            # Wrapping the raw file gives a new wrapper for mapping.
+            fh.instrument = True
+            assert fh_mapped._mapped is None
+            assert fh._fh_mapped is not fh_mapped
+            assert fh._fh_mapped.fh_raw is fh.fh_raw
+            fh.seek(0)
+            assert np.all(fh.read() == record)
+        assert np.all(record2 == record)
+        # Closing releases the maps.
+        with vdif.open(SAMPLE_FILE, 'rb') as fh:
+            fh.read_frame(memmap=True)
+            fh_mapped = fh._fh_mapped
+            assert fh_mapped._mapped is not None
+        assert fh_mapped._mapped is None
+
+    @pytest.mark.parametrize('sample', (SAMPLE_FILE, SAMPLE_MWA,
+                                        SAMPLE_AROCHIME))
+    def test_index(self, sample):
+        with vdif.open(sample, 'rb') as fh:
+            fh.seek(10)
+            index = fh.index()
+            assert fh.tell() == 10
+            fh.seek(0)
+            headers = []
+            while True:
+                try:
+                    headers.append(fh.read_frame().header)
+                except EOFError:
+                    break
+
+        assert len(index) == len(headers)
+        for key in ('seconds', 'frame_nr', 'thread_id', 'invalid_data'):
+            assert np.all(index[key] == [header[key] for header in headers])
+        assert np.all(index['edv'] == [header.edv for header in headers])
+        # Quick check that it works on objects that cannot be mapped.
+        with io.open(sample, 'rb') as fr:
+            fh = vdif.open(io.BytesIO(fr.read()), 'rb')
+        index2 = fh.index()
+        assert np.all(index2 == index)
+
     def test_find_header(self, tmpdir):
         # Below, the tests set the file pointer to very close to a header,
         # since otherwise they run *very* slow.  This is somehow related to
@@ -485,6 +623,35 @@ class TestVDIF(object):
                 assert fh.tell() == 0
             assert header_10 == header0
 
+    @pytest.mark.parametrize('block_size', (1 << 16, 1000, 7))
+    def test_find_header_blocks(self, block_size):
+        # The search checks positions in blocks; results should not depend
+        # on how the blocks are aligned with frames.
+        with vdif.open(SAMPLE_FILE, 'rb') as fh:
+            fh._search_block_size = block_size
+            header0 = vdif.VDIFHeader.fromfile(fh)
+            framesize = header0.framesize
+            ok = fh._plausible_headers(0, 3 * framesize, framesize,
+                                       template_header=header0)
+            assert set(np.nonzero(ok)[0]) == {0, framesize, 2 * framesize}
+            for pos, forward, expected in ((1, True, framesize),
+                                           (framesize + 1, False, framesize),
+                                           (5 * framesize + 1, False,
+                                            5 * framesize)):
+                fh.seek(pos)
+                header = fh.find_header(framesize=framesize, forward=forward)
+                assert fh.tell() == expected
+                assert header == vdif.VDIFHeader.fromfile(fh)
+                fh.seek(pos)
+                header = fh.find_header(template_header=header0,
+                                        forward=forward)
+                assert fh.tell() == expected
+            # Nothing consistent with a legacy header or different EDV.
+            fh.seek(1)
+            assert fh.find_header(framesize=framesize, edv=False) is None
+            assert fh.tell() == 1
+            assert fh.find_header(framesize=framesize, edv=1) is None
+
     def test_filestreamer(self):
         with open(SAMPLE_FILE, 'rb') as fh:
             header = vdif.VDIFHeader.fromfile(fh)
@@ -602,6 +769,288 @@ class TestVDIF(object):
         with vdif.open(test_file, 'rs') as fh:
             assert np.all(fh.read() == record)
 
+    def test_stream_write_batched(self, tmpdir):
+        # Complete frame sets are encoded together; check the result is the
+        # same as for writing (partial) frame sets one at a time.
+        with vdif.open(SAMPLE_FILE, 'rs') as fh:
+            record = fh.read()
+            header = fh.header0
+        files = []
+        for chunks in ([40000], [20000, 20000], [3, 20000, 19997],
+                       [7000, 7000, 7000, 19000]):
+            files.append(str(tmpdir.join('test{}.vdif'.format(len(files)))))
+            with vdif.open(files[-1], 'ws', nthread=8, header=header) as fw:
+                for chunk in np.split(record, np.cumsum(chunks)[:-1]):
+                    fw.write(chunk)
+        with open(files[0], 'rb') as fh:
+            expected = fh.read()
+        for name in files[1:]:
+            with open(name, 'rb') as fh:
+                assert fh.read() == expected
+        # Check invalid data get marked for complete frame sets too.
+        with vdif.open(files[0], 'ws', nthread=8, header=header) as fw:
+            fw.write(record[:20000])
+            fw.write(record[20000:], invalid_data=True)
+        with vdif.open(files[0], 'rb') as fh:
+            framesets = [fh.read_frameset() for i in range(2)]
+        assert not any(frame.header['invalid_data']
+                       for frame in framesets[0].frames)
+        assert all(frame.header['invalid_data']
+                   for frame in framesets[1].frames)
+
+    def test_get_frame_rate(self, tmpdir):
+        vdif_file = str(tmpdir.join('frame_rate.vdif'))
+        data = np.ones((16, 2, 2))
+        header = vdif.VDIFHeader.fromvalues(
+            edv=0, time=Time('2010-01-01'), nchan=2, bps=2,
+            complex_data=False, frame_nr=0, thread_id=0, samples_per_frame=16,
+            station='me')
+        # 2.5 s of data, with 20 frames per second for each thread.
+        with vdif.open(vdif_file, 'ws', header=header,
+                       nthread=2, sample_rate=320*u.Hz) as fw:
+            for i in range(50):
+                fw.write(data)
+
+        with vdif.open(vdif_file, 'rs') as fh:
+            assert fh.sample_rate == 320*u.Hz
+            framesize = fh.header0.framesize
+            # Start in the middle of a second.
+            for index in (1, 17, 39, 40, 41):
+                fh.fh_raw.seek(index * framesize)
+                assert fh._get_frame_rate(fh.fh_raw, fh.header0) == 20 * u.Hz
+                assert fh.fh_raw.tell() == index * framesize
+            # Less than one second of data left.
+            fh.fh_raw.seek(81 * framesize)
+            with pytest.raises(EOFError):
+                fh._get_frame_rate(fh.fh_raw, fh.header0)
+            assert fh.fh_raw.tell() == 81 * framesize
+
+        # Remove the frames starting the second second, so that the frame
+        # numbers are inconsistent and all frames have to be checked.
+        with open(vdif_file, 'rb') as fh:
+            raw = fh.read()
+        raw = raw[:40 * framesize] + raw[42 * framesize:]
+        with vdif.open(io.BytesIO(raw), 'rs', sample_rate=320*u.Hz) as fh:
+            fh.fh_raw.seek(0)
+            with catch_warnings(UserWarning) as w:
+                frame_rate = fh._get_frame_rate(fh.fh_raw, fh.header0)
+            assert frame_rate == 20 * u.Hz
+            assert len(w) == 1
+            assert 'more than 1 second' in str(w[0].message)
+            assert fh.fh_raw.tell() == 0
+
+    def test_stream_index(self, tmpdir):
+        vdif_file = str(tmpdir.join('index.vdif'))
+        data = np.ones((16, 2, 2))
+        header = vdif.VDIFHeader.fromvalues(
+            edv=0, time=Time('2010-01-01'), nchan=2, bps=2,
+            complex_data=False, frame_nr=0, thread_id=0, samples_per_frame=16,
+            station='me')
+        with vdif.open(vdif_file, 'ws', header=header,
+                       nthread=2, sample_rate=320*u.Hz) as fw:
+            for i in range(30):
+                fw.write(data)
+        # Invalidate the very last frame, of thread 1.
+        with open(vdif_file, 'r+b') as fw:
+            fw.seek(-header.framesize, 2)
+            last_frame = vdif.VDIFFrame.fromfile(fw)
+            last_frame.header.mutable = True
+            last_frame.header['invalid_data'] = True
+            fw.seek(-header.framesize, 2)
+            last_frame.tofile(fw)
+
+        with vdif.open(vdif_file, 'rs') as fh:
+            stop_time = fh.stop_time
+            index_name = fh.build_index()
+        with np.load(index_name) as index:
+            assert index['frame_rate'] == 20.
+            assert index['last_header_offset'] == 58 * header.framesize
+            assert np.all(index['thread_order'] == [0, 1])
+
+        with vdif.open(vdif_file, 'rs') as fh:
+            assert fh._index is not None
+            assert fh.sample_rate == 320*u.Hz
+            assert fh._last_header['thread_id'] == 0
+            assert fh.stop_time == stop_time
+            # The thread layout is taken from the index as well.
+            assert fh._thread_order == [0, 1]
+            assert fh._thread_positions == [0, 1]
+
+    @pytest.mark.parametrize(('bps', 'complex_data'), ((2, False), (4, True),
+                                                       (8, False)))
+    def test_stream_read_batched(self, tmpdir, bps, complex_data):
+        # Reads of several complete frame sets are decoded in one go;
+        # check this gives the same result as reading frame set by frame set.
+        vdif_file = str(tmpdir.join('batched.vdif'))
+        header = vdif.VDIFHeader.fromvalues(
+            edv=0, time=Time('2010-01-01'), nchan=2, bps=bps,
+            complex_data=complex_data, frame_nr=0, thread_id=0,
+            samples_per_frame=16, station='me')
+        data = np.random.RandomState(1).normal(
+            0., 2., (30 * 16, 3, 2 * (1 + complex_data))).astype(np.float32)
+        if complex_data:
+            data = data.view(np.complex64)
+        with vdif.open(vdif_file, 'ws', header=header, nthread=3,
+                       sample_rate=320*u.Hz) as fw:
+            fw.write(data[:80])
+            fw.write(data[80:112], invalid_data=True)
+            fw.write(data[112:])
+
+        with vdif.open(vdif_file, 'rs') as fh:
+            # Reading a single frame set at a time uses the regular path.
+            expected = np.concatenate([fh.read(16, fill_value=-9.)
+                                       for i in range(30)])
+            assert np.all(expected[80:112] == -9.)
+            fh.seek(0)
+            record = fh.read(fill_value=-9.)
+            assert np.all(record == expected)
+            fh.seek(8)
+            record = fh.read(300, fill_value=-9.)
+            assert fh.tell() == 308
+            assert np.all(record == expected[8:308])
+            # Check output array is filled if it is given.
+            out = np.zeros_like(expected)
+            fh.seek(0)
+            fh.read(out=out, fill_value=-9.)
+            assert np.all(out == expected)
+            # Check that small batches work too.
+            fh._max_batch_size = 1
+            fh.seek(0)
+            record = fh.read(fill_value=-9.)
+            assert np.all(record == expected)
+
+        with vdif.open(vdif_file, 'rs', thread_ids=[2, 0]) as fh:
+            record = fh.read(fill_value=-9.)
+        assert np.all(record == expected[:, [0, 2]])
+
+        # Check reading via the cache of decoded frame sets.
+        with vdif.open(vdif_file, 'rs', cache_size=4) as fh:
+            assert fh.cache_info() == (0, 0, 4, 0)
+            record = fh.read(fill_value=-9.)
+            assert np.all(record == expected)
+            assert fh.cache_info() == (0, 30, 4, 4)
+            fh.seek(-40, 2)
+            assert np.all(fh.read(fill_value=-9.) == expected[-40:])
+            assert fh.cache_info() == (3, 30, 4, 4)
+            fh.cache_size = 30
+            fh.seek(0)
+            fh.read()
+            fh.seek(0)
+            record = fh.read(fill_value=-1.)
+            assert np.all(record[80:112] == -1.)
+            assert np.all(record[:80] == expected[:80])
+            assert fh.cache_info() == (37, 56, 30, 30)
+            fh.cache_size = 2
+            assert fh.cache_info().currsize == 2
+            fh.cache_clear()
+            assert fh.cache_info() == (0, 0, 2, 0)
+            with pytest.raises(ValueError):
+                fh.cache_size = -1
+
+        # Check decoding in parallel, for several threads and (using a new
+        # file) for a single one, which is decoded directly into the output.
+        with vdif.open(vdif_file, 'rs', nthreads=3) as fh:
+            fh._max_batch_size = 256
+            record = fh.read(fill_value=-9.)
+        assert np.all(record == expected)
+        single_file = str(tmpdir.join('single.vdif'))
+        with vdif.open(single_file, 'ws', header=header, nthread=1,
+                       sample_rate=320*u.Hz) as fw:
+            fw.write(data[:80, 0])
+            fw.write(data[80:112, 0], invalid_data=True)
+            fw.write(data[112:, 0])
+        with vdif.open(single_file, 'rs', nthreads=3) as fh:
+            fh._max_batch_size = 256
+            record = fh.read(fill_value=-9.)
+        assert np.all(record == expected[:, 0])
+
+        # A frame with a different EDV but the same length is not decoded
+        # silently, but leads to the same error as when reading frame sets
+        # one by one.
+        with open(vdif_file, 'r+b') as fw:
+            fw.seek(5 * header.framesize + 19)
+            fw.write(b'\x02')
+        with vdif.open(vdif_file, 'rs', sample_rate=320*u.Hz) as fh:
+            with pytest.raises(AssertionError):
+                fh.read()
+
+    @pytest.mark.parametrize('memmap', (False, True))
+    def test_stream_thread_subset(self, tmpdir, memmap):
+        with open(SAMPLE_FILE, 'rb') as fh:
+            raw = fh.read()
+        with vdif.open(SAMPLE_FILE, 'rs') as fh:
+            framesize = fh.header0.framesize
+            record = fh.read()
+        # Swap the first two frames of the second frame set, so that the
+        # thread order differs from that in the first frame set.
+        swapped = str(tmpdir.join('swapped.vdif'))
+        with open(swapped, 'wb') as fw:
+            fw.write(raw[:8 * framesize] + raw[9 * framesize:10 * framesize] +
+                     raw[8 * framesize:9 * framesize] + raw[10 * framesize:])
+
+        for name in (SAMPLE_FILE, swapped):
+            with vdif.open(name, 'rs', thread_ids=[5, 0], memmap=memmap,
+                           sample_rate=32*u.MHz) as fh:
+                # Thread order in the file is 1, 3, 5, 7, 0, 2, 4, 6.
+                assert fh._thread_positions == [4, 2]
+                # Read frame by frame, as well as in one go.
+                record1 = np.concatenate([fh.read(10000) for i in range(4)])
+                fh.seek(0)
+                record2 = fh.read(40000)
+            assert np.all(record1 == record[:, [0, 5]])
+            assert np.all(record2 == record[:, [0, 5]])
+
+        with vdif.open(io.BytesIO(raw), 'rs', thread_ids=[3],
+                       sample_rate=32*u.MHz) as fh:
+            assert not fh._can_map
+            assert fh._thread_positions == [1]
+            record1 = np.concatenate([fh.read(5000) for i in range(8)])
+            fh.seek(0)
+            record2 = fh.read(40000)
+        assert np.all(record1 == record[:, 3])
+        assert np.all(record2 == record[:, 3])
+
+    @pytest.mark.parametrize(('nthreads', 'memmap'),
+                             ((2, False), (3, True), (4, False)))
+    def test_stream_nthreads(self, nthreads, memmap):
+        with vdif.open(SAMPLE_FILE, 'rs') as fh:
+            record = fh.read()
+            fh.seek(1234)
+            record1 = fh.read(30000)
+        with vdif.open(SAMPLE_FILE, 'rs', memmap=memmap,
+                       nthreads=nthreads) as fh:
+            record2 = fh.read()
+            fh.seek(1234)
+            record3 = fh.read(30000)
+        assert np.all(record2 == record)
+        assert np.all(record3 == record1)
+
+    @pytest.mark.parametrize('prefetch', (1, 2))
+    def test_stream_prefetch(self, prefetch):
+        with vdif.open(SAMPLE_FILE, 'rs') as fh:
+            record = fh.read()
+        with vdif.open(SAMPLE_FILE, 'rs', prefetch=prefetch) as fh:
+            assert fh.prefetch == prefetch
+            record1 = np.concatenate([fh.read(7000) for i in range(5)])
+            record2 = fh.read()
+        assert np.all(record1 == record[:35000])
+        assert np.all(record2 == record[35000:])
+
+    @pytest.mark.parametrize(('overlap', 'reuse_buffer'),
+                             ((0, False), (0, True), (2000, True)))
+    def test_stream_iter_blocks(self, overlap, reuse_buffer):
+        with vdif.open(SAMPLE_FILE, 'rs') as fh:
+            record = fh.read()
+        with vdif.open(SAMPLE_FILE, 'rs', nthreads=2) as fh:
+            blocks = [block.copy() for block in
+                      fh.iter_blocks(15000, overlap=overlap,
+                                     reuse_buffer=reuse_buffer,
+                                     fill_value=-1.)]
+        starts = range(0, len(record) - overlap, 15000 - overlap)
+        assert len(blocks) == len(starts)
+        for start, block in zip(starts, blocks):
+            assert np.all(block == record[start:start + 15000])
+
     # Test that writing an incomplete stream is possible, and that frame set is
     # appropriately marked as invalid.
     @pytest.mark.parametrize('fill_value', (0., -999.))
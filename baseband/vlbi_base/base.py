@@ -1,15 +1,139 @@
 import io
+import os
+import operator
+import threading
 import warnings
+import zipfile
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+from timeit import default_timer
 import numpy as np
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import astropy.units as u
 from astropy.utils import lazyproperty, deprecated
+from astropy.extern import six
+
+from ..helpers.prefetch import PrefetchReader
 
 
 __all__ = ['VLBIStreamBase', 'VLBIStreamReaderBase', 'VLBIStreamWriterBase',
            'make_opener']
 
 
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+"""Statistics of the decoded-frame cache (like for `functools.lru_cache`)."""
+
+INSTRUMENT_KEYS = ('bytes_read', 'read_time', 'bytes_written', 'write_time',
+                   'seeks', 'frames_read', 'samples_decoded', 'decode_time',
+                   'copy_time', 'cache_hits', 'cache_misses')
+"""Counters and timings (in seconds) kept by instrumented streams."""
+
+# Decoding can happen in a thread pool, so timings are added under a lock.
+_instrument_lock = threading.Lock()
+
+
+class _NullTimer(object):
+    """Stand-in for `_Timer` for streams that are not instrumented."""
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+class _Timer(object):
+    """Context that adds the time spent inside it to ``stats[key]``."""
+    def __init__(self, stats, key):
+        self.stats = stats
+        self.key = key
+
+    def __enter__(self):
+        self.start = default_timer()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = default_timer() - self.start
+        with _instrument_lock:
+            self.stats[self.key] += elapsed
+
+
+class _InstrumentedFile(object):
+    """Wrap a binary file, counting bytes and time for reads and writes.
+
+    Any attribute not defined on the wrapper is looked up on the underlying
+    file.
+    """
+    def __init__(self, fh, stats):
+        self.fh = fh
+        self.stats = stats
+
+    def __getattr__(self, attr):
+        """Try to get things on the underlying file if it is not on self."""
+        if not attr.startswith('_'):
+            try:
+                return getattr(self.fh, attr)
+            except AttributeError:
+                pass
+        return self.__getattribute__(attr)
+
+    def read(self, *args):
+        with _Timer(self.stats, 'read_time'):
+            data = self.fh.read(*args)
+        self.stats['bytes_read'] += len(data)
+        return data
+
+    def readinto(self, buffer):
+        with _Timer(self.stats, 'read_time'):
+            nbytes = self.fh.readinto(buffer)
+        self.stats['bytes_read'] += nbytes
+        return nbytes
+
+    def write(self, data):
+        with _Timer(self.stats, 'write_time'):
+            result = self.fh.write(data)
+        self.stats['bytes_written'] += len(data)
+        return result
+
+    def __repr__(self):
+        return "{0}(fh={1})".format(self.__class__.__name__, self.fh)
+
+
+def _timed(func, stats, key):
+    """Wrap ``func`` such that the time spent in it is added to ``stats``."""
+    def timed_func(*args):
+        with _Timer(stats, key):
+            return func(*args)
+
+    return timed_func
+
+
+def _instrument_files(fh, stats):
+    """Wrap a raw file handle, or nested lists or tuples of them."""
+    if isinstance(fh, (list, tuple)):
+        return fh.__class__(_instrument_files(f, stats) for f in fh)
+    return _InstrumentedFile(fh, stats)
+
+
+def _uninstrument_files(fh):
+    """Remove the wrappers of `_instrument_files`."""
+    if isinstance(fh, (list, tuple)):
+        return fh.__class__(_uninstrument_files(f) for f in fh)
+    return fh.fh if isinstance(fh, _InstrumentedFile) else fh
+
+
+def _index_name(fh_raw):
+    """Name of the sidecar index file for a raw file handle.
+
+    Returns `None` if the file handle does not refer to a named file.
+    """
+    name = getattr(fh_raw, 'name', None)
+    if not isinstance(name, six.string_types):
+        return None
+    return name + '.index.npz'
+
+
 class VLBIFileBase(object):
     """VLBI file wrapper, used to add frame methods to a binary data file.
 
@@ -19,6 +143,18 @@ class VLBIFileBase(object):
 
     def __init__(self, fh_raw):
         self.fh_raw = fh_raw
+        self._mapped = None
+
+    @property
+    def fh_raw(self):
+        """Underlying binary file handle."""
+        return self._fh_raw
+
+    @fh_raw.setter
+    def fh_raw(self, fh_raw):
+        self._fh_raw = fh_raw
+        # A wrapper for mapping would bypass the new file handle.
+        self._release_fh_mapped()
 
     def __getattr__(self, attr):
         """Try to get things on the current open file if it is not on self."""
@@ -37,8 +173,152 @@ class VLBIFileBase(object):
         self.close()
 
     def close(self):
+        self._mapped = None
+        self._release_fh_mapped()
         self.fh_raw.close()
 
+    def memmap(self, dtype=np.uint8, shape=None):
+        """Map part of the file in memory, starting at the current position.
+
+        The underlying file is mapped only once (and again only if it has
+        grown), and the arrays returned are views of that single map.  The
+        file pointer is moved to just after the part returned.
+
+        Parameters
+        ----------
+        dtype : `~numpy.dtype`, optional
+            Data type of the returned array.  Default: `~numpy.uint8`.
+        shape : int or tuple, optional
+            Shape of the returned array.  By default, map to the end of the
+            file.
+
+        Returns
+        -------
+        mapped : `~numpy.memmap`
+            Read-only (unless the file was opened for updating) view of the
+            requested part of the file.
+        """
+        fh = self.fh_raw
+        if hasattr(fh, 'memmap'):
+            # E.g., SequentialFileReader, which knows how to map its files.
+            return fh.memmap(dtype=dtype, shape=shape)
+
+        dtype = np.dtype(dtype)
+        offset = fh.tell()
+        if shape is None:
+            count = None
+        else:
+            if not isinstance(shape, tuple):
+                shape = (shape,)
+            count = dtype.itemsize
+            for k in shape:
+                count *= k
+
+        mapped = self._mapped
+        if (mapped is None or count is None or
+                offset + count > mapped.size):
+            # Map the full file (again, in case it has grown).
+            fh.seek(0, 2)
+            size = fh.tell()
+            fh.seek(offset)
+            if mapped is None or size != mapped.size:
+                if size == 0:
+                    raise EOFError("Cannot map an empty file.")
+                mode = 'r+' if '+' in getattr(fh, 'mode', 'rb') else 'r'
+                mapped = self._mapped = np.memmap(fh, mode=mode,
+                                                  dtype=np.uint8)
+            if count is None:
+                count = (mapped.size - offset) // dtype.itemsize
+                shape = (count,)
+                count *= dtype.itemsize
+            elif offset + count > mapped.size:
+                raise EOFError("Could not map full requested size.")
+
+        result = mapped[offset:offset + count].view(dtype).reshape(shape)
+        fh.seek(offset + count)
+        return result
+
+    _search_block_size = 1 << 16
+    """Number of positions checked at a time when searching for headers."""
+
+    def _read_words(self, start, count, nword):
+        """Read 32-bit little-endian words starting at every byte in a range.
+
+        Bytes beyond the end of the file are taken to be zero.
+
+        Parameters
+        ----------
+        start : int
+            Position in the file of the first byte.
+        count : int
+            Number of positions.
+        nword : int
+            Number of successive words to get for each position.
+
+        Returns
+        -------
+        words : list of `~numpy.ndarray`
+            With ``nword`` arrays of ``count`` words, such that ``words[i]``
+            holds word ``i`` following each position.
+        """
+        fh = self.fh_raw
+        nbyte = count + 4 * nword - 1
+        fh.seek(start)
+        raw = np.frombuffer(fh.read(nbyte), dtype=np.uint8)
+        if len(raw) < nbyte:
+            raw = np.hstack((raw, np.zeros(nbyte - len(raw), np.uint8)))
+        raw = raw.astype(np.uint32)
+        return [raw[i:i+count] | (raw[i+1:i+1+count] << 8) |
+                (raw[i+2:i+2+count] << 16) | (raw[i+3:i+3+count] << 24)
+                for i in range(0, 4 * nword, 4)]
+
+    def _iter_candidates(self, start, stop, forward, plausible, *args):
+        """Iterate over positions at which a header might start.
+
+        Positions are checked in blocks, with a function that should do the
+        checks for all positions in a block at once.  Usually, only simple
+        necessary conditions are checked, so all positions yielded still
+        have to be verified properly.
+
+        Parameters
+        ----------
+        start, stop : int
+            Range of positions to check.
+        forward : bool
+            Whether to yield positions in increasing or decreasing order.
+        plausible : callable
+            Called as ``plausible(block_start, block_stop, *args)``, and
+            should return a boolean array that is `True` for positions in the
+            block at which a header might start.
+        """
+        block_size = self._search_block_size
+        if forward:
+            blocks = [(pos, min(pos + block_size, stop))
+                      for pos in range(start, stop, block_size)]
+        else:
+            blocks = [(max(pos - block_size, start), pos)
+                      for pos in range(stop, start, -block_size)]
+        for block_start, block_stop in blocks:
+            ok = plausible(block_start, block_stop, *args)
+            positions = block_start + np.nonzero(ok)[0]
+            for pos in (positions if forward else positions[::-1]):
+                yield int(pos)
+
+    @lazyproperty
+    def _fh_mapped(self):
+        """Wrapper of the raw file handle for mapping, rather than reading.
+
+        A separate wrapper is used, since stream readers override methods like
+        ``read`` and ``seek``.  Frames read from it have their payloads mapped.
+        """
+        return VLBIFileBase(self.fh_raw)
+
+    def _release_fh_mapped(self):
+        """Remove the wrapper for mapping, releasing its maps (if any)."""
+        fh_mapped = self.__dict__.pop('_fh_mapped', None)
+        if fh_mapped is not None:
+            fh_mapped._mapped = None
+
     def __repr__(self):
         return "{0}(fh_raw={1})".format(self.__class__.__name__, self.fh_raw)
 
@@ -167,6 +447,7 @@ class VLBIStreamBase(VLBIFileBase):
             self._samples_per_frame = samples_per_frame.__index__()
         except Exception:
             raise TypeError("samples per frame must have an integer value.")
+        del self._frame_rate
 
     @property
     def sample_rate(self):
@@ -182,6 +463,72 @@ class VLBIStreamBase(VLBIFileBase):
             exc.args += ("sample rate must have units of 1 / time.",)
             raise
         self._sample_rate = sample_rate
+        del self._frame_rate
+
+    @lazyproperty
+    def _frame_rate(self):
+        """Integer number of frames per second, for frame bookkeeping."""
+        return int(np.round((self.sample_rate /
+                             self.samples_per_frame).to_value(u.Hz)))
+
+    _stats = None
+
+    @property
+    def instrument(self):
+        """Whether counters and timings of reading or writing are kept.
+
+        If `True`, the raw file is wrapped such that bytes read or written,
+        and time spent doing so, are counted, and the stream counts seeks,
+        frames read, samples decoded, cache hits and misses, and time spent
+        decoding and copying data to the output.  The results are available
+        via `instrument_info`.  Turning instrumentation off discards them.
+        """
+        return self._stats is not None
+
+    @instrument.setter
+    def instrument(self, instrument):
+        if bool(instrument) == self.instrument:
+            return
+        if instrument:
+            self._stats = dict.fromkeys(INSTRUMENT_KEYS, 0)
+            self.fh_raw = _instrument_files(self.fh_raw, self._stats)
+        else:
+            self.fh_raw = _uninstrument_files(self.fh_raw)
+            self._stats = None
+
+    def instrument_info(self):
+        """Counters and timings of an instrumented stream.
+
+        Returns
+        -------
+        info : dict
+            With numbers of ``bytes_read``, ``bytes_written``, ``seeks``,
+            ``frames_read``, ``samples_decoded``, ``cache_hits``, and
+            ``cache_misses``, as well as times in seconds spent reading from
+            and writing to the raw file (``read_time``, ``write_time``),
+            decoding (``decode_time``; summed over threads), and copying
+            decoded data to the output (``copy_time``).  Data that are
+            mapped from the file, rather than read, are not counted as read.
+            `None` if `instrument` is `False`.
+        """
+        return None if self._stats is None else dict(self._stats)
+
+    def instrument_clear(self):
+        """Reset all counters and timings of an instrumented stream."""
+        if self._stats is not None:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def _timing(self, key):
+        """Context in which time is added to ``key`` if instrumented."""
+        if self._stats is None:
+            return _null_timer
+        return _Timer(self._stats, key)
+
+    def _count(self, key, number=1):
+        """Increase the ``key`` counter if instrumented."""
+        if self._stats is not None:
+            self._stats[key] += number
 
     def tell(self, unit=None):
         """Current offset in file.
@@ -206,13 +553,13 @@ class VLBIStreamBase(VLBIFileBase):
 
         return (self.offset / self.sample_rate).to(unit)
 
-    def _frame_info(self):
-        offset = (self.offset +
-                  self.header0['frame_nr'] * self.samples_per_frame)
-        framerate = int(np.round(
-            (self.sample_rate / self.samples_per_frame).to_value(u.Hz)))
+    def _frame_info(self, offset=None):
+        # offset can be an array, to get information for multiple frames.
+        if offset is None:
+            offset = self.offset
+        offset = offset + self.header0['frame_nr'] * self.samples_per_frame
         full_frame_nr, extra = divmod(offset, self.samples_per_frame)
-        dt, frame_nr = divmod(full_frame_nr, framerate)
+        dt, frame_nr = divmod(full_frame_nr, self._frame_rate)
         return dt, frame_nr, extra
 
     def __repr__(self):
@@ -233,8 +580,11 @@ class VLBIStreamReaderBase(VLBIStreamBase):
 
         if sample_rate is None:
             try:
-                sample_rate = (samples_per_frame *
-                               self._get_frame_rate(fh_raw, header0)).to(u.MHz)
+                if self._index is not None:
+                    frame_rate = self._index['frame_rate'] * u.Hz
+                else:
+                    frame_rate = self._get_frame_rate(fh_raw, header0)
+                sample_rate = (samples_per_frame * frame_rate).to(u.MHz)
 
             except Exception as exc:
                 exc.args += ("the sample rate could not be auto-detected. "
@@ -248,6 +598,316 @@ class VLBIStreamReaderBase(VLBIStreamBase):
             fh_raw, header0, sample_shape, bps, complex_data, thread_ids,
             samples_per_frame, sample_rate, squeeze)
 
+    _nthreads = 1
+    _pool = None
+    _decode_tasks = None
+
+    @property
+    def nthreads(self):
+        """Number of threads used to decode data.
+
+        For more than one, large reads are split in frame-aligned chunks that
+        are decoded concurrently into separate parts of the output (decoding
+        mostly happens in numpy and releases the GIL).
+        """
+        return self._nthreads
+
+    @nthreads.setter
+    def nthreads(self, nthreads):
+        nthreads = operator.index(nthreads)
+        if nthreads < 1:
+            raise ValueError("number of threads should be at least 1.")
+        self._close_pool()
+        self._nthreads = nthreads
+
+    def _close_pool(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def close(self):
+        self._close_pool()
+        super(VLBIStreamReaderBase, self).close()
+
+    def _raw_frame_layout(self):
+        """Offset of the first frame in the raw file, and the frame size."""
+        return 0, self.header0.framesize
+
+    _cache_size = 0
+    _cache_hits = _cache_misses = 0
+
+    @property
+    def cache_size(self):
+        """Maximum number of decoded frames kept in memory.
+
+        If non-zero, reads use decoded frames from a least-recently-used
+        cache, keyed by frame number, so that repeatedly reading overlapping
+        parts of the stream does not require reading and decoding the same
+        frames again.  Statistics are available via `cache_info`.
+        """
+        return self._cache_size
+
+    @cache_size.setter
+    def cache_size(self, cache_size):
+        cache_size = operator.index(cache_size)
+        if cache_size < 0:
+            raise ValueError("cache size cannot be negative.")
+        self._cache_size = cache_size
+        cache = self._frame_cache
+        while len(cache) > cache_size:
+            cache.popitem(last=False)
+
+    @lazyproperty
+    def _frame_cache(self):
+        return OrderedDict()
+
+    def cache_info(self):
+        """Statistics of the decoded-frame cache.
+
+        Returns
+        -------
+        info : `~baseband.vlbi_base.base.CacheInfo`
+            Named tuple with the number of ``hits`` and ``misses``, the
+            maximum size (``maxsize``), and the number of frames currently
+            held (``currsize``).
+        """
+        return CacheInfo(self._cache_hits, self._cache_misses,
+                         self.cache_size, len(self._frame_cache))
+
+    def cache_clear(self):
+        """Empty the decoded-frame cache and reset its statistics."""
+        self._frame_cache.clear()
+        self._cache_hits = self._cache_misses = 0
+
+    def _decode_frame(self, frame_index):
+        """Read and decode a frame, for storage in the cache.
+
+        Should be defined by subclasses that support caching.  It will only be
+        called when the stream offset is inside the frame.
+
+        Returns
+        -------
+        data : `~numpy.ndarray` or None
+            Decoded data for the selected threads, with shape
+            ``(samples_per_frame,) + sample_shape`` (unsqueezed); `None` if
+            the whole frame is invalid.
+        invalid : `~numpy.ndarray` or None
+            Boolean mask which, when broadcast against ``data``, selects the
+            parts that are invalid; its first dimension can have length unity
+            or ``samples_per_frame``.  `None` if all data are valid.
+        """
+        raise NotImplementedError
+
+    def _read_cached(self, out, frame_index, sample_offset, fill_value):
+        """Copy data from a frame into ``out``, using the cache."""
+        cache = self._frame_cache
+        stats = self._stats
+        try:
+            entry = cache.pop(frame_index)
+        except KeyError:
+            self._cache_misses += 1
+            if stats is None:
+                entry = self._decode_frame(frame_index)
+            else:
+                # Count time spent decoding, but not that spent reading.
+                read_time = stats['read_time']
+                with self._timing('decode_time'):
+                    entry = self._decode_frame(frame_index)
+                stats['decode_time'] -= stats['read_time'] - read_time
+                stats['cache_misses'] += 1
+                stats['samples_decoded'] += self.samples_per_frame
+            while len(cache) >= self.cache_size:
+                cache.popitem(last=False)
+        else:
+            self._cache_hits += 1
+            self._count('cache_hits')
+        # Insert (again) at the end, as most recently used.
+        cache[frame_index] = entry
+
+        data, invalid = entry
+        with self._timing('copy_time'):
+            if data is None:
+                out[...] = fill_value
+                return
+
+            sample_slice = slice(sample_offset, sample_offset + len(out))
+            out[...] = data[sample_slice]
+            if invalid is not None:
+                if len(invalid) > 1:
+                    invalid = invalid[sample_slice]
+                np.copyto(out, fill_value, where=invalid)
+
+    _crc_block_size = 1024
+    """Number of frames for which header CRCs are checked in one go."""
+
+    @lazyproperty
+    def _crc_blocks(self):
+        return {}
+
+    def _check_crcs(self, raw_headers):
+        """Check the CRCs of many headers.
+
+        Should be defined by subclasses that support ``verify='crc'``.
+
+        Parameters
+        ----------
+        raw_headers : `~numpy.ndarray`
+            Raw header bytes as read from the file, with shape
+            ``(nframe, header0.size)``.
+
+        Returns
+        -------
+        ok : `~numpy.ndarray`
+            Boolean array with length ``nframe``.
+        """
+        raise NotImplementedError
+
+    def _read_raw_headers(self, start, nframe, framesize=None):
+        """Read the raw bytes of the headers of a range of frames.
+
+        Frames are assumed to follow each other with a fixed size, starting
+        at the offset given by ``_raw_frame_layout``.  The headers are read
+        from a map of the file if possible.  The file pointer is restored.
+
+        Parameters
+        ----------
+        start : int
+            Index of the first frame.
+        nframe : int
+            Number of frames (truncated at the end of the file).
+        framesize : int, optional
+            Size of a frame.  By default, taken from ``_raw_frame_layout``.
+
+        Returns
+        -------
+        raw_headers : `~numpy.ndarray`
+            Contiguous uint8 array with shape ``(nframe, header0.size)``.
+        """
+        offset0, layout_size = self._raw_frame_layout()
+        if framesize is None:
+            framesize = layout_size
+        headersize = self.header0.size
+        fh = self.fh_raw
+        offset = fh.tell()
+        fh.seek(0, 2)
+        nframe = max(min((fh.tell() - offset0) // framesize - start, nframe),
+                     0)
+        start = offset0 + start * framesize
+        fh.seek(start)
+        try:
+            raw_headers = np.ascontiguousarray(
+                self.memmap(shape=(nframe, framesize))[:, :headersize])
+        except Exception:
+            raw_headers = np.empty((nframe, headersize), np.uint8)
+            for i in range(nframe):
+                fh.seek(start + i * framesize)
+                raw_headers[i] = np.frombuffer(fh.read(headersize),
+                                               np.uint8)
+        fh.seek(offset)
+        return raw_headers
+
+    def _crc_ok(self, frame_index):
+        """Whether the header CRC of a given frame is correct.
+
+        The CRCs are checked for blocks of frames at a time, reading the
+        headers from a map of the file if possible, and the results are
+        kept for later use.
+        """
+        block_index, index = divmod(frame_index, self._crc_block_size)
+        crc_ok = self._crc_blocks.get(block_index)
+        if crc_ok is None:
+            crc_ok = self._crc_blocks[block_index] = self._check_crcs(
+                self._read_raw_headers(block_index * self._crc_block_size,
+                                       self._crc_block_size))
+
+        return index >= len(crc_ok) or bool(crc_ok[index])
+
+    @property
+    def prefetch(self):
+        """Number of frames read ahead in a background thread.
+
+        If non-zero, the raw file is wrapped in a
+        `~baseband.helpers.prefetch.PrefetchReader`, which, while decoded
+        data are being used, reads the frames following the current one.
+        Not useful (and not allowed) when payloads are mapped from the file.
+        """
+        fh = _uninstrument_files(self.fh_raw)
+        return fh.nblock if isinstance(fh, PrefetchReader) else 0
+
+    @prefetch.setter
+    def prefetch(self, prefetch):
+        # Any instrumentation wrapper stays outermost, so that only the
+        # time spent waiting for data is counted.
+        fh = _uninstrument_files(self.fh_raw)
+        if isinstance(fh, PrefetchReader):
+            fh = fh.detach()
+        if prefetch:
+            if getattr(self, '_memmap', False):
+                raise ValueError("cannot prefetch frames that are mapped "
+                                 "from the file.")
+            offset, framesize = self._raw_frame_layout()
+            fh = PrefetchReader(fh, framesize, prefetch, offset=offset)
+        self.fh_raw = (fh if self._stats is None
+                       else _instrument_files(fh, self._stats))
+
+    @contextmanager
+    def _decoding(self, count):
+        """Context in which decoding tasks are gathered for the thread pool.
+
+        Within the context, tasks passed to ``_decode`` are collected in
+        chunks of about ``count / nthreads`` samples, and each chunk is
+        decoded by a thread of the pool while the next one is being read.
+        On exit, waits for all tasks to finish.  If ``nthreads`` is 1, tasks
+        are simply executed when passed in.
+        """
+        if self.nthreads == 1:
+            yield
+            return
+
+        if self._pool is None:
+            self._pool = ThreadPool(self.nthreads)
+        self._decode_tasks = []
+        self._decode_nsample = 0
+        self._decode_chunk = -(-count // self.nthreads)
+        results = self._decode_results = []
+        try:
+            yield
+            self._submit_decode_tasks()
+        finally:
+            self._decode_tasks = self._decode_results = None
+            for result in results:
+                result.wait()
+        # Raise any exception that occurred in one of the threads.
+        for result in results:
+            result.get()
+
+    def _decode(self, nsample, func, *args):
+        """Decode ``nsample`` samples by calling ``func(*args)``.
+
+        Should only be used for functions that write into disjoint parts of
+        the output array.  Outside of a ``_decoding`` context, or if
+        ``nthreads`` is 1, the function is called immediately.
+        """
+        if self._stats is not None:
+            self._stats['samples_decoded'] += nsample
+            func = _timed(func, self._stats, 'decode_time')
+
+        if self._decode_tasks is None:
+            func(*args)
+            return
+
+        self._decode_tasks.append((func, args))
+        self._decode_nsample += nsample
+        if self._decode_nsample >= self._decode_chunk:
+            self._submit_decode_tasks()
+
+    def _submit_decode_tasks(self):
+        if self._decode_tasks:
+            self._decode_results.append(
+                self._pool.apply_async(_run_tasks, (self._decode_tasks,)))
+        self._decode_tasks = []
+        self._decode_nsample = 0
+
     @staticmethod
     def _get_frame_rate(fh, header_template):
         """Returns the number of frames per second.
@@ -267,9 +927,14 @@ class VLBIStreamReaderBase(VLBIStreamBase):
         Notes
         -----
 
-        The function cycles through headers, starting from the file pointer's
-        current position, to find the next frame whose frame number is zero
-        while keeping track of the largest frame number yet found.
+        The function reads the header at the file pointer's current position,
+        and then uses that all frames have the same size to find the first
+        frame of the next second, by stepping forward by exponentially larger
+        numbers of frames until the seconds differ, and then bisecting.  The
+        frame number of the frame just before is the largest one.  If the
+        frame numbers found are not consistent with this (e.g., because frames
+        are missing), it falls back to cycling through all headers, keeping
+        track of the largest frame number until one is zero.
 
         ``_get_frame_rate`` is called when the sample rate is not user-provided
         or deducable from header information.  If less than one second of data
@@ -278,27 +943,227 @@ class VLBIStreamReaderBase(VLBIStreamBase):
         correct.
         """
         oldpos = fh.tell()
-        header = header_template.fromfile(fh)
-        frame_nr0 = header['frame_nr']
-        sec0 = header.seconds
-        while header['frame_nr'] == frame_nr0:
-            fh.seek(header.payloadsize, 1)
-            header = header_template.fromfile(fh)
-        max_frame = frame_nr0
-        while header['frame_nr'] > 0:
-            max_frame = max(header['frame_nr'], max_frame)
-            fh.seek(header.payloadsize, 1)
-            header = header_template.fromfile(fh)
-
-        if header.seconds != sec0 + 1:  # pragma: no cover
-            warnings.warn("header time changed by more than 1 second?")
-
-        fh.seek(oldpos)
+        try:
+            header0 = header_template.fromfile(fh)
+            frame_nr0 = header0['frame_nr']
+            sec0 = header0.seconds
+            framesize = header0.framesize
+            fh.seek(0, 2)
+            nframe = (fh.tell() - oldpos) // framesize
+
+            def read_header(index):
+                fh.seek(oldpos + index * framesize)
+                return header_template.fromfile(fh)
+
+            # Find a frame in a later second, doubling the step each time.
+            lo, hi, header = 0, 0, header0
+            while header.seconds == sec0:
+                if hi >= nframe - 1:
+                    raise EOFError("less than one second of data in file.")
+                lo, hi = hi, min(max(2 * hi, 1), nframe - 1)
+                header = read_header(hi)
+            # Bisect to find the first frame in that later second.
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                mid_header = read_header(mid)
+                if mid_header.seconds == sec0:
+                    lo = mid
+                else:
+                    hi, header = mid, mid_header
+
+            max_frame = read_header(lo)['frame_nr']
+            if header['frame_nr'] != 0 or max_frame < frame_nr0:
+                # Frames are missing or out of order; check all of them.
+                fh.seek(oldpos)
+                header = header_template.fromfile(fh)
+                while header['frame_nr'] == frame_nr0:
+                    fh.seek(header.payloadsize, 1)
+                    header = header_template.fromfile(fh)
+                max_frame = frame_nr0
+                while header['frame_nr'] > 0:
+                    max_frame = max(header['frame_nr'], max_frame)
+                    fh.seek(header.payloadsize, 1)
+                    header = header_template.fromfile(fh)
+
+            if header.seconds != sec0 + 1:  # pragma: no cover
+                warnings.warn("header time changed by more than 1 second?")
+
+        finally:
+            fh.seek(oldpos)
+
         return (max_frame + 1) * u.Hz
 
+    _index_version = 2
+    _index_keys = ('version', 'format', 'file_size', 'file_mtime',
+                   'frame_rate', 'last_header_offset')
+
+    @lazyproperty
+    def _index(self):
+        """Stream information from the sidecar index file.
+
+        `None` if there is no index file, or if it is out of date (i.e., the
+        size or modification time of the raw file differ from those recorded,
+        or it was written by a different reader or version).
+        """
+        name = _index_name(self.fh_raw)
+        if name is None or not os.path.exists(name):
+            return None
+
+        try:
+            with np.load(name) as npz:
+                index = {key: npz[key][()] for key in self._index_keys
+                         if key in npz.files}
+        except (IOError, OSError, ValueError, KeyError, zipfile.BadZipfile,
+                AttributeError, TypeError):
+            # Truncated, corrupt or foreign file (the latter two for a file
+            # that is not an archive at all); just do without.
+            return None
+
+        stat = os.stat(self.fh_raw.name)
+        if (index.get('version') != self._index_version or
+                index.get('format') != type(self).__name__ or
+                index.get('file_size') != stat.st_size or
+                index.get('file_mtime') != stat.st_mtime):
+            return None
+
+        return index
+
+    def build_index(self):
+        """Write a sidecar index file for the raw file underlying the stream.
+
+        The index is written next to the raw file, with '.index.npz'
+        appended to its name.  It records what is otherwise found by
+        searching through the file on opening, i.e., the frame rate and the
+        location of the last header (and, for VDIF, the order of the threads
+        within a frame set).  It can be inspected with `numpy.load`.
+
+        When opening a file for which an up-to-date index exists, it is used
+        automatically to get the sample rate (if not given) and the last
+        header, so that no searches through the file are needed.
+
+        Returns
+        -------
+        name : str
+            Name of the index file.
+        """
+        name = _index_name(self.fh_raw)
+        if name is None:
+            raise ValueError("can only build an index for a named file.")
+
+        index = self._index_entries()
+        stat = os.stat(self.fh_raw.name)
+        np.savez(name, version=self._index_version,
+                 format=type(self).__name__,
+                 file_size=stat.st_size, file_mtime=stat.st_mtime, **index)
+        del self._index
+        return name
+
+    _index_block_size = 1024
+    """Number of frames for which headers are checked in one go."""
+
+    def _index_entries(self):
+        """Stream-level entries to store in the sidecar index."""
+        return {'frame_rate': (self.sample_rate /
+                               self.samples_per_frame).to_value(u.Hz),
+                'last_header_offset': self._last_header_offset()}
+
+    def _header_words(self, raw_headers):
+        """Interpret raw headers as header words.
+
+        Parameters
+        ----------
+        raw_headers : `~numpy.ndarray`
+            Raw header bytes as read from the file, with shape
+            ``(nframe, header0.size)``.
+
+        Returns
+        -------
+        words : `~numpy.ndarray`
+            With shape ``(nframe, nword)``, i.e., as can be passed on to
+            ``header0.sequence_time``.
+        """
+        return raw_headers.view('<u4')
+
+    def _same_stream(self, words):
+        """Which of many headers are consistent with the first one.
+
+        Should be defined by subclasses that support `build_index`.
+
+        Parameters
+        ----------
+        words : `~numpy.ndarray`
+            Header words as given by ``_header_words``.
+
+        Returns
+        -------
+        ok : `~numpy.ndarray`
+            Boolean array with length ``nframe``.
+        """
+        raise NotImplementedError
+
+    def _last_header_offset(self):
+        """Byte offset of the last header of the file.
+
+        The headers of all frames are checked in bulk, in blocks going
+        backward from the end of the file, for consistency with the first
+        header (and, if present, for having the same thread ID).
+        """
+        offset0 = self._raw_frame_layout()[0]
+        header0 = self.header0
+        framesize = header0.framesize
+        raw_offset = self.fh_raw.tell()
+        self.fh_raw.seek(0, 2)
+        nframe = (self.fh_raw.tell() - offset0) // framesize
+        self.fh_raw.seek(raw_offset)
+        block_size = self._index_block_size
+        for start in range((nframe - 1) // block_size * block_size,
+                           -1, -block_size):
+            words = self._header_words(self._read_raw_headers(
+                start, block_size, framesize=framesize))
+            ok = self._same_stream(words)
+            if 'thread_id' in header0:
+                ok &= (header0._header_parser.parsers['thread_id'](
+                    np.rollaxis(words, -1)) == header0['thread_id'])
+            found = np.nonzero(ok)[0]
+            if len(found):
+                return offset0 + (start + found[-1]) * framesize
+
+        raise ValueError("corrupt VLBI file? No valid frame found.")
+
+    def _read_header_at(self, offset):
+        """Read the header at a given byte offset in the raw file.
+
+        Returns `None` if no header consistent with the first one is found
+        exactly at the offset.  The file pointer is not restored.
+        """
+        self.fh_raw.seek(offset)
+        header = self.find_header(template_header=self.header0,
+                                  maximum=self.header0.framesize)
+        if header is None or self.fh_raw.tell() != offset:
+            return None
+        return header
+
+    def _indexed_last_header(self):
+        """Last header of the file, as recorded in the index.
+
+        Returns `None` if there is no index or the header cannot be read.
+        The file pointer is not changed.
+        """
+        if self._index is None:
+            return None
+        raw_offset = self.fh_raw.tell()
+        last_header = self._read_header_at(
+            int(self._index['last_header_offset']))
+        self.fh_raw.seek(raw_offset)
+        return last_header
+
     @lazyproperty
     def _last_header(self):
         """Last header of the file."""
+        last_header = self._indexed_last_header()
+        if last_header is not None:
+            return last_header
+
         raw_offset = self.fh_raw.tell()
         self.fh_raw.seek(-self.header0.framesize, 2)
         last_header = self.find_header(template_header=self.header0,
@@ -351,6 +1216,7 @@ class VLBIStreamReaderBase(VLBIStreamBase):
             or ``'end'`` for ``0``, ``1``, or ``2``, respectively.  Ignored if
             ``offset`` is a time.`
         """
+        self._count('seeks')
         try:
             offset = offset.__index__()
         except Exception:
@@ -375,8 +1241,102 @@ class VLBIStreamReaderBase(VLBIStreamBase):
 
         return self.offset
 
+    def iter_blocks(self, block_size, overlap=0, reuse_buffer=False,
+                    **kwargs):
+        """Iterate over successive blocks of decoded data.
+
+        Blocks start at the current offset and are read with `read`, so
+        they cross frame boundaries as needed.  Samples shared between
+        consecutive blocks are copied rather than decoded again.  The last
+        block is shorter than ``block_size`` if the file does not contain
+        enough samples to fill it.  Iterating moves the stream position.
+
+        Parameters
+        ----------
+        block_size : int
+            Number of complete samples in each block.
+        overlap : int, optional
+            Number of samples at the end of a block that are repeated at the
+            start of the next one.  Should be smaller than ``block_size``.
+            Default: 0.
+        reuse_buffer : bool, optional
+            If `True`, all blocks are views of a single array, which is
+            overwritten for every new block.  This bounds memory use, but
+            requires each block to be used (or copied) before the next one
+            is requested.  Default: `False`.
+        **kwargs
+            Further arguments are passed on to `read` (e.g., ``fill_value``).
+            Since the blocks are allocated here, ``out`` cannot be given.
+
+        Yields
+        ------
+        block : `~numpy.ndarray`
+            Decoded samples, with the same shape and dtype as returned by
+            `read` (but with at most ``block_size`` samples).
+        """
+        if 'out' in kwargs:
+            raise TypeError("iter_blocks allocates the blocks itself, so "
+                            "'out' cannot be given; use reuse_buffer to "
+                            "avoid allocating a new array for every block.")
+        block_size = operator.index(block_size)
+        overlap = operator.index(overlap)
+        if not 0 <= overlap < block_size:
+            raise ValueError("overlap should be non-negative and smaller "
+                             "than block_size.")
+
+        count = min(block_size, self.size - self.offset)
+        if count <= 0:
+            return
+        block = self.read(count, **kwargs)
+        buffer_ = block
+        while True:
+            yield block
+            count = min(block_size - overlap, self.size - self.offset)
+            if count <= 0:
+                return
+            if reuse_buffer and len(buffer_) == block_size:
+                new_block = buffer_[:overlap + count]
+            else:
+                new_block = np.empty((overlap + count,) + block.shape[1:],
+                                     block.dtype)
+            if overlap:
+                new_block[:overlap] = block[len(block) - overlap:]
+            self.read(out=new_block[overlap:], **kwargs)
+            block = new_block
+
+
+def _run_tasks(tasks):
+    for func, args in tasks:
+        func(*args)
+
 
 class VLBIStreamWriterBase(VLBIStreamBase):
+    def _write_encoded(self, headers, words):
+        """Write complete frames with one call to the raw file handle.
+
+        Parameters
+        ----------
+        headers : list of header instances or `~numpy.ndarray`
+            Headers of the frames, written using their ``tofile`` method,
+            or an array of header words with one row per frame (see
+            `~baseband.vlbi_base.header.VLBIHeaderBase.sequence_words`).
+        words : `~numpy.ndarray`
+            Encoded payloads of all frames, concatenated.
+        """
+        if isinstance(headers, np.ndarray):
+            nframe = len(headers)
+            frames = np.hstack((headers.view('u1').reshape(nframe, -1),
+                                words.view('u1').reshape(nframe, -1)))
+            self.fh_raw.write(frames.tostring())
+            return
+
+        buf = io.BytesIO()
+        for header, payload in zip(headers,
+                                   words.reshape(len(headers), -1)):
+            header.tofile(buf)
+            buf.write(payload.tostring())
+        self.fh_raw.write(buf.getvalue())
+
     def close(self):
         extra = self.offset % self.samples_per_frame
         if extra != 0:
@@ -5,8 +5,9 @@ import numpy as np
 
 
 __all__ = ['OPTIMAL_2BIT_HIGH', 'TWO_BIT_1_SIGMA', 'FOUR_BIT_1_SIGMA',
-           'EIGHT_BIT_1_SIGMA', 'decoder_levels', 'encode_2bit_base',
-           'encode_4bit_base', 'decode_8bit', 'encode_8bit']
+           'EIGHT_BIT_1_SIGMA', 'decoder_levels', 'decoder_out',
+           'encode_2bit_base', 'encode_4bit_base', 'decode_8bit',
+           'encode_8bit']
 
 
 # The high mag value for 2-bit reconstruction.  Note that mark5access uses
@@ -56,6 +57,31 @@ decoder_levels = {
     4: (np.arange(16, dtype=np.float32) - 8.)/FOUR_BIT_1_SIGMA}
 """Levels for data encoded with different numbers of bits.."""
 
+
+
+def decoder_out(out, shape):
+    """View of an output array given to a decoder, with the needed shape.
+
+    Parameters
+    ----------
+    out : `~numpy.ndarray`
+        Array in which decoded values are to be stored.  It should be
+        contiguous, since otherwise it cannot be filled in-place.
+    shape : tuple
+        Shape needed by the decoder.
+
+    Raises
+    ------
+    ValueError
+        If ``out`` is not contiguous.
+    """
+    if not out.flags['C_CONTIGUOUS']:
+        raise ValueError("output array for decoding should be contiguous.")
+    out = out.view()
+    out.shape = shape
+    return out
+
+
 two_bit_2_sigma = 2 * TWO_BIT_1_SIGMA
 clip_low, clip_high = -1.5 * TWO_BIT_1_SIGMA, 1.5 * TWO_BIT_1_SIGMA
 
@@ -114,7 +140,7 @@ def encode_4bit_base(values):
     return np.clip(values, 0., 15., out=values).astype(np.uint8)
 
 
-def decode_8bit(words):
+def decode_8bit(words, out=None):
     """Generic decoder for data stored using 8 bits.
 
     We follow mark5access, which assumes the values 0 to 255 encode
@@ -123,8 +149,21 @@ def decode_8bit(words):
 
     For comparison, GMRT phased data treats the 8-bit data values simply
     as signed integers.
+
+    Parameters
+    ----------
+    words : `~numpy.ndarray`
+        Encoded data.
+    out : `~numpy.ndarray`, optional
+        Array in which to store the decoded values, instead of allocating
+        a new one.  Should be a contiguous float32 array with as many elements
+        as there are bytes in ``words``, so that it can be reshaped as needed.
     """
-    b = words.view(np.uint8).astype(np.float32)
+    if out is None:
+        b = words.view(np.uint8).astype(np.float32)
+    else:
+        b = decoder_out(out, words.view(np.uint8).shape)
+        b[...] = words.view(np.uint8)
     b -= 127.5
     b /= EIGHT_BIT_1_SIGMA
     return b
@@ -146,11 +146,16 @@ class VLBIFrameBase(object):
 
     # Header behaves as a dictionary, while Payload can be indexed/sliced.
     # Let frame behave appropriately.
-    def __getitem__(self, item=()):
+    # If ``out`` is given, data are decoded directly into it (see
+    # ``VLBIPayloadBase.__getitem__``); for invalid frames, it is just filled.
+    def __getitem__(self, item=(), out=None):
         if isinstance(item, six.string_types):
             return self.header.__getitem__(item)
+        elif out is not None and not self.valid:
+            out[...] = self.invalid_data_value
+            return out
         else:
-            data = self.payload.__getitem__(item)
+            data = self.payload.__getitem__(item, out=out)
             if not self.valid:
                 data[...] = self.invalid_data_value
             return data
@@ -110,7 +110,9 @@ def make_setter(word_index, bit_index, bit_length, default=None):
             value = default
         bit_mask = (1 << bit_length) - 1
         # Check that value will fit within the bit limits.
-        if np.any(value & bit_mask != value):
+        out_of_range = value & bit_mask != value
+        if (out_of_range.any() if isinstance(out_of_range, np.ndarray)
+                else out_of_range):
             raise ValueError("{0} cannot be represented with {1} bits"
                              .format(value, bit_length))
         if bit_length == 64:
@@ -192,16 +194,17 @@ class HeaderParser(OrderedDict):
     return the default value (if defined).
 
     Note that while in principle, parsers and setters could be calculated on
-    the fly, we precalculate the parsers to speed up header keyword access.
+    the fly, we precalculate them to speed up header keyword access.
     """
 
     def __init__(self, *args, **kwargs):
         self._make_parser = kwargs.pop('make_parser', make_parser)
         self._make_setter = kwargs.pop('make_setter', make_setter)
         self._get_default = kwargs.pop('get_default', get_default)
-        # Use a dict rather than OrderedDict for the parsers for better speed.
-        # Note that this gets filled by calls to __setitem__.
+        # Use a dict rather than OrderedDict for the parsers and setters for
+        # better speed.  Note that these get filled by calls to __setitem__.
         self._parsers = {}
+        self._setters = {}
         super(HeaderParser, self).__init__(*args, **kwargs)
 
     def copy(self):
@@ -219,6 +222,7 @@ class HeaderParser(OrderedDict):
 
     def __setitem__(self, item, value):
         self._parsers[item] = self._make_parser(*value)
+        self._setters[item] = self._make_setter(*value)
         super(HeaderParser, self).__setitem__(item, value)
 
     @property
@@ -226,14 +230,15 @@ class HeaderParser(OrderedDict):
         """Dict with functions to get specific header values."""
         return self._parsers
 
+    @property
+    def setters(self):
+        """Dict with functions to set specific header values."""
+        return self._setters
+
     defaults = HeaderPropertyGetter(
         '_get_default',
         doc="Dict-like allowing access to default header values.")
 
-    setters = HeaderPropertyGetter(
-        '_make_setter',
-        doc="Dict-like returning function to set specific header value.")
-
     def update(self, other):
         """Update the parser with the information from another one."""
         if not isinstance(other, HeaderParser):
@@ -241,6 +246,7 @@ class HeaderParser(OrderedDict):
         super(HeaderParser, self).update(other)
         # Update the parsers rather than recalculate all the functions.
         self._parsers.update(other._parsers)
+        self._setters.update(other._setters)
 
 
 class VLBIHeaderBase(object):
@@ -445,6 +451,65 @@ class VLBIHeaderBase(object):
         if verify:
             self.verify()
 
+    def sequence_words(self, **kwargs):
+        """Header words for a sequence of frames, with this as template.
+
+        All words are copied from this header, except for the parts set by
+        the keys or properties passed in, which can have a different value
+        for every header in the sequence.  This avoids creating and updating
+        header instances one by one, e.g., when writing many frames at once.
+
+        Parameters
+        ----------
+        **kwargs
+            Header keys or properties (as for `update`), with (array) values
+            that are broadcast against each other.
+
+        Returns
+        -------
+        words : `~numpy.ndarray`
+            Header words, with the broadcast shape of the values plus a
+            trailing dimension for the words (e.g., ``(nheader, nword)``).
+            For headers written as little-endian 32-bit words (such as VDIF
+            and Mark 5B), ``words.tostring()`` thus gives the packed headers.
+        """
+        shape = np.broadcast(np.empty((), bool), *[
+            np.empty(getattr(value, 'shape', np.shape(value)), bool)
+            for value in kwargs.values()]).shape
+        words = np.empty(shape + (len(self.words),),
+                         getattr(self.words, 'dtype', '<u4'))
+        words[...] = self.words
+        template = self.copy()
+        # Let the template set values in all headers at once.
+        template.words = np.rollaxis(words, -1)
+        template.update(verify=False, **kwargs)
+        return words
+
+    def sequence_time(self, words, *args, **kwargs):
+        """Times for a sequence of header words, with this as template.
+
+        The inverse of `sequence_words`: rather than creating header instances
+        one by one, all header words are interpreted at once, giving a single
+        `~astropy.time.Time` instance.  Information not stored in the words
+        (e.g., the thousands of MJD for Mark 5B) is taken from this header.
+
+        Parameters
+        ----------
+        words : `~numpy.ndarray`
+            Header words, with a trailing dimension for the words (e.g.,
+            ``(nheader, nword)``).
+        *args, **kwargs
+            Any further arguments are passed on to the ``get_time`` method.
+
+        Returns
+        -------
+        time : `~astropy.time.Time`
+            With the shape of ``words`` except for the trailing dimension.
+        """
+        template = self.copy()
+        template.words = np.rollaxis(words, -1)
+        return template.get_time(*args, **kwargs)
+
     def __getitem__(self, item):
         """Get the value a particular header item from the header words."""
         try:
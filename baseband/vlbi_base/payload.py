@@ -74,17 +74,58 @@ class VLBIPayloadBase(object):
             Handle to the file from which data is read
         payloadsize : int
             Number of bytes to read (default: as given in ``cls._size``.
+        memmap : bool, optional
+            If `False` (default), read from file.  Otherwise, map the file in
+            memory (see `~numpy.memmap`).
 
         Any other (keyword) arguments are passed on to the class initialiser.
         """
         payloadsize = kwargs.pop('payloadsize', cls._size)
+        memmap = kwargs.pop('memmap', False)
         if payloadsize is None:
             raise ValueError("Payloadsize should be given as an argument "
                              "if no default is defined on the class.")
-        s = fh.read(payloadsize)
-        if len(s) < payloadsize:
-            raise EOFError("Could not read full payload.")
-        return cls(np.frombuffer(s, dtype=cls._dtype_word), *args, **kwargs)
+        words = cls._words_fromfile(fh, payloadsize, cls._dtype_word, memmap)
+        return cls(words, *args, **kwargs)
+
+    @staticmethod
+    def _words_fromfile(fh, payloadsize, dtype, memmap=False):
+        """Read or map encoded words from a file handle.
+
+        Parameters
+        ----------
+        fh : filehandle
+            Handle to the file which will be read or mapped.  If it has a
+            ``memmap`` method (like `~baseband.vlbi_base.base.VLBIFileBase`
+            and `~baseband.helpers.sequentialfile.SequentialFileReader`),
+            that is used for mapping.
+        payloadsize : int or None
+            Number of bytes to read.  Can only be `None` for mapping, in which
+            case the file is mapped to its end.
+        dtype : `~numpy.dtype`
+            Type of the encoded words.
+        memmap : bool, optional
+            If `False` (default), read from file.  Otherwise, map the file in
+            memory (see `~numpy.memmap`).
+        """
+        dtype = np.dtype(dtype)
+        if not memmap:
+            s = fh.read(payloadsize)
+            if len(s) < payloadsize:
+                raise EOFError("Could not read full payload.")
+            return np.frombuffer(s, dtype=dtype)
+
+        shape = (None if payloadsize is None else
+                 (payloadsize // dtype.itemsize,))
+        if hasattr(fh, 'memmap'):
+            return fh.memmap(dtype=dtype, shape=shape)
+
+        mode = fh.mode.replace('b', '')
+        offset = fh.tell()
+        words = np.memmap(fh, mode=mode, dtype=dtype, offset=offset,
+                          shape=shape)
+        fh.seek(offset + words.size * words.dtype.itemsize)
+        return words
 
     def tofile(self, fh):
         """Write VLBI payload to filehandle."""
@@ -228,18 +269,148 @@ class VLBIPayloadBase(object):
 
         return words_slice, data_slice
 
-    def __getitem__(self, item=()):
+    # Look-up tables used for decoding individual channels, keyed by decoder.
+    _channel_luts = {}
+
+    def _channel_layout(self):
+        """Locations of the encoded values of all parts of a sample.
+
+        For encodings in which every byte holds a fixed number of values,
+        which are decoded using a look-up table, the elements of a sample
+        (counting real and imaginary parts separately) can be decoded
+        separately.  To do this, the bytes are grouped such that a group
+        encodes a whole number of samples (see ``_group_bytes``).
+
+        Returns
+        -------
+        lut : `~numpy.ndarray`
+            Decoded values for every possible byte, with shape (256, nvalue).
+        byte_index : `~numpy.ndarray`
+            Index in the group of the byte holding each element, for every
+            sample in the group, i.e., with shape (nsample, nelement).
+        value_index : `~numpy.ndarray`
+            Index in the look-up table output of each element.
+
+        If the encoding is not of this type, `None` is returned instead.
+        """
+        bps, bpfs = self.bps, self._bpfs
+        if 8 % bps or (bpfs % 8 and 8 % bpfs):
+            return None
         decoder = self._decoders[self._coder]
-        if item is () or item == slice(None):
-            data = decoder(self.words)
-            if self.complex_data:
-                data = data.view(self.dtype)
-            return data.reshape(self.shape)
+        key = (decoder, np.dtype(self._dtype_word))
+        lut = self._channel_luts.get(key)
+        if lut is None:
+            # Decode all byte values as words of the type the decoder
+            # expects, since, e.g., signed words need sign extension.
+            lut = decoder(np.arange(256, dtype=np.uint8)
+                          .view(self._dtype_word)).reshape(256, -1)
+            self._channel_luts[key] = lut
+        nsample = max(8 // bpfs, 1)
+        element = np.arange(nsample * bpfs // bps).reshape(nsample, -1)
+        return lut, element // lut.shape[1], element % lut.shape[1]
+
+    def _group_bytes(self, words):
+        """Get encoded bytes, grouped as needed for ``_channel_layout``."""
+        return words.view(np.uint8).reshape(-1, max(self._bpfs // 8, 1))
+
+    def _decode_channels(self, item):
+        """Decode only the part of the payload selected by ``item``.
+
+        Here, ``item`` is a tuple, with the first element selecting samples
+        and the second one or more indices along the first sample axis (e.g.,
+        channels).  Only the bytes holding the latter are decoded.
+
+        Returns
+        -------
+        data : `~numpy.ndarray` or None
+            Decoded samples, or `None` if the encoding does not allow for
+            decoding channels separately, or if all bytes would be needed.
+        """
+        layout = self._channel_layout()
+        if layout is None:
+            return None
+        lut, byte_index, value_index = layout
+        # Indices of the encoded elements of the selected channels.
+        nchan = self.sample_shape[0]
+        nelement = byte_index.shape[1] // nchan
+        channels = np.arange(nchan)[item[1]]
+        element = (channels[..., np.newaxis] * nelement +
+                   np.arange(nelement))
+        # Bytes needed for those; if these are all, just decode everything.
+        needed = np.unique(byte_index[:, element])
+        if len(needed) > byte_index.max():
+            return None
+
+        words_slice, data_slice = self._item_to_slices(item[0])
+        group_bytes = self._group_bytes(self.words[words_slice])
+        decoded = lut.take(group_bytes[:, needed], axis=0)
+        decoded = decoded.reshape(len(decoded), len(needed) * lut.shape[1])
+        # Positions of the elements in the decoded values.
+        index = (np.searchsorted(needed, byte_index[:, element]) *
+                 lut.shape[1] + value_index[:, element])
+        if (index.size != decoded.shape[1] or
+                np.any(index.ravel() != np.arange(index.size))):
+            decoded = decoded[:, index]
+        data = decoded.reshape((len(decoded) * len(byte_index),) +
+                               channels.shape +
+                               self.sample_shape[1:] +
+                               ((2,) if self.complex_data else ()))
+        if self.complex_data:
+            data = np.ascontiguousarray(data).view(self.dtype)[..., 0]
+        return data[(data_slice,) + (slice(None),) * channels.ndim +
+                    item[2:]]
+
+    def __getitem__(self, item=(), out=None):
+        """Decode (part of) the payload.
+
+        Parameters
+        ----------
+        item : int, slice, or tuple, optional
+            Sample indices (see ``_item_to_slices``).  Default: all samples.
+            If a tuple, its second element can select along the first sample
+            axis (e.g., channels), in which case only the corresponding parts
+            of the payload are decoded (if possible for the encoding).
+        out : `~numpy.ndarray`, optional
+            Array in which to store the decoded samples.  Should have the
+            shape and dtype of the selection.  If it covers full words and is
+            contiguous, the decoder writes to it directly, avoiding the
+            creation of a temporary array.
+
+        Returns
+        -------
+        data : `~numpy.ndarray`
+            Decoded samples; this is ``out`` if that was given.
+        """
+        decoder = self._decoders[self._coder]
+        if item == () or item == slice(None):
+            words_slice = data_slice = slice(None)
+        else:
+            if (isinstance(item, tuple) and len(item) > 1 and
+                    not (isinstance(item[1], slice) and
+                         item[1] == slice(None))):
+                data = self._decode_channels(item)
+                if data is not None:
+                    if out is None:
+                        return data
+                    out[...] = data
+                    return out
+
+            words_slice, data_slice = self._item_to_slices(item)
 
-        words_slice, data_slice = self._item_to_slices(item)
+        words = self.words[words_slice]
+        if (out is not None and data_slice == slice(None) and
+                out.dtype == self.dtype and out.flags['C_CONTIGUOUS'] and
+                out.shape == ((words.size * words.dtype.itemsize * 8 //
+                               self._bpfs,) + self.sample_shape)):
+            decoder(words, out=out.view(out.real.dtype))
+            return out
 
-        return (decoder(self.words[words_slice]).view(self.dtype)
+        data = (decoder(words).view(self.dtype)
                 .reshape(-1, *self.sample_shape)[data_slice])
+        if out is None:
+            return data
+        out[...] = data
+        return out
 
     def __setitem__(self, item, data):
         if item is () or item == slice(None):
@@ -258,6 +258,28 @@ class TestVLBIBase(object):
         check[item] = 1-sel_data
         assert np.all(payload.data == check)
 
+    @pytest.mark.parametrize('item', ((slice(None), 1), (slice(1, 3), [1]),
+                                      (-1, [1, 0]), (slice(None), [])))
+    def test_payload_getitem_channels(self, item):
+        # Selecting channels should decode only those, but give the same
+        # result as decoding everything (even if not possible for the
+        # encoding, as for the 1-bit payload with 5 channels).
+        data = self.payload.data
+        payloads = [self.payload,
+                    self.Payload.fromdata(data + 1j * data[:, ::-1], bps=8)]
+        if item[0] == slice(None):
+            payloads.append(self.payload1bit)
+        for p in payloads:
+            sel_data = p.data[item]
+            decoded = p[item]
+            assert decoded.shape == sel_data.shape
+            assert decoded.dtype == p.dtype
+            assert np.all(decoded == sel_data)
+            out = np.zeros_like(sel_data)
+            result = p.__getitem__(item, out=out)
+            assert result is out
+            assert np.all(out == sel_data)
+
     def test_payload_bad_fbps(self):
         with pytest.raises(TypeError):
             self.payload1bit[10:11]
@@ -472,3 +494,26 @@ def test_crc():
     assert '{:03x}'.format(crc) == crc_expected
     fullstream = np.hstack((bitstream, crcstream))
     assert crc12.check(fullstream)
+
+
+def test_crc_parallel():
+    # Streams in the bits of integers, and along further dimensions, should
+    # give the same result as calculating for each stream separately.
+    crc12 = CRC(0x180f)
+    np.random.seed(1234)
+    words = np.random.randint(0, 1 << 16, (148, 5)).astype(np.uint16)
+    crc = crc12(words)
+    assert crc.shape == (12, 5)
+    assert crc.dtype == np.uint16
+    for track in (0, 7, 15):
+        bitstream = ((words >> track) & 1).astype(bool)
+        crcstream = crc12(bitstream)
+        assert np.all(crcstream == ((crc >> track) & 1).astype(bool))
+        assert np.all(crc12(bitstream[:, 3]) == crcstream[:, 3])
+
+    fullstream = np.vstack((words, crc))
+    assert np.all(crc12.check(fullstream))
+    fullstream[10, 2] ^= np.uint16(1 << 5)
+    assert np.all(crc12.check(fullstream) == [True, True, False, True, True])
+    assert crc12.check(fullstream[:, 1])
+    assert not crc12.check(fullstream[:, 2])
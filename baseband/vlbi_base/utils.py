@@ -58,6 +58,12 @@ class CRC(object):
     the CRC, or one can use the `.check` method to check that the CRC at the
     end of a stream is correct.
 
+    The calculation uses a table of the remainders of the polynomial for each
+    bit position in the stream, so that every bit of the CRC is the XOR of
+    the stream words at the positions for which that bit is set.  As a
+    result, all streams held in the bits of integers, as well as streams
+    along further dimensions (e.g., many headers), are done in parallel.
+
     Parameters
     ----------
     polynomial : int
@@ -68,6 +74,9 @@ class CRC(object):
         self.polynomial = polynomial
         self.pol_bin = np.array(
             [int(bit) for bit in '{:b}'.format(polynomial)], dtype=np.int8)
+        # Remainders of x^i, for increasing i; extended as needed.
+        self._remainders = [1 << i for i in range(len(self))]
+        self._masks = {}
 
     def __len__(self):
         return self.pol_bin.size - 1
@@ -78,18 +87,20 @@ class CRC(object):
         Parameters
         ----------
         stream : array of bool or unsigned int
-            The dimension is treated as the index into the bits.  For a single
-            stream, the array should thus be of type `bool`. Integers represent
-            multiple streams. E.g., for a 64-track Mark 4 header, the stream
-            would be an array of ``np.uint64`` words.
+            The first dimension is treated as the index into the bits.  For a
+            single stream, the array should thus be of type `bool`. Integers
+            represent multiple streams. E.g., for a 64-track Mark 4 header,
+            the stream would be an array of ``np.uint64`` words.  Any further
+            dimensions are treated as independent streams as well.
 
         Returns
         -------
         crc : array
             The crc will have the same dtype as the input stream.
         """
-        stream = np.hstack((stream, np.zeros((len(self),), stream.dtype)))
-        return self._crc(stream)
+        stream = np.asanyarray(stream)
+        # The CRC is the remainder of the stream shifted up by len(self).
+        return self._remainder(stream, len(self))
 
     def check(self, stream):
         """Check that the CRC at the end of the stream is correct.
@@ -97,25 +108,63 @@ class CRC(object):
         Parameters
         ----------
         stream : array of bool or unsigned int
-            The dimension is treated as the index into the bits.  For a single
-            stream, the array should thus be of type `bool`. Integers represent
-            multiple streams. E.g., for a 64-track Mark 4 header, the stream
-            would be an array of ``np.uint64`` words.
+            The first dimension is treated as the index into the bits.  For a
+            single stream, the array should thus be of type `bool`. Integers
+            represent multiple streams. E.g., for a 64-track Mark 4 header,
+            the stream would be an array of ``np.uint64`` words.  Any further
+            dimensions are treated as independent streams as well, e.g., to
+            check many headers at once.
 
         Returns
         -------
-        ok : bool
+        ok : bool or array of bool
              `True` if the calculated CRC is all zero (which should be the
-             case if the CRC at the end of the stream is correct).
+             case if the CRC at the end of the stream is correct).  For
+             streams with more than one dimension, this is evaluated
+             separately for every entry along the further dimensions.
         """
-        return np.all(self._crc(stream.copy()) == 0)
+        stream = np.asanyarray(stream)
+        return np.all(self._remainder(stream) == 0, axis=0)
+
+    def _bit_masks(self, nbit, shift=0):
+        """Stream positions that contribute to each bit of the remainder.
 
-    def _crc(self, stream):
-        """Internal function to calculate the CRC.
+        Parameters
+        ----------
+        nbit : int
+            Number of bits in the stream.
+        shift : int
+            Power of x by which the stream is multiplied.
 
-        Note that the stream is changed in-place.
+        Returns
+        -------
+        masks : array of bool
+            With shape ``(len(self), nbit)``, where an element is `True` if
+            the remainder for the given stream position has the bit set
+            (starting with the most significant bit).
         """
-        pol_bin = (-self.pol_bin).astype(stream.dtype)
-        for i in range(0, len(stream) - len(self)):
-            stream[i:i+pol_bin.size] ^= (pol_bin & stream[i])
-        return stream[-len(self):]
+        key = nbit, shift
+        masks = self._masks.get(key)
+        if masks is None:
+            remainders = self._remainders
+            top_bit = 1 << len(self)
+            while len(remainders) < nbit + shift:
+                remainder = remainders[-1] << 1
+                if remainder & top_bit:
+                    remainder ^= self.polynomial
+                remainders.append(remainder)
+            # The first element of the stream has the highest power.
+            table = np.array(remainders[shift:nbit+shift][::-1], np.uint64)
+            masks = ((table >> np.arange(len(self) - 1, -1, -1,
+                                         dtype=np.uint64)[:, np.newaxis]) &
+                     np.uint64(1)).astype(bool)
+            self._masks[key] = masks
+        return masks
+
+    def _remainder(self, stream, shift=0):
+        """Internal function to calculate the remainder of a stream."""
+        masks = self._bit_masks(len(stream), shift)
+        remainder = np.empty((len(self),) + stream.shape[1:], stream.dtype)
+        for bit, mask in enumerate(masks):
+            remainder[bit] = np.bitwise_xor.reduce(stream[mask], axis=0)
+        return remainder
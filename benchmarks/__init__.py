@@ -0,0 +1,2 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Benchmarks for baseband, to be run with airspeed velocity (asv)."""
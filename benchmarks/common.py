@@ -0,0 +1,207 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Helpers shared by the benchmarks.
+
+All data are generated with a fixed random seed, and files are written to
+the current directory (a temporary one when run through asv), so that the
+benchmarks do not depend on anything but baseband itself.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import timeit
+import warnings
+
+import numpy as np
+import astropy.units as u
+
+from baseband import vdif, mark5b, mark4, gsb, dada
+from baseband.data import (SAMPLE_VDIF, SAMPLE_MARK5B, SAMPLE_MARK4,
+                           SAMPLE_GSB_RAWDUMP_HEADER, SAMPLE_GSB_RAWDUMP,
+                           SAMPLE_GSB_PHASED_HEADER, SAMPLE_GSB_PHASED,
+                           SAMPLE_DADA)
+
+
+# Approximate size of the encoded data in generated files.
+FILE_SIZE = 8 << 20
+# Approximate size of the decoded data in a block read from a stream.
+BLOCK_SIZE = 4 << 20
+
+GSB_RATE = (1e8 / 3) / 2**23 * u.Hz
+
+
+def best_rate(func, amount, repeat=5, min_time=0.05):
+    """Best rate at which ``func`` processes ``amount`` of something.
+
+    As for `timeit`, calls are grouped such that a group takes at least
+    ``min_time`` seconds, and the fastest of ``repeat`` groups is used.
+    """
+    number = 1
+    while True:
+        time = timeit.timeit(func, number=number)
+        if time >= min_time:
+            break
+        number *= 10
+    times = [time] + timeit.repeat(func, number=number, repeat=repeat - 1)
+    return amount * number / min(times)
+
+
+def random_data(shape, complex_data=False, seed=1234):
+    """Normally distributed data, with standard deviation of 2."""
+    rng = np.random.RandomState(seed)
+    data = rng.normal(scale=2., size=shape).astype('f4')
+    if complex_data:
+        data = data + 1j * rng.normal(scale=2., size=shape).astype('f4')
+    return data
+
+
+def _read_header0(opener, *args, **kwargs):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with opener(*args, **kwargs) as fh:
+            return fh.header0
+
+
+# For each format, how to open a stream of a synthetic file for writing and
+# reading, using the header of a sample file as template.  For GSB, file
+# names are for the timestamp file and the raw file(s).
+STREAMS = {
+    'vdif': dict(
+        name='synthetic.vdif',
+        header=lambda: _read_header0(vdif.open, SAMPLE_VDIF, 'rs'),
+        write=dict(nthread=8, sample_rate=32 * u.MHz),
+        read=dict()),
+    'mark5b': dict(
+        name='synthetic.m5b',
+        header=lambda: _read_header0(mark5b.open, SAMPLE_MARK5B, 'rs',
+                                     nchan=8, bps=2, kday=56000,
+                                     sample_rate=32 * u.MHz),
+        write=dict(nchan=8, bps=2, sample_rate=32 * u.MHz),
+        read=dict(nchan=8, bps=2, kday=56000, sample_rate=32 * u.MHz)),
+    'mark4': dict(
+        name='synthetic.m4',
+        header=lambda: _read_header0(mark4.open, SAMPLE_MARK4, 'rs',
+                                     ntrack=64, decade=2010,
+                                     sample_rate=32 * u.MHz),
+        write=dict(sample_rate=32 * u.MHz),
+        read=dict(ntrack=64, decade=2010, sample_rate=32 * u.MHz)),
+    'gsb-rawdump': dict(
+        name=('synthetic_rawdump.timestamp', 'synthetic_rawdump.dat'),
+        header=lambda: _read_header0(gsb.open, SAMPLE_GSB_RAWDUMP_HEADER,
+                                     'rs', raw=SAMPLE_GSB_RAWDUMP,
+                                     samples_per_frame=1 << 20,
+                                     sample_rate=GSB_RATE * (1 << 20)),
+        write=dict(samples_per_frame=1 << 20,
+                   sample_rate=GSB_RATE * (1 << 20)),
+        read=dict(samples_per_frame=1 << 20,
+                  sample_rate=GSB_RATE * (1 << 20))),
+    'gsb-phased': dict(
+        name=('synthetic_phased.timestamp',
+              (('synthetic_phased.L1.dat', 'synthetic_phased.L2.dat'),
+               ('synthetic_phased.R1.dat', 'synthetic_phased.R2.dat'))),
+        header=lambda: _read_header0(gsb.open, SAMPLE_GSB_PHASED_HEADER,
+                                     'rs', raw=SAMPLE_GSB_PHASED,
+                                     samples_per_frame=128,
+                                     sample_rate=GSB_RATE * 128),
+        write=dict(samples_per_frame=128, sample_rate=GSB_RATE * 128),
+        read=dict(samples_per_frame=128, sample_rate=GSB_RATE * 128)),
+    'dada': dict(
+        name='synthetic.dada',
+        header=lambda: _read_header0(dada.open, SAMPLE_DADA, 'rs'),
+        write=dict(),
+        read=dict()),
+}
+
+OPENERS = {'vdif': vdif.open, 'mark5b': mark5b.open, 'mark4': mark4.open,
+           'gsb-rawdump': gsb.open, 'gsb-phased': gsb.open,
+           'dada': dada.open}
+
+
+def _prefixed(name, prefix):
+    if isinstance(name, tuple):
+        return tuple(_prefixed(n, prefix) for n in name)
+    return prefix + name
+
+
+def open_stream(fmt, mode='rs', prefix='', **kwargs):
+    """Open the synthetic file of the given format as a stream.
+
+    File names can be given a ``prefix``, e.g., to avoid overwriting files
+    that are still needed for reading.
+    """
+    info = STREAMS[fmt]
+    name = _prefixed(info['name'], prefix)
+    if fmt.startswith('gsb'):
+        name, kwargs['raw'] = name
+    kwargs.update(info['write' if mode == 'ws' else 'read'])
+    return OPENERS[fmt](name, mode, **kwargs)
+
+
+class StreamInfo(object):
+    """Properties of the stream of a synthetic file."""
+    def __init__(self, sample_shape, complex_data, bps, samples_per_frame):
+        self.sample_shape = tuple(sample_shape)
+        self.complex_data = complex_data
+        # Size of a complete sample.
+        nvalue = int(np.prod(self.sample_shape)) * (2 if complex_data else 1)
+        self.sample_bits = nvalue * bps
+        self.sample_nbytes = nvalue * 4
+        self.samples_per_frame = samples_per_frame
+        # Use a whole number of frames for the file, and a power of two
+        # for the number of samples in a block.
+        nframe = max(FILE_SIZE * 8 // self.sample_bits // samples_per_frame,
+                     1)
+        self.nsample = nframe * samples_per_frame
+        self.block = 1 << int(np.log2(max(BLOCK_SIZE // self.sample_nbytes,
+                                          1)))
+
+
+def stream_header(fmt):
+    """Header used as template for the synthetic file of the given format."""
+    header = STREAMS[fmt]['header']()
+    if fmt == 'dada':
+        # DADA files consist of a single large frame.
+        header = header.copy()
+        header.payloadsize = FILE_SIZE
+    return header
+
+
+def make_stream(fmt):
+    """Write a synthetic file of the given format.
+
+    Uses the header of a sample file as template, with random data for the
+    payload.
+
+    Returns
+    -------
+    info : `StreamInfo`
+        With the properties of the stream.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with open_stream(fmt, 'ws', header=stream_header(fmt)) as fw:
+            info = StreamInfo(fw._sample_shape, fw.complex_data,
+                              fw.bps, fw.samples_per_frame)
+            if fmt == 'dada':
+                info.nsample = fw.samples_per_frame
+            write_stream(fw, info)
+    return info
+
+
+def block_data(info):
+    """Random data for a block of the stream."""
+    return random_data((info.block,) + info.sample_shape, info.complex_data)
+
+
+def write_stream(fw, info, data=None):
+    """Write data to a stream, one block at a time.
+
+    If no ``data`` are given, random ones are generated.
+    """
+    if data is None:
+        data = block_data(info)
+    if fw.squeeze:
+        data = data.reshape((info.block,) + fw.sample_shape)
+    nblock, rest = divmod(info.nsample, info.block)
+    for i in range(nblock):
+        fw.write(data)
+    if rest:
+        fw.write(data[:rest])
@@ -0,0 +1,124 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Benchmarks for reading headers and calculating their times."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import io
+import warnings
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+
+from baseband import vdif, mark5b, mark4, gsb, dada
+from baseband.vdif.header import VDIF_HEADER_CLASSES
+from baseband.data import (SAMPLE_MARK5B, SAMPLE_MARK4,
+                           SAMPLE_GSB_RAWDUMP_HEADER, SAMPLE_GSB_PHASED_HEADER,
+                           SAMPLE_DADA)
+
+from .common import best_rate
+
+
+# Number of headers read or interpreted in one go.
+NHEADER = 1000
+
+
+def _vdif_header(edv):
+    kwargs = dict(edv=edv, time=Time('2018-01-01T00:00:00'),
+                  samples_per_frame=20000, bps=2, nchan=1, station='Ar')
+    if edv == 0xab:
+        del kwargs['samples_per_frame']
+        kwargs.update(frame_length=1254, frame_nr=0)
+    elif edv == -1:
+        kwargs['edv'] = False
+    if edv in (1, 3):
+        kwargs['sample_rate'] = 32 * u.MHz
+    return vdif.VDIFHeader.fromvalues(**kwargs)
+
+
+def _sample_header(name, cls, *args, **kwargs):
+    with open(name, 'rb') as fh:
+        return cls.fromfile(fh, *args, **kwargs)
+
+
+def _mark4_header():
+    with open(SAMPLE_MARK4, 'rb') as fh:
+        fh.seek(0xa88)
+        return mark4.Mark4Header.fromfile(fh, ntrack=64, decade=2010)
+
+
+def _gsb_header(name):
+    with io.open(name, 'rt') as fh:
+        return gsb.GSBHeader.fromfile(fh)
+
+
+# For each header, how to create an instance, and the arguments needed
+# to read it from file.
+HEADERS = {('vdif-legacy' if edv == -1 else 'vdif-{0}'.format(edv)):
+           ((lambda edv=edv: _vdif_header(edv)), dict())
+           for edv in VDIF_HEADER_CLASSES}
+HEADERS.update({
+    'mark5b': (lambda: _sample_header(SAMPLE_MARK5B, mark5b.Mark5BHeader,
+                                      kday=56000),
+               dict(kday=56000)),
+    'mark4': (_mark4_header, dict(ntrack=64, decade=2010)),
+    'gsb-rawdump': (lambda: _gsb_header(SAMPLE_GSB_RAWDUMP_HEADER), dict()),
+    'gsb-phased': (lambda: _gsb_header(SAMPLE_GSB_PHASED_HEADER), dict()),
+    'dada': (lambda: _sample_header(SAMPLE_DADA, dada.DADAHeader), dict())})
+
+
+class Header(object):
+    """Speed of reading headers from file and getting their time.
+
+    Both are in headers per second.
+    """
+    params = sorted(HEADERS)
+    param_names = ['header']
+    unit = 'headers/s'
+
+    def setup(self, name):
+        make_header, self.kwargs = HEADERS[name]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.header = make_header()
+        self.cls = type(self.header)
+        self.buffer = (io.StringIO() if name.startswith('gsb')
+                       else io.BytesIO())
+        for i in range(NHEADER):
+            self.header.tofile(self.buffer)
+        if name == 'vdif-legacy':
+            # Legacy headers are read with 32 bytes at a time, relying on
+            # the presence of a payload after the last header.
+            self.buffer.write(b'\0' * 16)
+
+    def read_headers(self):
+        self.buffer.seek(0)
+        for i in range(NHEADER):
+            self.cls.fromfile(self.buffer, **self.kwargs)
+
+    def track_fromfile(self, name):
+        return best_rate(self.read_headers, NHEADER)
+
+    def track_time(self, name):
+        return best_rate(lambda: self.header.time, 1)
+
+
+class HeaderSequence(object):
+    """Speed of getting times for many header words at once.
+
+    In headers per second; for comparison with ``Header.track_time``.
+    """
+    params = sorted(name for name in HEADERS
+                    if name.startswith(('vdif', 'mark')))
+    param_names = ['header']
+    unit = 'headers/s'
+
+    def setup(self, name):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.header = HEADERS[name][0]()
+        self.words = np.repeat(np.array(self.header.words)[np.newaxis],
+                               NHEADER, axis=0)
+
+    def track_sequence_time(self, name):
+        return best_rate(lambda: self.header.sequence_time(self.words),
+                         NHEADER)
@@ -0,0 +1,31 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Benchmarks for the time needed to import baseband and its formats.
+
+Each is run in a fresh interpreter, so that nothing has been imported yet.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+
+def timeraw_import_baseband():
+    return "import baseband"
+
+
+def timeraw_import_vdif():
+    return "from baseband import vdif"
+
+
+def timeraw_import_mark5b():
+    return "from baseband import mark5b"
+
+
+def timeraw_import_mark4():
+    return "from baseband import mark4"
+
+
+def timeraw_import_gsb():
+    return "from baseband import gsb"
+
+
+def timeraw_import_dada():
+    return "from baseband import dada"
@@ -0,0 +1,73 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Benchmarks for the encoders and decoders of the payload classes."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import numpy as np
+
+from baseband.vdif import VDIFPayload
+from baseband.mark5b import Mark5BPayload
+from baseband.mark4 import Mark4Payload
+from baseband.gsb import GSBPayload
+from baseband.dada import DADAPayload
+
+from .common import best_rate, random_data
+
+
+PAYLOAD_CLASSES = {'vdif': VDIFPayload,
+                   'mark5b': Mark5BPayload,
+                   'mark4': Mark4Payload,
+                   'gsb': GSBPayload,
+                   'dada': DADAPayload}
+
+# Approximate size of the encoded data.
+ENCODED_SIZE = 4 << 20
+
+
+def _coder_name(fmt, key):
+    if isinstance(key, tuple):
+        return '-'.join([fmt] + [str(k) for k in key])
+    return '{0}-{1}'.format(fmt, key)
+
+
+CODERS = {_coder_name(fmt, key): (cls, key)
+          for fmt, cls in PAYLOAD_CLASSES.items()
+          for key in cls._decoders}
+
+
+class Coding(object):
+    """Speed of encoding and decoding, in MB/s of encoded data.
+
+    Every combination of encoder and decoder registered on the payload
+    classes is used, named by format and bits per sample, or, for Mark 4,
+    by number of channels, bits per sample, and fanout.
+    """
+    params = sorted(CODERS)
+    param_names = ['coder']
+    unit = 'MB/s'
+
+    def setup(self, coder):
+        cls, key = CODERS[coder]
+        if isinstance(key, tuple):
+            nchan, bps = key[:2]
+        else:
+            nchan, bps = 8, key
+        nsample = ENCODED_SIZE * 8 // bps // nchan
+        self.data = random_data((nsample, nchan))
+        self.encoder = cls._encoders[key]
+        self.decoder = cls._decoders[key]
+        words = self.encoder(self.data).ravel()
+        if cls._dtype_word is not None:
+            words = words.view(cls._dtype_word)
+        self.words = words
+        self.out = np.empty_like(self.data)
+        self.mbytes = words.nbytes / 1e6
+
+    def track_encode(self, coder):
+        return best_rate(lambda: self.encoder(self.data), self.mbytes)
+
+    def track_decode(self, coder):
+        return best_rate(lambda: self.decoder(self.words), self.mbytes)
+
+    def track_decode_into(self, coder):
+        return best_rate(lambda: self.decoder(self.words, out=self.out),
+                         self.mbytes)
@@ -0,0 +1,85 @@
+# Licensed under the GPLv3 - see LICENSE.rst
+"""Benchmarks for reading and writing streams of synthetic files."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import numpy as np
+
+from .common import (STREAMS, best_rate, open_stream, make_stream,
+                     stream_header, block_data, write_stream)
+
+
+# Number of seeks in a seek benchmark, and samples read after each.
+NSEEK = 10
+SEEK_COUNT = 100
+
+
+class SyntheticFiles(object):
+    """Base for benchmarks of streams of synthetic files.
+
+    A synthetic file is written for each format, with headers based on
+    those of the sample files and random data in the payloads.
+    """
+    params = sorted(STREAMS)
+    param_names = ['format']
+    timeout = 300
+
+    def setup_cache(self):
+        return {fmt: make_stream(fmt) for fmt in STREAMS}
+
+
+class Stream(SyntheticFiles):
+    """Speed of reading and writing complete streams, in samples/s.
+
+    For reading, data are decoded in blocks of a few MB into a preallocated
+    array.
+    """
+    unit = 'samples/s'
+
+    def setup(self, infos, fmt):
+        self.info = infos[fmt]
+
+    def read_stream(self, fmt):
+        info = self.info
+        with open_stream(fmt) as fh:
+            out = fh.read(info.block)
+            nblock, rest = divmod(info.nsample, info.block)
+            for i in range(1, nblock):
+                fh.read(out=out)
+            if rest:
+                fh.read(out=out[:rest])
+
+    def track_read(self, infos, fmt):
+        return best_rate(lambda: self.read_stream(fmt), self.info.nsample,
+                         repeat=3)
+
+    def write_stream(self, fmt, header, data):
+        with open_stream(fmt, 'ws', prefix='write_', header=header) as fw:
+            write_stream(fw, self.info, data)
+
+    def track_write(self, infos, fmt):
+        header = stream_header(fmt)
+        data = block_data(self.info)
+        return best_rate(lambda: self.write_stream(fmt, header, data),
+                         self.info.nsample, repeat=3)
+
+
+class Latency(SyntheticFiles):
+    """Time needed to open a stream, and to seek and read a few samples."""
+
+    def setup(self, infos, fmt):
+        self.fh = open_stream(fmt)
+        # Fixed offsets, so that results are reproducible.
+        rng = np.random.RandomState(1234)
+        self.offsets = rng.randint(0, self.fh.size - SEEK_COUNT, NSEEK)
+
+    def teardown(self, infos, fmt):
+        self.fh.close()
+
+    def time_open(self, infos, fmt):
+        with open_stream(fmt) as fh:
+            fh.start_time
+
+    def time_seek_read(self, infos, fmt):
+        for offset in self.offsets:
+            self.fh.seek(offset)
+            self.fh.read(SEEK_COUNT)